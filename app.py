@@ -1,108 +1,130 @@
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_bolt.context.respond import Respond
-from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
 import os
-import json
-import re
+import time
+import atexit
 import logging
+import itertools
+import threading
+from datetime import datetime
 
 from dotenv import load_dotenv
 
+# Load .env before importing the bot modules so their tuning settings pick it up
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from bot_logging import configure_logging, log_payload, log_sampled
+from history_scanner import has_thread_replies, iter_conversations, iter_history_pages, iter_thread_replies
+from http_transport import PooledTransport, PooledWebClient, pooled_client
+from rate_limiter import RateLimitScheduler, current_budget, metered, rate_limited
+from deletion import SWEEP_PENDING_THREADS, DeletionExecutor, DeletionResult, PendingLimit
+from jobs import CANCELLED, COMPLETED, FAILED, RUNNING, Job, JobEngine
+from coordination import LEASE_TTL, Coordinator
+from job_store import RETENTION_JOB, SWEEP_JOB, JobStore
+from retention import RetentionScheduler
+from sweep_planner import SweepPlanner
+from orphan_index import OrphanIndex
+from undeletable import UndeletableCache
+from priority import INTERACTIVE
+from user_cache import USER_CACHE_WARM, UserInfoCache
+from thread_flights import ThreadFlights
+from metrics import InstrumentedExecutor, start_metrics_server, timed_handler
+from tracing import current_span, start_span, traced, traced_handler
+from workspace_sweep import (
+    WORKSPACE_SWEEP_CONCURRENCY,
+    WORKSPACE_SWEEP_REPORT,
+    WORKSPACE_SWEEP_TYPES,
+    WorkspaceReport,
+    prioritize_conversations,
+)
+from time_periods import (
+    REMOVE_ORPHANED_MESSAGES_HELP,
+    describe_time_window,
+    get_invalid_time_format_error,
+    parse_time_window,
+)
+
+# Configure logging; records are written by a background thread so log I/O never blocks handlers or deletes
+configure_logging()
 logger = logging.getLogger(__name__)
 
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
 SLACK_USER_TOKEN = os.getenv("SLACK_USER_TOKEN")  # Add user token for admin operations
 
-app = App(token=SLACK_BOT_TOKEN)
+# Web API base URL; point it at a local stand-in (see benchmarks/) to run without a real workspace
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
 
-# Create a separate client for user token operations
-user_client = WebClient(token=SLACK_USER_TOKEN) if SLACK_USER_TOKEN else None
+# Extra conversations.history probes when a sweep finds nothing (a retry without inclusive and an unfiltered
+# sample of the channel); they only feed the debug log, so they are off unless you are chasing a problem
+SWEEP_DIAGNOSTICS = os.getenv("SWEEP_DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
 
-def format_time_period_for_display(text):
-    """Convert short time formats to full display format for notifications"""
-    text = text.strip()
-    
-    # Convert short formats to full formats (no spaces)
-    if re.match(r'^(\d+)[Dd]$', text):
-        number = re.match(r'^(\d+)[Dd]$', text).group(1)
-        return f"{number} day{'s' if int(number) != 1 else ''}"
-    elif re.match(r'^(\d+)[Hh]$', text):
-        number = re.match(r'^(\d+)[Hh]$', text).group(1)
-        return f"{number} hour{'s' if int(number) != 1 else ''}"
-    elif re.match(r'^(\d+)[Mm]$', text):
-        number = re.match(r'^(\d+)[Mm]$', text).group(1)
-        return f"{number} minute{'s' if int(number) != 1 else ''}"
-    
-    # Convert spaced formats to full formats
-    elif re.match(r'^(\d+)\s*[Dd]$', text):
-        number = re.match(r'^(\d+)\s*[Dd]$', text).group(1)
-        return f"{number} day{'s' if int(number) != 1 else ''}"
-    elif re.match(r'^(\d+)\s*[Hh]$', text):
-        number = re.match(r'^(\d+)\s*[Hh]$', text).group(1)
-        return f"{number} hour{'s' if int(number) != 1 else ''}"
-    elif re.match(r'^(\d+)\s*[Mm]$', text):
-        number = re.match(r'^(\d+)\s*[Mm]$', text).group(1)
-        return f"{number} minute{'s' if int(number) != 1 else ''}"
-    
-    # If it's already in full format, return as is
-    return text
+# Threads with at least this many replies are deleted by a background job instead of the shortcut listener
+LARGE_THREAD_REPLIES = int(os.getenv("LARGE_THREAD_REPLIES", "200"))
+
+# Slack accepts at most this many posts to one response_url
+RESPONSE_URL_MAX_POSTS = 5
+
+# Keep-alive connections to Slack shared by the bot and user token clients (size set by HTTP_POOL_SIZE)
+http_transport = PooledTransport()
+
+# Listener pool is Bolt's default size, instrumented so queue time shows up in the metrics
+app = App(
+    client=PooledWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL, transport=http_transport),
+    listener_executor=InstrumentedExecutor(max_workers=5, thread_name_prefix="bolt-listener", pool_name="bolt-listener")
+)
+
+# Shared scheduler that keeps both the bot and user token within Slack's per-method tier budgets
+api_scheduler = RateLimitScheduler()
 
-def get_invalid_time_format_error(command_text):
-    """Generate error message for invalid time format"""
-    return f"""❌ *Invalid time format: `{command_text}`*
+# Create a separate client for user token operations
+user_client = rate_limited(
+    PooledWebClient(token=SLACK_USER_TOKEN, base_url=SLACK_API_URL, transport=http_transport), api_scheduler, name="user"
+) if SLACK_USER_TOKEN else None
+
+# Messages chat.delete refused for good (e.g. cant_delete_message), skipped by later deletes until they expire
+undeletable_cache = UndeletableCache()
 
-*Supported formats:*
+# Shared bounded worker pool for chat.delete calls (size set by DELETE_CONCURRENCY)
+deletion_executor = DeletionExecutor(undeletable=undeletable_cache)
 
-**Concise formats:**
-• `30M` - 30 minutes
-• `2H` - 2 hours  
-• `1D` - 1 day
+# Runs bulk sweeps (and large shortcut threads, on separate workers) so listeners return right away
+job_engine = JobEngine()
 
-**Full word formats:**
-• `30 minutes` - 30 minutes
-• `2 hours` - 2 hours
-• `1 day` - 1 day
+# Checkpoints of bulk sweeps so they resume after a restart
+job_store = JobStore()
 
-**Examples:*
-• `/remove-orphaned-messages 2H`
-• `/remove-orphaned-messages 1D`
-• `/remove-orphaned-messages 30M`
-• `/remove-orphaned-messages 1 hour`
-• `/remove-orphaned-messages 2 days`
+# Channel sweeps queued or running here, so overlapping /remove-orphaned-messages requests share one scan
+sweep_planner = SweepPlanner()
 
-*What you entered:* `{command_text}`
-*Try again with one of the formats above.*"""
+# users.info results shared by every handler so permission checks rarely need an API call
+user_cache = UserInfoCache()
 
-# Help text for the remove-orphaned-messages command
-REMOVE_ORPHANED_MESSAGES_HELP = """*🗑️ Remove Orphaned Messages Command Help*
+# Shortcut deletions in flight and messages deleted moments ago, so duplicate shortcuts never repeat API calls
+thread_flights = ThreadFlights()
 
-*Usage:*
-`/remove-orphaned-messages <time_period>`
+# Tombstoned thread parents and their replies, kept up to date from message events
+orphan_index = OrphanIndex()
 
-*Examples:*
-• `/remove-orphaned-messages 2H` - Remove orphaned messages from last 2 hours
-• `/remove-orphaned-messages 1D` - Remove orphaned messages from last 1 day
-• `/remove-orphaned-messages 30M` - Remove orphaned messages from last 30 minutes
-• `/remove-orphaned-messages 1 hour` - Remove orphaned messages from last 1 hour
-• `/remove-orphaned-messages 2 days` - Remove orphaned messages from last 2 days
+def on_workers_changed(workers):
+    """Split the rate limits between the live processes; the orphan index only sees every event when alone"""
+    api_scheduler.set_share(1 / workers)
+    orphan_index.set_shared(workers > 1)
 
-*Supported Formats:*
-• **Concise**: `30M`, `2H`, `1D` (minutes, hours, days)
-• **Full**: `30 minutes`, `2 hours`, `1 day`
+# Leases shared with every other bot process, so replicas split the rate limits and never run a job,
+# sweep a channel or delete a thread twice
+coordinator = Coordinator(on_workers_changed=on_workers_changed, on_cancel=job_engine.cancel)
 
-*What it does:*
-• Removes all orphaned messages from the specified time period in this channel
-• Admins can remove any orphaned messages
-• Regular users can only remove their own orphaned messages
+@app.middleware
+def rate_limit_client(context, next):
+    """Route the Bolt-injected client through the shared connection pool and rate limit scheduler.
 
-*Permissions:*
-"""
+    Bolt builds a plain WebClient for every request, so it is swapped for a pooled copy here.
+    """
+    context["client"] = rate_limited(pooled_client(context.client, http_transport), api_scheduler)
+    next()
 
 print("🤖 Bot starting up...")
 print(f"Bot token configured: {'✅' if SLACK_BOT_TOKEN else '❌'}")
@@ -110,13 +132,14 @@ print(f"App token configured: {'✅' if SLACK_APP_TOKEN else '❌'}")
 print(f"User token configured: {'✅' if SLACK_USER_TOKEN else '❌'}")
 
 @app.event("app_mention")
+@timed_handler("app_mention")
+@traced_handler("app_mention")
 def handle_app_mention(body, say, client, logger):
     user_id = body["event"]["user"]
     
     try:
         # Check user's admin status
-        user_info = client.users_info(user=user_id)
-        user_data = user_info.get("user", {})
+        user_data = user_cache.get(client, user_id)
         
         is_admin = user_data.get("is_admin", False)
         is_owner = user_data.get("is_owner", False)
@@ -148,13 +171,29 @@ def handle_app_mention(body, say, client, logger):
         logger.error(f"Error checking user info: {e}")
         say("Hello, I'm here! 👋")
 
+@app.event("message")
+@timed_handler("message_event")
+def index_message_event(event):
+    """Feed every message event into the orphan index"""
+    try:
+        orphan_index.observe(event)
+    except Exception as e:
+        logger.error(f"Error indexing message event: {e}")
+
 @app.shortcut("delete-message-with-all-threads")
+@timed_handler("delete_message_shortcut")
+@traced_handler("delete_message_shortcut")
+@metered
 def handle_message_action(ack, body, client, logger):
     # Acknowledge the action request
     ack()
     
-    # Debug logging
-    logger.info(f"Message action triggered! Body: {json.dumps(body, indent=2)}")
+    # Full payloads only with LOG_PAYLOADS; serialized on the log writer thread
+    log_payload(logger, "Message action payload", body)
+    thread_key = None
+    flight_owned = False
+    # Final status for requests attached to this one; None when there is nothing to tell (all deleted)
+    outcome = None
     
     try:
         # Get the message details
@@ -164,16 +203,14 @@ def handle_message_action(ack, body, client, logger):
         message_ts = message.get("ts", "")
         message_author = message.get("user", "")
         
-        # Extract message text for logging
-        message_text = message.get("text", "")
-        logger.info(f"Processing message: {message_text[:50]}... from user {message_author} by requester {user_id} in channel {channel_id}")
+        logger.info("Processing message %s from user %s by requester %s in channel %s", message_ts, message_author, user_id, channel_id)
         
         # Check if the user requesting deletion has admin permissions
         try:
-            user_info = client.users_info(user=user_id)
-            is_admin = user_info.get("user", {}).get("is_admin", False)
-            is_owner = user_info.get("user", {}).get("is_owner", False)
-            is_primary_owner = user_info.get("user", {}).get("is_primary_owner", False)
+            user_data = user_cache.get(client, user_id)
+            is_admin = user_data.get("is_admin", False)
+            is_owner = user_data.get("is_owner", False)
+            is_primary_owner = user_data.get("is_primary_owner", False)
             
             has_admin_perms = is_admin or is_owner or is_primary_owner
             
@@ -212,98 +249,75 @@ def handle_message_action(ack, body, client, logger):
                 text="⚠️ User token not configured. Bot will attempt to delete messages but may be limited by Slack API permissions. See README for user token setup."
             )
         
-        # Get all replies to this message
+        # Duplicate requests for a thread attach to the deletion already running in this process
+        flight, flight_owned = thread_flights.begin(channel_id, message_ts)
+        if not flight_owned:
+            if flight is None:
+                logger.info(f"Message {message_ts} was deleted moments ago, skipping")
+            else:
+                logger.info(f"Thread {message_ts} is already being deleted, attaching to that deletion")
+                attach_to_flight(client, channel_id, user_id, flight)
+            return
+        
+        def tell_requester(text):
+            # Requests attached to this one are told the same once it finishes
+            nonlocal outcome
+            outcome = text
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        
+        # Only one worker (this listener, another replica or a sweep) expands and deletes a thread at a time
+        thread_key = f"thread:{channel_id}:{message_ts}"
+        if not coordinator.try_acquire(thread_key):
+            thread_key = None
+            logger.info(f"Thread {message_ts} is already being deleted by another worker, skipping")
+            return
+        
+        # Get all replies to this message, skipping the lookup when the payload shows there is no thread
         try:
-            replies_response = delete_client.conversations_replies(
-                channel=channel_id,
-                ts=message_ts
+            reply_ts_list = []
+            replies_calls = 0
+            if has_thread_replies(message) and (message.get("reply_count") or 0) >= LARGE_THREAD_REPLIES:
+                # Known to be large: the job streams the replies itself, so this listener returns right away
+                pages = iter_thread_replies(delete_client, channel_id, message_ts)
+                thread_key = None
+                flight.job = hand_off_large_thread(client, delete_client, body, message_ts, (reply.ts for page in pages for reply in page))
+                flight_owned = False
+                return
+            if has_thread_replies(message):
+                with start_span("thread.expand", thread_ts=message_ts) as span:
+                    pages = iter_thread_replies(delete_client, channel_id, message_ts)
+                    for page in pages:
+                        replies_calls += 1
+                        reply_ts_list.extend(msg.get("ts", "") for msg in page)
+                        if len(reply_ts_list) >= LARGE_THREAD_REPLIES and page.next_cursor:
+                            # Larger than reply_count said; the job picks up from the next page
+                            span.set_attributes({"replies": len(reply_ts_list), "pages": replies_calls, "handed_off": True})
+                            replies = itertools.chain(reply_ts_list, (reply.ts for page in pages for reply in page))
+                            thread_key = None
+                            flight.job = hand_off_large_thread(client, delete_client, body, message_ts, replies)
+                            flight_owned = False
+                            return
+                    span.set_attributes({"replies": len(reply_ts_list), "pages": replies_calls})
+            else:
+                logger.info(f"Message {message_ts} has no thread replies, skipping conversations.replies")
+            
+            logger.info(f"Found {len(reply_ts_list) + 1} messages to delete (including original)")
+            
+            # Delete replies concurrently, then the original once every reply is gone
+            result = deletion_executor.delete_thread(
+                delete_client, channel_id, message_ts, reply_ts_list, logger,
+                on_outcome=remember_deleted(channel_id), api_calls=replies_calls
             )
+            successful_deletions = result.successful
+            failed_deletions = result.failed
             
-            if replies_response["ok"]:
-                messages_to_delete = replies_response["messages"]
-                logger.info(f"Found {len(messages_to_delete)} messages to delete (including original)")
-                
-                successful_deletions = 0
-                failed_deletions = 0
-                
-                # Delete all messages in reverse order (replies first, then original)
-                for msg in reversed(messages_to_delete):
-                    msg_ts = msg.get("ts", "")
-                    msg_author = msg.get("user", "")
-                    
-                    # For each message, determine if we can delete it
-                    if delete_client == user_client:
-                        # With user token, all users can delete any message
-                        can_delete_this = True
-                    else:
-                        # With bot token, allow all users to delete any message (bot will handle what it can delete)
-                        can_delete_this = True
-                    
-                    if not can_delete_this:
-                        logger.info(f"Skipping message {msg_ts} - insufficient permissions to delete message from user {msg_author}")
-                        failed_deletions += 1
-                        continue
-                    
-                    try:
-                        # Delete the message
-                        delete_response = delete_client.chat_delete(
-                            channel=channel_id,
-                            ts=msg_ts
-                        )
-                        
-                        if delete_response["ok"]:
-                            logger.info(f"Successfully deleted message with ts: {msg_ts}")
-                            successful_deletions += 1
-                        else:
-                            error_msg = delete_response.get('error', 'Unknown error')
-                            logger.error(f"Failed to delete message with ts: {msg_ts}. Error: {error_msg}")
-                            
-                            # Handle specific error cases
-                            if error_msg == "cant_delete_message":
-                                logger.info(f"Cannot delete message {msg_ts} - insufficient permissions or message too old")
-                            failed_deletions += 1
-                            
-                    except Exception as e:
-                        logger.error(f"Exception while deleting message {msg_ts}: {e}")
-                        failed_deletions += 1
-                
-                # Log results but don't send confirmation messages
-                logger.info(f"Deletion complete - Success: {successful_deletions}, Failed: {failed_deletions}")
-                
-                # Only send message if there were failures (to inform user of issues)
-                if failed_deletions > 0 and successful_deletions == 0:
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text="❌ No messages could be deleted. You may not have permission to delete these messages, or they may be too old to delete."
-                    )
+            # Log results but don't send confirmation messages
+            logger.info(f"Deletion complete - Success: {successful_deletions}, Failed: {failed_deletions}, API calls: {current_budget().summary(successful_deletions)}")
+            
+            # Only send message if there were failures (to inform user of issues)
+            if failed_deletions > 0 and successful_deletions == 0:
+                tell_requester("❌ No messages could be deleted. You may not have permission to delete these messages, or they may be too old to delete.")
                 
-            else:
-                logger.error(f"Failed to get replies: {replies_response.get('error', 'Unknown error')}")
-                # Try to delete just the original message
-                if can_delete:
-                    delete_response = delete_client.chat_delete(
-                        channel=channel_id,
-                        ts=message_ts
-                    )
-                    
-                    if delete_response["ok"]:
-                        logger.info("Successfully deleted single message")
-                    else:
-                        error_msg = delete_response.get('error', 'Unknown error')
-                        logger.error(f"Failed to delete message: {error_msg}")
-                        client.chat_postEphemeral(
-                            channel=channel_id,
-                            user=user_id,
-                            text=f"❌ Failed to remove message: {error_msg}"
-                        )
-                else:
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text="❌ You don't have permission to delete this message."
-                    )
-                    
         except Exception as e:
             logger.error(f"Error getting replies: {e}")
             # Fallback: try to delete just the original message
@@ -316,68 +330,243 @@ def handle_message_action(ack, body, client, logger):
                     
                     if delete_response["ok"]:
                         logger.info("Successfully deleted fallback message")
+                        thread_flights.remember(channel_id, message_ts)
                     else:
                         error_msg = delete_response.get('error', 'Unknown error')
                         logger.error(f"Failed to delete fallback message: {error_msg}")
                         if error_msg == "cant_delete_message":
-                            client.chat_postEphemeral(
-                                channel=channel_id,
-                                user=user_id,
-                                text="❌ Cannot delete this message. You may not have permission or the message may be too old."
-                            )
+                            tell_requester("❌ Cannot delete this message. You may not have permission or the message may be too old.")
                         else:
-                            client.chat_postEphemeral(
-                                channel=channel_id,
-                                user=user_id,
-                                text=f"❌ Failed to remove message: {error_msg}"
-                            )
+                            tell_requester(f"❌ Failed to remove message: {error_msg}")
                 except Exception as delete_error:
                     logger.error(f"Error deleting original message: {delete_error}")
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text="❌ Failed to remove message due to an error."
-                    )
+                    tell_requester("❌ Failed to remove message due to an error.")
             else:
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text="❌ You don't have permission to delete this message."
-                )
+                tell_requester("❌ You don't have permission to delete this message.")
         
     except Exception as e:
         logger.error(f"Error handling message action: {e}")
+        outcome = "❌ An error occurred while processing your request."
         # Try to send error message to user
         try:
             client.chat_postEphemeral(
                 channel=body.get("channel", {}).get("id", ""),
                 user=body.get("user", {}).get("id", ""),
-                text="❌ An error occurred while processing your request."
+                text=outcome
             )
         except:
             pass
+    finally:
+        if thread_key is not None:
+            # Kept unrenewed until it expires so a stale duplicate request does not delete the thread again
+            coordinator.release(thread_key, linger=True)
+        if flight_owned:
+            thread_flights.finish(channel_id, message_ts, outcome)
+
+def remember_deleted(channel_id):
+    """on_outcome callback recording every message of the channel that is gone in thread_flights"""
+    def record(ts, error):
+        if error is None:
+            thread_flights.remember(channel_id, ts)
+    return record
+
+def attach_to_flight(client, channel_id, user_id, flight):
+    """Tell a duplicate requester about the deletion it attached to, the way its owner's requester is told.
+
+    Nothing is posted when the deletion succeeded, as for the owner. The listener returns right away;
+    the outcome is posted from the owner's thread when it finishes.
+    """
+    def post(text):
+        try:
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        except Exception as e:
+            logger.error(f"Error posting deletion outcome: {e}")
+    
+    if flight.job is not None:
+        post(f"ℹ️ This thread is already being deleted in the background (job `{flight.job.id}`).")
+    flight.future.add_done_callback(lambda future: future.result() and post(future.result()))
+
+def make_status_updater(client, channel_id, user_id, response_url=None):
+    """Build update(text, final=False) that keeps the requester's status in one ephemeral message.
+
+    With a response_url each update replaces the previous one. Slack allows five posts per response_url,
+    so progress updates stop after the fourth and the fifth is kept for the final status. Without one,
+    only the first update and the final one are posted, as separate ephemeral messages.
+    """
+    respond = Respond(response_url=response_url) if response_url else None
+    limit = RESPONSE_URL_MAX_POSTS if respond is not None else 2
+    posts = [0]
+    lock = threading.Lock()
+    
+    def update(text, final=False):
+        with lock:
+            if posts[0] >= (limit if final else limit - 1):
+                return
+            replace = posts[0] > 0
+            posts[0] += 1
+        try:
+            if respond is not None:
+                respond(text=text, response_type="ephemeral", replace_original=replace)
+            else:
+                client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        except Exception as e:
+            logger.error(f"Error updating deletion status: {e}")
+    return update
+
+def hand_off_large_thread(client, delete_client, body, message_ts, replies):
+    """Queue delete_large_thread for a shortcut's thread, in place of the listener deleting it, and return its Job.
+
+    The requester is waiting on it, so it runs as interactive work on the job engine's interactive pool
+    rather than behind the bulk sweeps.
+    """
+    channel_id = body["channel"]["id"]
+    user_id = body["user"]["id"]
+    # Stop renewing the listener's thread lease before the job can take it over, so this never undoes the job's
+    coordinator.release(f"thread:{channel_id}:{message_ts}", linger=True)
+    status = make_status_updater(client, channel_id, user_id, body.get("response_url"))
+    
+    def done(job):
+        # delete_large_thread finishes the flight itself; a job cancelled while queued never ran it
+        if job.started_at is None:
+            text = f"🛑 Thread deletion `{job.id}` cancelled before it started. The thread was kept."
+            status(text, final=True)
+            thread_flights.finish(channel_id, message_ts, text)
+    
+    job = job_engine.submit(
+        delete_large_thread, channel_id, user_id, f"thread {message_ts}",
+        delete_client, message_ts, replies, status,
+        on_progress=lambda job: status(f"⏳ {job.summary()}"), priority=INTERACTIVE, on_done=done
+    )
+    logger.info(f"Thread {message_ts} is large, deleting it in job {job.id}")
+    return job
+
+@traced("job.large_thread", root=True)
+def delete_large_thread(job, delete_client, message_ts, replies, status):
+    """Delete a large thread on a job engine worker, streaming its replies into the deletion workers.
+
+    replies yields reply timestamps and fetches conversations.replies pages as the workers ask for
+    more, so deletes start with the first page and only one page is held at a time. The parent goes
+    last, and is left in place if the job is cancelled or the replies could not all be listed.
+
+    The shortcut stopped renewing its thread lease when it handed off, and the job takes it again here.
+    This process still owns it, so that only fails if the job waited in the queue until the lease
+    expired and another worker took the thread. The job also owns the thread's entry in thread_flights
+    from the hand-off on, and gives requests attached to it the final status.
+    """
+    channel_id = job.channel_id
+    outcome = None
+    try:
+        outcome = _delete_large_thread(job, delete_client, message_ts, replies, status)
+    finally:
+        thread_flights.finish(channel_id, message_ts, outcome)
+
+def _delete_large_thread(job, delete_client, message_ts, replies, status):
+    # Returns the final status posted to the requester
+    channel_id = job.channel_id
+    listing_errors = []
+    lock = threading.Lock()
+    thread_key = f"thread:{channel_id}:{message_ts}"
+    if not coordinator.try_acquire(thread_key):
+        logger.info(f"Thread {message_ts} is already being deleted by another worker, skipping")
+        status("ℹ️ This thread is already being deleted by another worker.", final=True)
+        return "ℹ️ This thread is already being deleted by another worker."
+    status(f"🗑️ Deleting a large thread in the background (job `{job.id}`). Use `/remove-orphaned-messages cancel {job.id}` to stop it.")
+    
+    def stream():
+        try:
+            for ts in replies:
+                if job.cancelled:
+                    return
+                with lock:
+                    job.progress["scanned"] += 1
+                yield ts
+        except Exception as e:
+            logger.error(f"Error listing replies of thread {message_ts}: {e}")
+            listing_errors.append(e)
+    
+    remember = remember_deleted(channel_id)
+    
+    def record(ts, error):
+        remember(ts, error)
+        with lock:
+            job.progress["successful" if error is None else "failed"] += 1
+            job.progress["api_calls"] = job.budget.total
+        job.report_progress()
+    
+    try:
+        deletion_executor.submit_thread(delete_client, channel_id, None, stream(), logger, on_outcome=record).result()
+        if not job.cancelled and not listing_errors:
+            deletion_executor.submit_thread(delete_client, channel_id, message_ts, logger=logger, on_outcome=record).result()
+    finally:
+        coordinator.release(thread_key, linger=True)
+    
+    progress = job.progress
+    current_span().set_attributes(progress)
+    if job.cancelled:
+        text = f"🛑 Thread deletion `{job.id}` cancelled: {progress['successful']} deleted, {progress['failed']} failed. The parent message was kept."
+    elif listing_errors:
+        job.status = FAILED
+        job.error = str(listing_errors[0])
+        text = f"⚠️ Could not list every reply ({progress['successful']} deleted, {progress['failed']} failed). The parent message was kept; run the shortcut again to finish."
+    elif progress["failed"]:
+        text = f"⚠️ Thread deleted with errors: {progress['successful']} deleted, {progress['failed']} failed."
+    else:
+        text = f"✅ Thread deleted: {progress['successful']} messages removed."
+    status(text, final=True)
+    return text
+
+def submit_orphaned_thread(delete_client, channel_id, msg_ts, logger, on_outcome=None, has_replies=True, reply_ts_list=None):
+    """Queue deletion of an orphaned parent message and all of its replies on the deletion executor.
+    
+    Pass has_replies=False when the history metadata shows the parent has no replies, or the known
+    reply_ts_list, so the conversations.replies lookup is skipped. Returns a Future resolving to the
+    thread's DeletionResult.
+    """
+    if reply_ts_list is not None:
+        return deletion_executor.submit_thread(delete_client, channel_id, msg_ts, reply_ts_list, logger, on_outcome=on_outcome)
+    
+    if not has_replies:
+        return deletion_executor.submit_thread(delete_client, channel_id, msg_ts, logger=logger, on_outcome=on_outcome)
+    
+    # Get every page of replies to this message
+    replies_calls = 0
+    try:
+        reply_ts_list = []
+        with start_span("thread.expand", thread_ts=msg_ts) as span:
+            for page in iter_thread_replies(delete_client, channel_id, msg_ts):
+                replies_calls += 1
+                reply_ts_list.extend(thread_msg.get("ts", "") for thread_msg in page)
+            span.set_attributes({"replies": len(reply_ts_list), "pages": replies_calls})
+        
+        log_sampled(logger, "orphaned_thread", "Found %d messages to delete for orphaned thread %s (including original)", len(reply_ts_list) + 1, msg_ts)
+        return deletion_executor.submit_thread(delete_client, channel_id, msg_ts, reply_ts_list, logger, on_outcome=on_outcome, api_calls=replies_calls)
+    
+    except Exception as e:
+        logger.error(f"Error getting replies for orphaned message {msg_ts}: {e}")
+    
+    # Fallback: try to delete just the original message
+    return deletion_executor.submit_thread(delete_client, channel_id, msg_ts, logger=logger, on_outcome=on_outcome, api_calls=replies_calls + 1)
 
 @app.command("/remove-orphaned-messages")
+@timed_handler("remove_orphaned_messages_command")
+@traced_handler("remove_orphaned_messages_command")
 def handle_remove_messages_command(ack, body, client, logger, command):
     """Handle the /remove-orphaned-messages slash command"""
     ack()
     
-    print("🗑️ /remove-orphaned-messages command triggered!")
-    
     try:
         user_id = body["user_id"]
         channel_id = body["channel_id"]
         command_text = command.get("text", "").strip()
         
-        print(f"User: {user_id}, Channel: {channel_id}, Text: '{command_text}'")
         logger.info(f"Remove orphaned messages command triggered by user {user_id} in channel {channel_id} with text: {command_text}")
         
         # Check user permissions
         try:
-            user_info = client.users_info(user=user_id)
-            is_admin = user_info.get("user", {}).get("is_admin", False)
-            is_owner = user_info.get("user", {}).get("is_owner", False)
-            is_primary_owner = user_info.get("user", {}).get("is_primary_owner", False)
+            user_data = user_cache.get(client, user_id)
+            is_admin = user_data.get("is_admin", False)
+            is_owner = user_data.get("is_owner", False)
+            is_primary_owner = user_data.get("is_primary_owner", False)
             
             has_admin_perms = is_admin or is_owner or is_primary_owner
             
@@ -398,55 +587,69 @@ def handle_remove_messages_command(ack, body, client, logger, command):
             )
             return
         
-        # Parse time period
-        import time
-        from datetime import datetime, timedelta
+        # Job management subcommands
+        subcommand, _, job_id = command_text.partition(" ")
+        workspace_wide = subcommand.lower() == "all"
+        if workspace_wide:
+            if not has_admin_perms:
+                client.chat_postEphemeral(
+                    channel=channel_id,
+                    user=user_id,
+                    text="❌ Only workspace admins can clean up every channel at once."
+                )
+                return
+            command_text = job_id.strip()
         
-        def parse_time_period(text):
-            """Parse time period like '1 hour', '2 days', '30 minutes' into seconds"""
-            text = text.strip()  # Don't convert to lowercase yet
-            
-            # Common patterns - check case-sensitive patterns first, then case-insensitive
-            patterns = [
-                # Single letter formats (both upper and lower case)
-                (r'^(\d+)[Hh]$', 3600),                   # 2H, 2h, 24H, 24h
-                (r'^(\d+)[Dd]$', 86400),                  # 1D, 1d, 7D, 7d
-                (r'^(\d+)[Mm]$', 60),                     # 30M, 30m, 45M, 45m
-                
-                # Word formats with optional 's' (case-insensitive)
-                (r'^(\d+)\s*h(?:our)?s?$', 3600),          # 1h, 2hours, 3 hour
-                (r'^(\d+)\s*m(?:in)?(?:ute)?s?$', 60),     # 1m, 30min, 45 minutes
-                (r'^(\d+)\s*d(?:ay)?s?$', 86400),          # 1d, 2days, 3 day
-            ]
-            
-            for i, (pattern, multiplier) in enumerate(patterns):
-                if i < 3:  # First 3 patterns are case-sensitive
-                    match = re.match(pattern, text)
-                else:  # Rest are case-insensitive
-                    match = re.match(pattern, text.lower())
-                if match:
-                    return int(match.group(1)) * multiplier
-            
-            return None
+        if subcommand.lower() == "status":
+            job_id = job_id.strip()
+            jobs = [job_engine.get(job_id)] if job_id else job_engine.list_jobs(channel_id=channel_id)
+            jobs = [job for job in jobs if job is not None]
+            if jobs:
+                text = "*🗑️ Cleanup jobs:*\n" + "\n".join(f"• {job.summary()}" for job in jobs)
+            elif job_id and coordinator.holder(f"job:{job_id}"):
+                text = f"ℹ️ Job `{job_id}` is running on another worker (`{coordinator.holder(f'job:{job_id}')}`)."
+            else:
+                text = f"ℹ️ No cleanup job found with ID `{job_id}`." if job_id else "ℹ️ No cleanup jobs in this channel."
+            client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=text
+            )
+            return
         
-        seconds = parse_time_period(command_text)
-        if seconds is None:
+        if subcommand.lower() == "cancel":
+            job_id = job_id.strip()
+            job = job_engine.cancel(job_id) if job_id else None
+            if job is None and job_id and coordinator.request_cancel(job_id):
+                logger.info(f"User {user_id} asked another worker to cancel job {job_id}")
+                text = f"🛑 Cancelling job `{job_id}` on another worker. Deletions already in progress will finish."
+            elif job is None:
+                text = f"❌ No cleanup job found with ID `{job_id}`." if job_id else "❌ Usage: `/remove-orphaned-messages cancel <job_id>`"
+            elif job.finished:
+                text = f"ℹ️ Job `{job.id}` already {job.status}."
+            else:
+                logger.info(f"User {user_id} cancelled job {job.id}")
+                text = f"🛑 Cancelling job `{job.id}`. Deletions already in progress will finish."
             client.chat_postEphemeral(
                 channel=channel_id,
                 user=user_id,
-                text=get_invalid_time_format_error(command_text)
+                text=text
             )
             return
         
-        # Calculate cutoff time with a small buffer to include recent messages
-        current_time = time.time()
-        cutoff_time = current_time - seconds - 30  # Add 30 second buffer
-        cutoff_datetime = datetime.fromtimestamp(cutoff_time)
-        current_datetime = datetime.fromtimestamp(current_time)
+        # Parse the time window; relative windows already reach 30 seconds further back to include recent messages
+        window = parse_time_window(command_text)
+        if window is None:
+            client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=get_invalid_time_format_error(command_text)
+            )
+            return
         
-        logger.info(f"Current time: {current_datetime} (timestamp: {current_time})")
-        logger.info(f"Cutoff time: {cutoff_datetime} (timestamp: {cutoff_time}) - with 30s buffer")
-        logger.info(f"Looking for messages newer than {cutoff_datetime} ({command_text} ago + 30s buffer)")
+        cutoff_time, latest_time = window.oldest, window.latest
+        latest_datetime = datetime.fromtimestamp(latest_time) if latest_time is not None else "now"
+        logger.info(f"Looking for messages between {datetime.fromtimestamp(cutoff_time)} (timestamp: {cutoff_time}) and {latest_datetime} (timestamp: {latest_time})")
         
         # Determine which client to use for deletion - prefer user token if available
         if user_client:
@@ -464,48 +667,413 @@ def handle_remove_messages_command(ack, body, client, logger, command):
                 text="⚠️ User token not configured. Bot will attempt to delete messages but may be limited by Slack API permissions. See README for user token setup."
             )
         
-        # Get messages from the time period
-        try:
-            # Get channel history from the cutoff time
-            logger.info(f"Retrieving messages since {cutoff_datetime} (timestamp: {cutoff_time})")
-            
-            # Format the timestamp properly for Slack API (string with 6 decimal places)
-            oldest_param = f"{cutoff_time:.6f}"
-            logger.info(f"API call parameters - oldest: '{oldest_param}', inclusive: True")
-            
-            history_response = delete_client.conversations_history(
+        # Run the sweep on the job engine so this listener thread is released right away
+        display_time = window.description
+        
+        if workspace_wide:
+            job = job_engine.submit(
+                run_workspace_sweep, channel_id, user_id, f"all channels, {display_time}",
+                client, delete_client, command_text, cutoff_time,
+                on_progress=make_progress_poster(client, body.get("response_url")),
+                latest_time=latest_time
+            )
+            client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=f"🗑️ Started workspace cleanup job `{job.id}` for orphaned messages from {display_time} in every channel. Use `/remove-orphaned-messages cancel {job.id}` to stop it."
+            )
+            return
+        
+        # Requests covered by a sweep of this channel join it instead of scanning the same history again
+        window, new, joined = sweep_planner.plan(channel_id, cutoff_time, latest_time, command_text, user_id)
+        if not new:
+            job_ref = f" `{window.job.id}`" if window.job is not None else ""
+            logger.info(f"Request for {display_time} in channel {channel_id} joined cleanup job{job_ref}")
+            client.chat_postEphemeral(
                 channel=channel_id,
-                oldest=oldest_param,
-                inclusive=True,  # Include messages with exact timestamp
-                limit=1000  # Slack API limit
+                user=user_id,
+                text=f"🔗 Cleanup job{job_ref} in this channel already covers orphaned messages from {display_time}. You will get its results too."
+            )
+            return
+        
+        if joined:
+            display_time = describe_time_window(window.command_text)
+        job = job_engine.submit(
+            run_orphan_sweep, channel_id, user_id, display_time,
+            client, delete_client, window.command_text, window.oldest,
+            on_progress=make_progress_poster(client, body.get("response_url")),
+            on_done=finish_unstarted_window(client, window),
+            latest_time=window.latest,
+            window=window
+        )
+        window.job = job
+        
+        text = f"🗑️ Started cleanup job `{job.id}` for orphaned messages from {display_time}. Use `/remove-orphaned-messages cancel {job.id}` to stop it."
+        if joined:
+            job_refs = ", ".join(f"`{running.job.id}`" for running in joined if running.job is not None)
+            text += f" Newer messages are already being cleaned up by job {job_refs}, and you will get its results too."
+        client.chat_postEphemeral(
+            channel=channel_id,
+            user=user_id,
+            text=text
+        )
+        
+    except Exception as e:
+        logger.error(f"Error handling remove-orphaned-messages command: {e}")
+        try:
+            client.chat_postEphemeral(
+                channel=body.get("channel_id", ""),
+                user=body.get("user_id", ""),
+                text="❌ An error occurred while processing your request."
+            )
+        except:
+            pass
+
+def make_progress_poster(client, response_url=None, channel_id=None):
+    """Build a job progress callback that posts the job summary to the requester at milestones.
+
+    An update goes out the first time the job reports progress and then each time its run time has
+    doubled, so a long sweep sends a handful of updates rather than one every JOB_PROGRESS_INTERVAL.
+    With the slash command's response_url each update replaces the previous one, as long as Slack
+    accepts more posts to it. Without one, updates go to channel_id (the job's channel by default). The
+    final result is posted by the job itself.
+    """
+    respond = Respond(response_url=response_url) if response_url else None
+    state = {"posts": 0, "next_milestone": 0.0}
+    lock = threading.Lock()
+    
+    def post_progress(job):
+        elapsed = time.time() - (job.started_at or job.created_at)
+        with lock:
+            if elapsed < state["next_milestone"]:
+                return
+            state["next_milestone"] = elapsed * 2
+            replace = state["posts"] > 0
+            in_place = respond is not None and state["posts"] < RESPONSE_URL_MAX_POSTS
+            state["posts"] += 1
+        text = f"⏳ {job.summary()}"
+        if in_place:
+            respond(text=text, response_type="ephemeral", replace_original=replace)
+        else:
+            client.chat_postEphemeral(channel=channel_id or job.channel_id, user=job.user_id, text=text)
+    return post_progress
+
+def window_notifier(client, window):
+    """notify callback posting to every requester of a planned sweep"""
+    def notify(text):
+        for user_id in dict.fromkeys(list(window.requesters)):
+            try:
+                client.chat_postEphemeral(channel=window.channel_id, user=user_id, text=text)
+            except Exception as e:
+                logger.error(f"Error notifying {user_id} about cleanup job: {e}")
+    return notify
+
+def finish_unstarted_window(client, window):
+    """on_done callback for a planned sweep's job.
+
+    A job cancelled while queued never runs run_orphan_sweep, so its requesters are told here and the
+    window leaves the plan.
+    """
+    def done(job):
+        if job.started_at is None:
+            window_notifier(client, window)(f"🛑 Cleanup job `{job.id}` cancelled before it started.")
+            sweep_planner.finish(window)
+    return done
+
+@traced("job.orphan_sweep", root=True)
+def run_orphan_sweep(job, client, delete_client, command_text, cutoff_time, latest_time=None, checkpoint=None, notify=None, window=None,
+                     kind=SWEEP_JOB, reply_channel_id=None):
+    """Scan the channel history between cutoff_time and latest_time (None for now) and delete every orphaned thread, on a job engine worker.
+
+    The scan cursor, orphaned threads not yet deleted and every delete outcome are saved to the job
+    store, and passing a saved checkpoint resumes the job from there instead of rescanning the window.
+    kind is saved with the checkpoint so resume_unfinished_jobs restarts the job the way it was started,
+    and reply_channel_id so a resumed job reports where it was requested (e.g. a workspace sweep's channel).
+    Messages for the requester go to notify(text), an ephemeral post in the channel by default.
+    A job planned by sweep_planner passes its window instead: the job scans the window as it stands
+    once the job starts, and reports to everyone who joined it.
+
+    The job runs while holding its job lease and its channel's lease, so no other process runs it and
+    no other job sweeps the channel at the same time; it waits for a channel another job is sweeping.
+    """
+    if window is not None:
+        notify = window_notifier(client, window)
+    if notify is None:
+        notify = lambda text: client.chat_postEphemeral(channel=reply_channel_id or job.channel_id, user=job.user_id, text=text)
+    owner = coordinator.owner_for(job.id)
+    job_key = f"job:{job.id}"
+    channel_key = f"channel:{job.channel_id}"
+    
+    try:
+        if not coordinator.try_acquire(job_key, owner):
+            logger.info(f"Job {job.id} is already running on worker {coordinator.holder(job_key)}")
+            job.status = CANCELLED
+            job.error = "running on another worker"
+            if window is not None:
+                notify(f"ℹ️ Cleanup job `{job.id}` is already running on another worker.")
+            return
+        try:
+            if not coordinator.try_acquire(channel_key, owner):
+                logger.info(f"Job {job.id} waiting for {coordinator.holder(channel_key)} to finish sweeping channel {job.channel_id}")
+                notify(f"⏳ Cleanup job `{job.id}` will start once the cleanup already running in this channel finishes.")
+                if not coordinator.acquire(channel_key, owner, cancelled=lambda: job.cancelled):
+                    # A resumed job is still unfinished in the store; mark it so nobody adopts it again
+                    job_store.finish_job(job.id, CANCELLED)
+                    notify(f"🛑 Cleanup job `{job.id}` cancelled before it started.")
+                    return
+            try:
+                if window is not None:
+                    # Requests that joined while the job was queued may have widened it
+                    cutoff_time, latest_time, command_text = sweep_planner.start(window)
+                    job.description = describe_time_window(command_text)
+                sweep_channel_history(job, client, delete_client, command_text, cutoff_time, latest_time, checkpoint, notify, kind,
+                                      reply_channel_id)
+            finally:
+                coordinator.release(channel_key, owner)
+        finally:
+            coordinator.release(job_key, owner)
+    finally:
+        # Requesters who joined the window are told above whichever way the job ends
+        if window is not None:
+            sweep_planner.finish(window)
+
+def sweep_channel_history(job, client, delete_client, command_text, cutoff_time, latest_time, checkpoint, notify, kind, reply_channel_id):
+    """Body of run_orphan_sweep, run once the job holds its leases"""
+    channel_id = job.channel_id
+    owner = coordinator.owner_for(job.id)
+    cutoff_datetime = datetime.fromtimestamp(cutoff_time)
+    current_span().set_attributes({"job_id": job.id, "channel": channel_id, "resumed": checkpoint is not None})
+    
+    # Threads newer than covered_since are known from message events, so only older history has to be scanned
+    covered_since = orphan_index.covered_since(channel_id) if checkpoint is None else None
+    index_covers_window = covered_since is not None and covered_since <= cutoff_time
+    
+    if checkpoint is None:
+        # History only has to cover the part of the window before the index took over
+        latest = latest_time
+        if covered_since is not None and not index_covers_window:
+            latest = covered_since if latest_time is None else min(latest_time, covered_since)
+        job_store.create_job(job, command_text, cutoff_time, latest, kind, reply_channel_id)
+    else:
+        latest = checkpoint["latest"]
+    
+    # Get messages from the time period
+    try:
+        # Get channel history from the cutoff time
+        logger.info(f"Retrieving messages since {cutoff_datetime} (timestamp: {cutoff_time}) up to {latest!r}")
+        
+        # Format the timestamp properly for Slack API (string with 6 decimal places)
+        oldest_param = f"{cutoff_time:.6f}"
+        latest_param = f"{latest:.6f}" if latest is not None else None
+        logger.info(f"API call parameters - oldest: '{oldest_param}', latest: {latest_param!r}, inclusive: True")
+        
+        display_time = describe_time_window(command_text)
+        
+        successful_deletions = 0
+        failed_deletions = 0
+        skipped_deletions = 0
+        total_processed = 0
+        orphaned_messages_found = 0
+        messages_scanned = 0
+        history_calls = 0
+        pending_threads = PendingLimit(SWEEP_PENDING_THREADS)
+        # Totals of every finished thread, for progress updates and the final summary
+        live_totals = DeletionResult()
+        
+        if checkpoint is not None:
+            # Count what the interrupted run already deleted so the final summary covers the whole job
+            successful_deletions, failed_deletions = job_store.outcome_counts(job.id)
+            live_totals.successful, live_totals.failed = successful_deletions, failed_deletions
+        
+        remember = remember_deleted(channel_id)
+        
+        def record_outcome(ts, error):
+            job_store.record_outcome(job.id, ts, error)
+            remember(ts, error)
+        
+        def thread_finished(thread_ts, future):
+            try:
+                coordinator.release(f"thread:{channel_id}:{thread_ts}", owner, linger=True)
+                thread_result = future.result()
+                live_totals.merge(thread_result)
+                job_store.complete_thread(job.id, thread_ts)
+                if thread_result.failed == 0:
+                    orphan_index.forget(channel_id, thread_ts)
+            finally:
+                pending_threads.release()
+        
+        def queue_thread(thread_ts, has_replies=True, reply_ts_list=None):
+            if not coordinator.try_acquire(f"thread:{channel_id}:{thread_ts}", owner):
+                # A shortcut or another worker is already deleting this thread
+                log_sampled(logger, "thread_claimed", "Thread %s is already being deleted by another worker, skipping", thread_ts)
+                job_store.complete_thread(job.id, thread_ts)
+                return
+            # Waits here while SWEEP_PENDING_THREADS threads are still being deleted
+            pending_threads.acquire()
+            try:
+                thread_future = submit_orphaned_thread(
+                    delete_client, channel_id, thread_ts, logger,
+                    on_outcome=record_outcome, has_replies=has_replies, reply_ts_list=reply_ts_list
+                )
+            except Exception:
+                pending_threads.release()
+                raise
+            thread_future.add_done_callback(lambda future: thread_finished(thread_ts, future))
+        
+        def update_progress():
+            job.progress.update(
+                scanned=messages_scanned,
+                orphaned=orphaned_messages_found,
+                successful=live_totals.successful,
+                failed=live_totals.failed,
+                api_calls=job.budget.total
             )
+            job.report_progress()
+        
+        try:
+            start_cursor = None
+            scan_complete = False
             
-            logger.info(f"API Response: {history_response.get('ok')}, Messages count: {len(history_response.get('messages', []))}")
+            if checkpoint is not None:
+                start_cursor = checkpoint["cursor"]
+                scan_complete = bool(checkpoint["scan_complete"])
+                already_deleted = job_store.deleted_ts(job.id)
+                
+                # Finish the threads the interrupted run had found but not yet deleted
+                resumed_threads = job_store.pending_threads(job.id)
+                logger.info(f"Resuming job {job.id} with {len(resumed_threads)} pending threads from cursor {start_cursor!r}")
+                orphaned_messages_found += len(resumed_threads)
+                for thread_ts in resumed_threads:
+                    if thread_ts in already_deleted:
+                        job_store.complete_thread(job.id, thread_ts)
+                    else:
+                        queue_thread(thread_ts)
             
-            # If no messages with inclusive=True, try without it
-            if history_response.get('ok') and len(history_response.get('messages', [])) == 0:
-                logger.info("Trying API call without inclusive parameter...")
-                history_response_2 = delete_client.conversations_history(
-                    channel=channel_id,
-                    oldest=oldest_param,
-                    limit=1000
-                )
-                logger.info(f"API Response (no inclusive): {history_response_2.get('ok')}, Messages count: {len(history_response_2.get('messages', []))}")
+            if covered_since is not None:
+                # Answer the covered part of the window from the index without any history calls
+                index_threads = orphan_index.candidates(channel_id, oldest=max(cutoff_time, covered_since), latest=latest_time)
+                logger.info(f"Orphan index covers channel {channel_id} since {datetime.fromtimestamp(covered_since)}: {len(index_threads)} orphaned threads indexed")
+                orphaned_messages_found += len(index_threads)
+                job_store.add_pending_threads(job.id, [thread_ts for thread_ts, _ in index_threads])
+                for thread_ts, reply_ts_list in index_threads:
+                    queue_thread(thread_ts, reply_ts_list=reply_ts_list)
+                
+                if index_covers_window:
+                    scan_complete = True
+                    job_store.checkpoint(job.id, None, scan_complete=True)
+            
+            # Stream every history page in the window so orphans are handled while later pages are still arriving;
+            # diagnostics mode retries an empty window without inclusive
+            for inclusive in ((True, None) if SWEEP_DIAGNOSTICS else (True,)):
+                if scan_complete:
+                    break
+                
+                for page in iter_history_pages(delete_client, channel_id, oldest=oldest_param, latest=latest_param, inclusive=inclusive, cursor=start_cursor):
+                    history_calls += 1
+                    page_threads = []
+                    
+                    for msg in page:
+                        if job.cancelled:
+                            logger.info(f"Job {job.id} cancelled after scanning {messages_scanned} messages")
+                            break
+                        
+                        messages_scanned += 1
+                        update_progress()
+                        
+                        if msg.get("subtype") != "tombstone":
+                            continue
+                        
+                        orphaned_messages_found += 1
+                        msg_ts = msg.get("ts", "")
+                        msg_author = msg.get("user", "")
+                        
+                        # Per-message lines are sampled and lazily formatted; full dicts only with LOG_PAYLOADS
+                        log_sampled(logger, "orphaned_message", "Processing orphaned message from %s at %s", msg_author, msg_ts)
+                        log_payload(logger, "Orphaned message", msg)
+                        
+                        # Skip only if it's the actual command message itself (has slash command indicator)
+                        if msg.get("subtype") == "bot_message" and "/remove-orphaned-messages" in msg.get("text", ""):
+                            logger.info(f"Skipping the command message itself at {msg_ts}")
+                            continue
+                        
+                        total_processed += 1
+                        
+                        # For each message, determine if we can delete it
+                        if delete_client == user_client:
+                            # With user token, all users can delete any message
+                            can_delete_this = True
+                        else:
+                            # With bot token, allow all users to try (bot will handle what it can delete)
+                            can_delete_this = True
+                        
+                        if not can_delete_this:
+                            logger.info(f"Skipping message {msg_ts} - insufficient permissions to delete message from user {msg_author}")
+                            skipped_deletions += 1
+                            continue
+                        
+                        # Resumed threads have no history metadata, so only fresh ones can skip the replies lookup
+                        page_threads.append((msg_ts, has_thread_replies(msg)))
+                    
+                    # Persist this page's orphans before queueing them so a restart picks up where this left off
+                    job_store.add_pending_threads(job.id, [thread_ts for thread_ts, _ in page_threads])
+                    for thread_ts, has_replies in page_threads:
+                        queue_thread(thread_ts, has_replies)
+                    
+                    if job.cancelled:
+                        break
+                    
+                    job_store.checkpoint(job.id, page.next_cursor, scan_complete=page.next_cursor is None)
+
+                # A resumed scan continues from its cursor, so the empty-window retry only applies to fresh jobs
+                if messages_scanned > 0 or inclusive is None or job.cancelled or checkpoint is not None:
+                    break
                 
-                # If this works better, use it
-                if len(history_response_2.get('messages', [])) > 0:
-                    logger.info("Using results from call without inclusive parameter")
-                    history_response = history_response_2
+                # If no messages with inclusive=True, try without it
+                logger.info("Trying API call without inclusive parameter...")
+            
+        except SlackApiError as e:
+            error_msg = e.response.get('error', 'Unknown error')
+            logger.error(f"API call failed: {error_msg}")
             
-            # Debug: Show first few messages found
-            messages_found = history_response.get('messages', [])
-            if messages_found:
-                logger.info(f"Found {len(messages_found)} messages in time period")
-                for i, msg in enumerate(messages_found[:3]):  # Show first 3 messages
-                    msg_time = datetime.fromtimestamp(float(msg.get('ts', 0)))
-                    logger.info(f"  Message {i+1}: {msg.get('user', 'unknown')} at {msg_time} - {msg.get('text', '[no text]')[:50]}")
+            # Show helpful error message based on the specific error
+            if error_msg == "not_in_channel":
+                notify("❌ The bot needs to be added to this channel first. Please invite the bot to this channel and try again.")
+            elif error_msg == "channel_not_found":
+                notify("❌ Channel not found. The bot may not have access to this channel.")
             else:
-                logger.info("No messages returned by API call")
+                notify(f"❌ Could not retrieve channel history: {error_msg}")
+            job.status = FAILED
+            job.error = error_msg
+            job_store.finish_job(job.id, FAILED)
+            return
+        
+        finally:
+            # Let deletions already queued finish even if the scan stopped early
+            pending_threads.wait_idle()
+            successful_deletions, failed_deletions = live_totals.successful, live_totals.failed
+            job.progress.update(
+                scanned=messages_scanned,
+                orphaned=orphaned_messages_found,
+                successful=successful_deletions,
+                failed=failed_deletions,
+                api_calls=job.budget.total
+            )
+            current_span().set_attributes(job.progress)
+        
+        logger.info(f"Scanned {messages_scanned} messages in time period ({history_calls} history pages), {orphaned_messages_found} orphaned")
+        job_store.finish_job(job.id, CANCELLED if job.cancelled else COMPLETED)
+        
+        if job.budget.exhausted:
+            notify(f"⚠️ Cleanup job `{job.id}` stopped after spending its budget of {job.budget.limit} API calls: {successful_deletions} deleted, {failed_deletions} failed after scanning {messages_scanned} messages.")
+            return
+        
+        if job.cancelled:
+            notify(f"🛑 Cleanup job `{job.id}` cancelled: {successful_deletions} deleted, {failed_deletions} failed after scanning {messages_scanned} messages.")
+            return
+        
+        if messages_scanned == 0 and orphaned_messages_found == 0 and checkpoint is None and not index_covers_window:
+            logger.info("No messages returned by API call")
+            if SWEEP_DIAGNOSTICS:
                 # Try without the oldest parameter to see if we get ANY messages
                 test_response = delete_client.conversations_history(channel=channel_id, limit=5)
                 logger.info(f"Test call (no time filter): {test_response.get('ok')}, Messages: {len(test_response.get('messages', []))}")
@@ -524,254 +1092,200 @@ def handle_remove_messages_command(ack, body, client, logger, command):
                 else:
                     logger.info("No messages in test call either")
             
-            if not history_response["ok"]:
-                error_msg = history_response.get('error', 'Unknown error')
-                logger.error(f"API call failed: {error_msg}")
-                
-                # Show helpful error message based on the specific error
-                if error_msg == "not_in_channel":
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text="❌ The bot needs to be added to this channel first. Please invite the bot to this channel and try again."
-                    )
-                elif error_msg == "channel_not_found":
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text="❌ Channel not found. The bot may not have access to this channel."
-                    )
+            notify(f"ℹ️ No messages found in {display_time}.")
+            return
+        
+        # Check if any orphaned messages were found
+        if orphaned_messages_found == 0:
+            notify(f"ℹ️ No orphaned messages found in {display_time}.")
+            return
+        
+        # Log results and send confirmation
+        logger.info(f"Orphaned messages bulk deletion complete - Success: {successful_deletions}, Failed: {failed_deletions}, Skipped: {skipped_deletions}")
+        
+        # Send summary message only for errors or issues
+        if successful_deletions == 0:
+            if skipped_deletions > 0:
+                if not user_client:
+                    notify(f"⚠️ Found {total_processed} message{'s' if total_processed != 1 else ''} from {display_time}, but user token not configured. Bot attempted deletion but was limited by Slack API permissions. See README for setup instructions.")
                 else:
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text=f"❌ Could not retrieve channel history: {error_msg}"
-                    )
-                return
-            
-            messages_to_process = history_response["messages"]
-            
-            if not messages_to_process:
-                display_time = format_time_period_for_display(command_text)
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text=f"ℹ️ No messages found in the last {display_time}."
-                )
-                return
-            
-            display_time = format_time_period_for_display(command_text)
-            logger.info(f"Found {len(messages_to_process)} orphaned messages from the last {display_time}")
-            
-            successful_deletions = 0
-            failed_deletions = 0
-            skipped_deletions = 0
-            total_processed = 0
-            orphaned_messages_found = 0
+                    notify(f"ℹ️ Found {total_processed} message{'s' if total_processed != 1 else ''} from {display_time}, but couldn't delete them due to API limitations.")
+            else:
+                notify(f"❌ No messages could be deleted from {display_time}. Messages may be too old or you may not have sufficient permissions.")
+        # Only show message if there were significant failures
+        elif failed_deletions > 0 and failed_deletions >= successful_deletions:
+            notify(f"⚠️ Some messages couldn't be deleted: {failed_deletions} failed, {successful_deletions} succeeded from {display_time}.")
             
-            # Process each message
-            for msg in messages_to_process:
-                
-                if msg.get("subtype") != "tombstone":
-                    continue
+    except Exception as e:
+        logger.error(f"Error getting channel history: {e}")
+        notify("❌ An error occurred while trying to retrieve messages from the channel.")
+        job_store.finish_job(job.id, FAILED)
+        raise
 
-                orphaned_messages_found += 1
-                msg_ts = msg.get("ts", "")
-                msg_author = msg.get("user", "")
-                msg_text = msg.get("text", "")[:50] + "..." if msg.get("text") else "[no text]"
-                
-                logger.info(f"Processing orphaned message from {msg_author} at {msg_ts}: {msg_text}")
-                
-                # Convert timestamp to readable format for debugging
-                try:
-                    msg_datetime = datetime.fromtimestamp(float(msg_ts))
-                    logger.info(f"Message time: {msg_datetime} (timestamp: {msg_ts})")
-                except:
-                    logger.info(f"Could not parse message timestamp: {msg_ts}")
-                
-                # Skip only if it's the actual command message itself (has slash command indicator)
-                if msg.get("subtype") == "bot_message" and "/remove-orphaned-messages" in msg.get("text", ""):
-                    logger.info(f"Skipping the command message itself at {msg_ts}")
-                    continue
-                
-                logger.info(f"---------msg_ts: {msg_ts}---------")
-                total_processed += 1
-                
-                # For each message, determine if we can delete it
-                if delete_client == user_client:
-                    # With user token, all users can delete any message
-                    can_delete_this = True
-                    logger.info(f"---------msg_ts: {msg}---------")
-                    logger.info(f"Using user token - All users can delete any message")
-                else:
-                    # With bot token, allow all users to try (bot will handle what it can delete)
-                    can_delete_this = True
-                    logger.info(f"Using bot token - Allowing deletion attempt (bot will handle permissions)")
-                
-                if not can_delete_this:
-                    logger.info(f"Skipping message {msg_ts} - insufficient permissions to delete message from user {msg_author}")
-                    skipped_deletions += 1
-                    continue
-                
-                # Get all replies to this message (including the original message)
-                try:
-                    replies_response = delete_client.conversations_replies(
-                        channel=channel_id,
-                        ts=msg_ts
-                    )
-                    
-                    if replies_response["ok"]:
-                        messages_to_delete = replies_response["messages"]
-                        logger.info(f"Found {len(messages_to_delete)} messages to delete for orphaned thread {msg_ts} (including original)")
-                        
-                        # Delete all messages in reverse order (replies first, then original)
-                        thread_successful = 0
-                        thread_failed = 0
-                        
-                        for thread_msg in reversed(messages_to_delete):
-                            thread_msg_ts = thread_msg.get("ts", "")
-                            thread_msg_author = thread_msg.get("user", "")
-                            
-                            # Check permissions for each message in the thread
-                            if delete_client == user_client:
-                                can_delete_thread_msg = True
-                            else:
-                                can_delete_thread_msg = True
-                            
-                            if not can_delete_thread_msg:
-                                logger.info(f"Skipping thread message {thread_msg_ts} - insufficient permissions")
-                                thread_failed += 1
-                                continue
-                            
-                            try:
-                                # Delete the message
-                                delete_response = delete_client.chat_delete(
-                                    channel=channel_id,
-                                    ts=thread_msg_ts
-                                )
-                                
-                                if delete_response["ok"]:
-                                    logger.info(f"Successfully deleted orphaned thread message with ts: {thread_msg_ts}")
-                                    thread_successful += 1
-                                else:
-                                    error_msg = delete_response.get('error', 'Unknown error')
-                                    logger.error(f"Failed to delete thread message with ts: {thread_msg_ts}. Error: {error_msg}")
-                                    thread_failed += 1
-                                    
-                            except Exception as e:
-                                logger.error(f"Exception while deleting thread message {thread_msg_ts}: {e}")
-                                thread_failed += 1
-                        
-                        successful_deletions += thread_successful
-                        failed_deletions += thread_failed
-                        
-                    else:
-                        logger.error(f"Failed to get replies for orphaned message {msg_ts}: {replies_response.get('error', 'Unknown error')}")
-                        # Fallback: try to delete just the original message
-                        try:
-                            delete_response = delete_client.chat_delete(
-                                channel=channel_id,
-                                ts=msg_ts
-                            )
-                            
-                            if delete_response["ok"]:
-                                logger.info(f"Successfully deleted orphaned message with ts: {msg_ts} (fallback)")
-                                successful_deletions += 1
-                            else:
-                                error_msg = delete_response.get('error', 'Unknown error')
-                                logger.error(f"Failed to delete orphaned message with ts: {msg_ts}. Error: {error_msg}")
-                                failed_deletions += 1
-                                
-                        except Exception as e:
-                            logger.error(f"Exception while deleting orphaned message {msg_ts}: {e}")
-                            failed_deletions += 1
-                
-                except Exception as e:
-                    logger.error(f"Error getting replies for orphaned message {msg_ts}: {e}")
-                    # Fallback: try to delete just the original message
-                    try:
-                        delete_response = delete_client.chat_delete(
-                            channel=channel_id,
-                            ts=msg_ts
-                        )
-                        
-                        if delete_response["ok"]:
-                            logger.info(f"Successfully deleted orphaned message with ts: {msg_ts} (exception fallback)")
-                            successful_deletions += 1
-                        else:
-                            error_msg = delete_response.get('error', 'Unknown error')
-                            logger.error(f"Failed to delete orphaned message with ts: {msg_ts}. Error: {error_msg}")
-                            failed_deletions += 1
-                            
-                    except Exception as delete_e:
-                        logger.error(f"Exception while deleting orphaned message {msg_ts}: {delete_e}")
-                        failed_deletions += 1
-            
-            # Check if any orphaned messages were found
-            if orphaned_messages_found == 0:
-                display_time = format_time_period_for_display(command_text)
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text=f"ℹ️ No orphaned messages found in the last {display_time}."
-                )
-                return
-            
-            # Log results and send confirmation
-            logger.info(f"Orphaned messages bulk deletion complete - Success: {successful_deletions}, Failed: {failed_deletions}, Skipped: {skipped_deletions}")
-            
-            # Send summary message only for errors or issues
-            if successful_deletions == 0:
-                if skipped_deletions > 0:
-                    display_time = format_time_period_for_display(command_text)
-                    if not user_client:
-                        client.chat_postEphemeral(
-                            channel=channel_id,
-                            user=user_id,
-                            text=f"⚠️ Found {total_processed} message{'s' if total_processed != 1 else ''} from the last {display_time}, but user token not configured. Bot attempted deletion but was limited by Slack API permissions. See README for setup instructions."
-                        )
-                    else:
-                        client.chat_postEphemeral(
-                            channel=channel_id,
-                            user=user_id,
-                            text=f"ℹ️ Found {total_processed} message{'s' if total_processed != 1 else ''} from the last {display_time}, but couldn't delete them due to API limitations."
-                        )
-                else:
-                    display_time = format_time_period_for_display(command_text)
-                    client.chat_postEphemeral(
-                        channel=channel_id,
-                        user=user_id,
-                        text=f"❌ No messages could be deleted from the last {display_time}. Messages may be too old or you may not have sufficient permissions."
-                    )
-            # Only show message if there were significant failures
-            elif failed_deletions > 0 and failed_deletions >= successful_deletions:
-                display_time = format_time_period_for_display(command_text)
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text=f"⚠️ Some messages couldn't be deleted: {failed_deletions} failed, {successful_deletions} succeeded from the last {display_time}."
-                )
-                
-        except Exception as e:
-            logger.error(f"Error getting channel history: {e}")
-            client.chat_postEphemeral(
-                channel=channel_id,
-                user=user_id,
-                text="❌ An error occurred while trying to retrieve messages from the channel."
+def log_notifier(job_id, channel_id):
+    """notify callback for jobs nobody asked for, which report to the log instead of an ephemeral post"""
+    return lambda text: logger.info(f"Job {job_id} in channel {channel_id}: {text}")
+
+def submit_retention_sweep(channel_id, oldest):
+    """Queue a scheduled sweep of a channel from oldest up to now on the job engine"""
+    bot_client = rate_limited(app.client, api_scheduler)
+    delete_client = user_client or bot_client
+    # An open-ended range, so the job's description and resumed runs cover the same window
+    command_text = f"{datetime.fromtimestamp(oldest).isoformat(timespec='seconds')}.."
+    return job_engine.submit(
+        run_retention_sweep, channel_id, "", f"scheduled, {describe_time_window(command_text)}",
+        bot_client, delete_client, command_text, oldest
+    )
+
+def run_retention_sweep(job, client, delete_client, command_text, oldest, checkpoint=None):
+    """run_orphan_sweep for the retention scheduler, moving the channel's watermark once it completes.
+
+    The watermark is when the scan started (for a resumed sweep, when it first started): anything
+    posted later is left for the next sweep.
+    """
+    started_at = checkpoint["created_at"] if checkpoint is not None else time.time()
+    run_orphan_sweep(job, client, delete_client, command_text, oldest, checkpoint=checkpoint, notify=log_notifier(job.id, job.channel_id),
+                     kind=RETENTION_JOB)
+    if job.status == RUNNING and not job.cancelled:
+        job_store.set_watermark(job.channel_id, started_at)
+
+# Incremental sweeps of the channels in RETENTION_CHANNELS, each from where its previous sweep left off
+retention_scheduler = RetentionScheduler(job_store, submit_retention_sweep)
+
+@traced("job.workspace_sweep", root=True)
+def run_workspace_sweep(job, client, delete_client, command_text, cutoff_time, latest_time=None, notify=None, on_result=None,
+                        concurrency=WORKSPACE_SWEEP_CONCURRENCY, types=WORKSPACE_SWEEP_TYPES, report_path=None):
+    """Run run_orphan_sweep on every conversation the deleting token can see, several channels at a time.
+
+    All channels share the one rate limit scheduler, so the sweep runs as fast as the tier budgets allow
+    however many channels there are. Each finished channel is appended to the report and passed to
+    on_result; the consolidated summary goes to notify(text) at the end.
+    """
+    if notify is None:
+        notify = lambda text: client.chat_postEphemeral(channel=job.channel_id, user=job.user_id, text=text)
+    display_time = describe_time_window(command_text)
+    
+    conversations = list(iter_conversations(delete_client, types))
+    if delete_client is not user_client:
+        # The bot token can only read history in conversations the bot was added to
+        conversations = [conversation for conversation in conversations if conversation.get("is_member")]
+    conversations = prioritize_conversations(conversations)
+    job.description = f"{len(conversations)} channels, {display_time}"
+    logger.info(f"Workspace sweep {job.id} covering {len(conversations)} conversations, {concurrency} at a time")
+    
+    report = WorkspaceReport(report_path or WORKSPACE_SWEEP_REPORT.format(job_id=job.id))
+    channel_jobs = [
+        Job(f"{job.id}-{index}", conversation["id"], job.user_id, f"#{conversation.get('name', conversation['id'])}, {display_time}",
+            progress_interval=0, parent=job)
+        for index, conversation in enumerate(conversations)
+    ]
+    
+    def update_progress(_channel_job=None):
+        for counter in job.progress:
+            job.progress[counter] = sum(channel_job.progress[counter] for channel_job in channel_jobs)
+        job.report_progress()
+    
+    def sweep_channel(conversation, channel_job):
+        if job.cancelled:
+            return
+        notes = []
+        channel_job.on_progress = update_progress
+        channel_job.execute(run_orphan_sweep, client, delete_client, command_text, cutoff_time, latest_time, notify=notes.append,
+                            reply_channel_id=job.channel_id or None)
+        entry = report.add(conversation, channel_job, notes)
+        update_progress()
+        if on_result is not None:
+            on_result(entry)
+    
+    try:
+        with InstrumentedExecutor(max_workers=concurrency, thread_name_prefix="workspace-sweep", pool_name="workspace-sweep") as pool:
+            list(pool.map(sweep_channel, conversations, channel_jobs))
+    finally:
+        report.close()
+    
+    if job.budget.exhausted:
+        notify(f"⚠️ Workspace cleanup job `{job.id}` stopped after spending its budget of {job.budget.limit} API calls.\n{report.summary()}")
+    elif job.cancelled:
+        notify(f"🛑 Workspace cleanup job `{job.id}` cancelled.\n{report.summary()}")
+    else:
+        notify(f"✅ Workspace cleanup job `{job.id}` finished for orphaned messages from {display_time}.\n{report.summary()}")
+
+def resume_unfinished_jobs():
+    """Restart bulk sweeps no live process is running from their last checkpoint: jobs interrupted by a
+    previous shutdown, or left behind by another replica that died"""
+    bot_client = rate_limited(app.client, api_scheduler)
+    delete_client = user_client or bot_client
+    
+    for saved in job_store.unfinished_jobs():
+        job_key = f"job:{saved['id']}"
+        if job_engine.get(saved["id"]) is not None or coordinator.holder(job_key) is not None:
+            continue
+        # Taking the job lease before queueing means two replicas never adopt the same job
+        if not coordinator.try_acquire(job_key, coordinator.owner_for(saved["id"])):
+            continue
+        if saved["kind"] == RETENTION_JOB:
+            job = job_engine.submit(
+                run_retention_sweep, saved["channel_id"], saved["user_id"], saved["description"],
+                bot_client, delete_client, saved["command_text"], saved["oldest"],
+                job_id=saved["id"],
+                checkpoint=saved
             )
-        
-    except Exception as e:
-        logger.error(f"Error handling remove-orphaned-messages command: {e}")
+            logger.info(f"Resumed retention sweep {job.id} in channel {job.channel_id}")
+            continue
+        # Workspace sweeps run from the command line have no requester to post to
+        requested = bool(saved["user_id"])
+        # A workspace sweep's per-channel jobs report to the channel the sweep was requested from, where the
+        # requester is known to be, not to the channel being swept
+        reply_channel_id = saved["reply_channel_id"]
+        job = job_engine.submit(
+            run_orphan_sweep, saved["channel_id"], saved["user_id"], saved["description"],
+            bot_client, delete_client, saved["command_text"], saved["oldest"],
+            on_progress=make_progress_poster(bot_client, channel_id=reply_channel_id) if requested else None,
+            job_id=saved["id"],
+            checkpoint=saved,
+            notify=None if requested else log_notifier(saved["id"], saved["channel_id"]),
+            reply_channel_id=reply_channel_id
+        )
+        logger.info(f"Resumed cleanup job {job.id} in channel {job.channel_id}")
+        if not requested:
+            continue
         try:
-            client.chat_postEphemeral(
-                channel=body.get("channel_id", ""),
-                user=body.get("user_id", ""),
-                text="❌ An error occurred while processing your request."
+            bot_client.chat_postEphemeral(
+                channel=reply_channel_id,
+                user=job.user_id,
+                text=f"🔁 Resumed cleanup job `{job.id}` ({job.description}) after a restart."
             )
-        except:
-            pass
+        except Exception as e:
+            logger.error(f"Error notifying user about resumed job {job.id}: {e}")
+
+def adopt_abandoned_jobs(interval=LEASE_TTL):
+    """Keep resuming jobs whose process stopped renewing their leases, for as long as this one runs"""
+    while True:
+        time.sleep(interval)
+        try:
+            resume_unfinished_jobs()
+        except Exception as e:
+            logger.error(f"Error adopting abandoned jobs: {e}")
 
 if __name__ == "__main__":
+    atexit.register(job_store.close)
+    atexit.register(orphan_index.close)
+    atexit.register(undeletable_cache.close)
+    atexit.register(http_transport.close)
+    coordinator.start()
+    atexit.register(coordinator.close)
+    # on_workers_changed only fires on a change, and the index may still be marked shared from the last run
+    orphan_index.set_shared(coordinator.workers > 1)
+    start_metrics_server()
+    if USER_CACHE_WARM:
+        try:
+            user_cache.warm(rate_limited(app.client, api_scheduler))
+        except Exception as e:
+            logger.error(f"Error warming user cache: {e}")
+    resume_unfinished_jobs()
+    threading.Thread(target=adopt_abandoned_jobs, name="job-adopter", daemon=True).start()
+    retention_scheduler.start()
+    atexit.register(retention_scheduler.close)
     handler = SocketModeHandler(app, SLACK_APP_TOKEN)
     print("🚀 Starting bot...")
     handler.start()
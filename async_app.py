@@ -0,0 +1,344 @@
+"""Asyncio entry point for the bot.
+
+Runs the shortcut, slash command and app_mention handlers on AsyncApp, AsyncWebClient and the
+aiohttp Socket Mode handler, so a single event loop can keep many API calls in flight instead of
+blocking a worker thread per round trip. It is a lighter subset of app.py: cleanups run inside the
+command handler, and there is no job engine (status, cancel, all, large-thread hand-off, checkpoints),
+sweep planner, orphan index or coordination between processes.
+
+    python async_app.py
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime
+
+import aiohttp
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from dotenv import load_dotenv
+
+# Load .env before importing the bot modules so their tuning settings pick it up
+load_dotenv()
+
+from bot_logging import configure_logging, log_sampled
+from history_scanner import aiter_history, aiter_thread_replies, has_thread_replies
+from rate_limiter import RateLimitScheduler, async_rate_limited, current_budget, metered
+from priority import BULK, prioritized
+from deletion import SWEEP_PENDING_THREADS, AsyncDeletionExecutor, DeletionResult
+from user_cache import UserInfoCache
+from undeletable import UndeletableCache
+from metrics import start_metrics_server, timed_handler
+from tracing import start_span, traced_handler
+from time_periods import (
+    ASYNC_REMOVE_ORPHANED_MESSAGES_HELP,
+    get_invalid_time_format_error,
+    parse_time_window,
+)
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
+SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
+SLACK_USER_TOKEN = os.getenv("SLACK_USER_TOKEN")
+
+# Web API base URL; point it at a local stand-in (see benchmarks/) to run without a real workspace
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
+
+# Connections kept open to slack.com by the shared aiohttp session
+AIOHTTP_POOL_SIZE = int(os.getenv("AIOHTTP_POOL_SIZE", "100"))
+
+# /remove-orphaned-messages subcommands that need the job engine, which only app.py runs
+JOB_SUBCOMMANDS = ("status", "cancel", "all")
+
+api_scheduler = RateLimitScheduler()
+deletion_executor = AsyncDeletionExecutor(undeletable=UndeletableCache())
+user_cache = UserInfoCache()
+
+# Created in main() once the event loop and shared session exist
+user_client = None
+
+
+async def rate_limit_client(context, next):
+    """Route the Bolt-injected client through the shared rate limit scheduler"""
+    context["client"] = async_rate_limited(context.client, api_scheduler)
+    await next()
+
+
+async def handle_app_mention(body, say, client, logger):
+    user_id = body["event"]["user"]
+
+    try:
+        user_data = await user_cache.get_async(client, user_id)
+
+        name = user_data.get("real_name", user_data.get("name", "Unknown"))
+
+        if user_data.get("is_primary_owner", False):
+            status = "Primary Owner 👑"
+        elif user_data.get("is_owner", False):
+            status = "Owner 🔑"
+        elif user_data.get("is_admin", False):
+            status = "Admin ⚡"
+        else:
+            status = "Member 👤"
+
+        if SLACK_USER_TOKEN is not None:
+            permissions = "You can delete messages from anyone!"
+        else:
+            permissions = "You can delete messages from anyone! (Limited by Slack API permissions)"
+
+        await say(f"Hello {name}! 👋\n\n**Your Status:** {status}\n**Delete Permissions:** {permissions}")
+
+    except Exception as e:
+        logger.error(f"Error checking user info: {e}")
+        await say("Hello, I'm here! 👋")
+
+
+async def handle_message_action(ack, body, client, logger):
+    await ack()
+
+    try:
+        message = body["message"]
+        channel_id = body["channel"]["id"]
+        user_id = body["user"]["id"]
+        message_ts = message.get("ts", "")
+
+        logger.info(f"Processing message: {message.get('text', '')[:50]}... from user {message.get('user', '')} by requester {user_id} in channel {channel_id}")
+
+        delete_client = user_client or client
+
+        if not user_client:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text="⚠️ User token not configured. Bot will attempt to delete messages but may be limited by Slack API permissions. See README for user token setup."
+            )
+
+        reply_ts_list, replies_calls = await collect_thread_replies(delete_client, channel_id, message, logger)
+        logger.info(f"Found {len(reply_ts_list) + 1} messages to delete (including original)")
+
+        result = await deletion_executor.delete_thread(delete_client, channel_id, message_ts, reply_ts_list, logger, api_calls=replies_calls)
+
+        logger.info(f"Deletion complete - Success: {result.successful}, Failed: {result.failed}, API calls: {current_budget().summary(result.successful)}")
+
+        if result.failed > 0 and result.successful == 0:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text="❌ No messages could be deleted. You may not have permission to delete these messages, or they may be too old to delete."
+            )
+
+    except Exception as e:
+        logger.error(f"Error handling message action: {e}")
+        try:
+            await client.chat_postEphemeral(
+                channel=body.get("channel", {}).get("id", ""),
+                user=body.get("user", {}).get("id", ""),
+                text="❌ An error occurred while processing your request."
+            )
+        except Exception:
+            pass
+
+
+async def collect_thread_replies(delete_client, channel_id, message, logger):
+    """Return (reply_ts_list, api_calls) for a message, skipping conversations.replies when it has no thread"""
+    msg_ts = message.get("ts", "")
+    if not has_thread_replies(message):
+        return [], 0
+
+    reply_ts_list = []
+    api_calls = 0
+    with start_span("thread.expand", thread_ts=msg_ts) as span:
+        try:
+            async for page in aiter_thread_replies(delete_client, channel_id, msg_ts):
+                api_calls += 1
+                reply_ts_list.extend(thread_msg.get("ts", "") for thread_msg in page)
+        except Exception as e:
+            logger.error(f"Error getting replies for message {msg_ts}: {e}")
+            # Delete whatever replies were found; the parent still goes last
+            api_calls += 1
+        span.set_attributes({"replies": len(reply_ts_list), "pages": api_calls})
+    return reply_ts_list, api_calls
+
+
+async def delete_orphaned_thread(delete_client, channel_id, message, logger):
+    """Delete an orphaned parent message and all of its replies, returning the DeletionResult"""
+    msg_ts = message.get("ts", "")
+    reply_ts_list, replies_calls = await collect_thread_replies(delete_client, channel_id, message, logger)
+    log_sampled(logger, "orphaned_thread", "Found %d messages to delete for orphaned thread %s (including original)", len(reply_ts_list) + 1, msg_ts)
+    return await deletion_executor.delete_thread(delete_client, channel_id, msg_ts, reply_ts_list, logger, api_calls=replies_calls)
+
+
+async def handle_remove_messages_command(ack, body, client, logger, command):
+    """Handle the /remove-orphaned-messages slash command"""
+    await ack()
+
+    try:
+        user_id = body["user_id"]
+        channel_id = body["channel_id"]
+        command_text = command.get("text", "").strip()
+
+        logger.info(f"Remove orphaned messages command triggered by user {user_id} in channel {channel_id} with text: {command_text}")
+
+        if not command_text:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=ASYNC_REMOVE_ORPHANED_MESSAGES_HELP + "✅ All users can attempt to remove orphaned messages from any user (success depends on Slack API permissions)"
+            )
+            return
+
+        if command_text.split()[0].lower() in JOB_SUBCOMMANDS:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text="ℹ️ Background jobs and workspace-wide cleanups are only available when the bot runs with `python app.py`. Here a cleanup runs while you wait."
+            )
+            return
+
+        window = parse_time_window(command_text)
+        if window is None:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=get_invalid_time_format_error(command_text)
+            )
+            return
+
+        # Relative windows include the same 30 second buffer as the sync handler
+        oldest_param = f"{window.oldest:.6f}"
+        latest_param = f"{window.latest:.6f}" if window.latest is not None else None
+        display_time = window.description
+        logger.info(f"Looking for messages between {datetime.fromtimestamp(window.oldest)} and {latest_param or 'now'} ({command_text})")
+
+        delete_client = user_client or client
+
+        if not user_client:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text="⚠️ User token not configured. Bot will attempt to delete messages but may be limited by Slack API permissions. See README for user token setup."
+            )
+
+        messages_scanned = 0
+        orphaned_messages_found = 0
+        totals = DeletionResult()
+        # The scan waits for a slot once SWEEP_PENDING_THREADS threads are still being deleted
+        pending_threads = asyncio.Semaphore(SWEEP_PENDING_THREADS)
+        thread_tasks = set()
+
+        async def delete_thread(msg):
+            try:
+                totals.merge(await delete_orphaned_thread(delete_client, channel_id, msg, logger))
+            finally:
+                pending_threads.release()
+
+        # The scan and its deletes are bulk work, so shortcuts handled meanwhile go first; each sweep is its own share
+        with prioritized(BULK, share=f"sweep:{channel_id}:{body.get('trigger_id', '')}"):
+            try:
+                async for msg in aiter_history(delete_client, channel_id, oldest=oldest_param, latest=latest_param):
+                    messages_scanned += 1
+                    if msg.get("subtype") != "tombstone":
+                        continue
+                    orphaned_messages_found += 1
+                    await pending_threads.acquire()
+                    task = asyncio.create_task(delete_thread(msg))
+                    thread_tasks.add(task)
+                    task.add_done_callback(thread_tasks.discard)
+            except SlackApiError as e:
+                error_msg = e.response.get('error', 'Unknown error')
+                logger.error(f"API call failed: {error_msg}")
+                if error_msg == "not_in_channel":
+                    text = "❌ The bot needs to be added to this channel first. Please invite the bot to this channel and try again."
+                elif error_msg == "channel_not_found":
+                    text = "❌ Channel not found. The bot may not have access to this channel."
+                else:
+                    text = f"❌ Could not retrieve channel history: {error_msg}"
+                await client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+                return
+            finally:
+                # Let deletions already started finish even if the scan stopped early
+                await asyncio.gather(*thread_tasks)
+                logger.info(f"Scanned {messages_scanned} messages, API calls: {current_budget().summary(totals.successful)}")
+
+        if messages_scanned == 0:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=f"ℹ️ No messages found in {display_time}."
+            )
+            return
+
+        if orphaned_messages_found == 0:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=f"ℹ️ No orphaned messages found in {display_time}."
+            )
+            return
+
+        successful_deletions = totals.successful
+        failed_deletions = totals.failed
+        logger.info(f"Orphaned messages bulk deletion complete - Success: {successful_deletions}, Failed: {failed_deletions}")
+
+        if successful_deletions == 0:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=f"❌ No messages could be deleted from {display_time}. Messages may be too old or you may not have sufficient permissions."
+            )
+        elif failed_deletions > 0 and failed_deletions >= successful_deletions:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=user_id,
+                text=f"⚠️ Some messages couldn't be deleted: {failed_deletions} failed, {successful_deletions} succeeded from {display_time}."
+            )
+
+    except Exception as e:
+        logger.error(f"Error handling remove-orphaned-messages command: {e}")
+        try:
+            await client.chat_postEphemeral(
+                channel=body.get("channel_id", ""),
+                user=body.get("user_id", ""),
+                text="❌ An error occurred while processing your request."
+            )
+        except Exception:
+            pass
+
+
+def create_app(session):
+    """Build the AsyncApp with every listener registered, sharing the given aiohttp session"""
+    app = AsyncApp(client=AsyncWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL, session=session))
+    app.middleware(rate_limit_client)
+    for register, name, handler in (
+        (app.event("app_mention"), "app_mention", handle_app_mention),
+        (app.shortcut("delete-message-with-all-threads"), "delete_message_shortcut", handle_message_action),
+        (app.command("/remove-orphaned-messages"), "remove_orphaned_messages_command", handle_remove_messages_command),
+    ):
+        register(timed_handler(name)(traced_handler(name)(metered(handler))))
+    return app
+
+
+async def main():
+    global user_client
+
+    start_metrics_server()
+
+    # One pooled keep-alive session shared by the bot client, the user client and every per-request client
+    connector = aiohttp.TCPConnector(limit=AIOHTTP_POOL_SIZE)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if SLACK_USER_TOKEN:
+            user_client = async_rate_limited(AsyncWebClient(token=SLACK_USER_TOKEN, base_url=SLACK_API_URL, session=session), api_scheduler, name="user")
+
+        app = create_app(session)
+        handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
+        print("🚀 Starting bot (asyncio mode)...")
+        await handler.start_async()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
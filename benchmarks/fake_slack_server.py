@@ -0,0 +1,296 @@
+"""Local stand-in for the Slack Web API used by the benchmarks.
+
+Serves conversations.list, conversations.history, conversations.replies, chat.delete and users.info
+(plus the auth.test, chat.postEphemeral and chat.update calls the bot makes along the way) over a
+synthetic channel. Messages are computed from their index instead of stored, so channels can hold millions
+of messages; only deletions are kept in memory.
+
+    python benchmarks/fake_slack_server.py --port 8080 --messages 1000000
+    SLACK_API_URL=http://127.0.0.1:8080/api/ ...
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class SyntheticChannel:
+    """Every channel ID maps to the same generated history: message i is i * step older than the newest.
+
+    Every tombstone_every-th message is an orphaned thread parent (a tombstone) with `replies` replies.
+    """
+
+    def __init__(self, messages, span, tombstone_every, replies, newest=None):
+        self.messages = messages
+        self.tombstone_every = tombstone_every
+        self.replies = replies
+        self.newest_us = int((newest or time.time()) * 1_000_000)
+        self.step_us = max(replies + 1, int(span * 1_000_000 // max(messages, 1)))
+        # Deleted (channel_id, ts) pairs; everything else is derived on the fly
+        self.deleted = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def format_ts(us):
+        return f"{us // 1_000_000}.{us % 1_000_000:06d}"
+
+    @staticmethod
+    def parse_ts(ts):
+        seconds, _, fraction = str(ts).partition(".")
+        return int(seconds) * 1_000_000 + int((fraction + "000000")[:6])
+
+    def ts_of(self, index):
+        return self.format_ts(self.newest_us - index * self.step_us)
+
+    def index_of(self, ts):
+        """Index of the top-level message with this ts, or None if there is none"""
+        offset = self.newest_us - self.parse_ts(ts)
+        if offset < 0 or offset % self.step_us:
+            return None
+        index = offset // self.step_us
+        return index if index < self.messages else None
+
+    def is_thread(self, index):
+        return index % self.tombstone_every == 0
+
+    def message(self, index):
+        ts = self.ts_of(index)
+        if self.is_thread(index):
+            return {
+                "type": "message",
+                "subtype": "tombstone",
+                "ts": ts,
+                "thread_ts": ts,
+                "reply_count": self.replies,
+                "user": "USLACKBOT",
+                "text": "This message was deleted.",
+                "hidden": True,
+            }
+        return {"type": "message", "ts": ts, "user": "U00000001", "text": f"Synthetic message {index}"}
+
+    def reply_ts_list(self, index):
+        parent_us = self.newest_us - index * self.step_us
+        return [self.format_ts(parent_us + offset + 1) for offset in range(self.replies)]
+
+    def is_deleted(self, channel_id, ts):
+        return (channel_id, ts) in self.deleted
+
+    def history(self, channel_id, oldest=None, latest=None, limit=100, cursor=None):
+        # Newest first, like Slack: index 0 is the newest message
+        first = 0
+        if latest:
+            first = max(0, -(-(self.newest_us - self.parse_ts(latest)) // self.step_us))
+        last = self.messages - 1
+        if oldest:
+            last = min(last, (self.newest_us - self.parse_ts(oldest)) // self.step_us)
+
+        index = max(first, int(cursor or 0))
+        page = []
+        while index <= last and len(page) < limit:
+            ts = self.ts_of(index)
+            if not self.is_deleted(channel_id, ts):
+                page.append(self.message(index))
+            index += 1
+        next_cursor = str(index) if index <= last else ""
+        return {"ok": True, "messages": page, "has_more": bool(next_cursor), "response_metadata": {"next_cursor": next_cursor}}
+
+    def thread(self, channel_id, ts, limit=100, cursor=None):
+        index = self.index_of(ts)
+        if index is None or self.is_deleted(channel_id, ts):
+            return {"ok": False, "error": "thread_not_found"}
+
+        replies = []
+        if self.is_thread(index):
+            replies = [
+                {"type": "message", "ts": reply_ts, "thread_ts": ts, "user": "U00000002", "text": "Synthetic reply"}
+                for reply_ts in self.reply_ts_list(index) if not self.is_deleted(channel_id, reply_ts)
+            ]
+        start = int(cursor or 0)
+        # Slack repeats the parent at the top of every page
+        page = [self.message(index)] + replies[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(replies) else ""
+        return {"ok": True, "messages": page, "has_more": bool(next_cursor), "response_metadata": {"next_cursor": next_cursor}}
+
+    def is_reply(self, ts):
+        us = self.parse_ts(ts)
+        # Replies sit 1..replies microseconds after their parent, which is the first message at or before them
+        index = -(-(self.newest_us - us) // self.step_us)
+        if index < 0 or index >= self.messages or not self.is_thread(index):
+            return False
+        return 1 <= us - (self.newest_us - index * self.step_us) <= self.replies
+
+    def delete(self, channel_id, ts):
+        exists = self.index_of(ts) is not None or self.is_reply(ts)
+        with self.lock:
+            if not exists or (channel_id, ts) in self.deleted:
+                return {"ok": False, "error": "message_not_found"}
+            self.deleted.add((channel_id, ts))
+        return {"ok": True, "channel": channel_id, "ts": ts}
+
+
+class FakeSlackServer(ThreadingHTTPServer):
+    """HTTP server answering /api/<method> from a SyntheticChannel, with injected latency and 429s"""
+
+    daemon_threads = True
+
+    def __init__(self, address, channel, latency=0.0, jitter=0.0, rate_limit_probability=0.0, retry_after=1.0, seed=None, channels=1):
+        super().__init__(address, FakeSlackHandler)
+        self.channel = channel
+        self.channels = channels
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.stats_lock = threading.Lock()
+
+    def conversations(self, limit=100, cursor=None):
+        # Every listed channel serves the same synthetic history
+        start = int(cursor or 0)
+        end = min(self.channels, start + limit)
+        newest = self.channel.newest_us // 1_000_000
+        page = [
+            {"id": f"C{index:08d}", "name": f"channel-{index}", "is_channel": True, "is_member": True,
+             "created": newest - 86400 * 365, "updated": (newest - index * 60) * 1000}
+            for index in range(start, end)
+        ]
+        return {"ok": True, "channels": page, "response_metadata": {"next_cursor": str(end) if end < self.channels else ""}}
+
+    def dispatch(self, method, params):
+        channel_id = params.get("channel", "")
+        if method == "conversations.list":
+            return self.conversations(int(params.get("limit") or 100), params.get("cursor"))
+        if method == "conversations.history":
+            return self.channel.history(channel_id, params.get("oldest"), params.get("latest"),
+                                        int(params.get("limit") or 100), params.get("cursor"))
+        if method == "conversations.replies":
+            return self.channel.thread(channel_id, params.get("ts", ""), int(params.get("limit") or 100), params.get("cursor"))
+        if method == "chat.delete":
+            return self.channel.delete(channel_id, params.get("ts", ""))
+        if method == "users.info":
+            user_id = params.get("user", "")
+            return {"ok": True, "user": {"id": user_id, "name": f"user-{user_id}", "real_name": "Benchmark User", "is_admin": True}}
+        if method == "auth.test":
+            return {"ok": True, "url": "https://benchmark.slack.com/", "team": "Benchmark", "user": "bot",
+                    "team_id": "T00000001", "user_id": "U0000BOT", "bot_id": "B00000001"}
+        if method in ("chat.postEphemeral", "chat.update"):
+            return {"ok": True}
+        return {"ok": False, "error": "unknown_method"}
+
+    def stats(self):
+        with self.stats_lock:
+            return {"calls": dict(self.calls), "rate_limited": dict(self.rate_limited), "deleted": len(self.channel.deleted)}
+
+
+class FakeSlackHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY a keep-alive client waits out a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8")
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body))
+        return url.path, params
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        server = self.server
+        path, params = self._params()
+
+        if path == "/stats":
+            self._send(200, server.stats())
+            return
+        if not path.startswith("/api/"):
+            self._send(404, {"ok": False, "error": "not_found"})
+            return
+
+        method = path[len("/api/"):]
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter)))
+
+        with server.stats_lock:
+            server.calls[method] += 1
+            throttled = method != "auth.test" and server.random.random() < server.rate_limit_probability
+            if throttled:
+                server.rate_limited[method] += 1
+        if throttled:
+            self._send(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(server.retry_after)})
+            return
+
+        self._send(200, server.dispatch(method, params))
+
+
+def add_server_arguments(parser):
+    """Register the synthetic channel and fault injection options shared with run_benchmarks.py"""
+    parser.add_argument("--messages", type=int, default=10_000, help="top-level messages per channel")
+    parser.add_argument("--channels", type=int, default=1, help="channels returned by conversations.list")
+    parser.add_argument("--span", type=float, default=20 * 3600, help="seconds of history the messages are spread over")
+    parser.add_argument("--tombstone-every", type=int, default=50, help="every Nth message is an orphaned thread parent")
+    parser.add_argument("--replies", type=int, default=5, help="replies per orphaned thread")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- seconds of latency jitter")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="chance of answering any call with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--seed", type=int, default=None, help="seed for latency jitter and 429 injection")
+    parser.add_argument("--newest", type=float, default=None, help="timestamp of the newest message (defaults to now)")
+
+
+def create_server(args, host="127.0.0.1", port=0):
+    channel = SyntheticChannel(args.messages, args.span, args.tombstone_every, args.replies, newest=args.newest)
+    return FakeSlackServer(
+        (host, port), channel,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        channels=args.channels
+    )
+
+
+def serve(args, port_queue=None):
+    """Run the server forever, reporting the bound port through port_queue when given"""
+    server = create_server(args, port=getattr(args, "port", 0))
+    if port_queue is not None:
+        port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Slack Web API server for benchmarks")
+    parser.add_argument("--port", type=int, default=8080)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    print(f"Serving fake Slack Web API on http://127.0.0.1:{args.port}/api/")
+    serve(args)
@@ -0,0 +1,297 @@
+"""Benchmark the shortcut and slash command handlers against the local fake Slack Web API.
+
+Starts fake_slack_server.py in a child process, points the bot at it with SLACK_API_URL, drives
+the real handlers with synthetic Bolt payloads and reports deletions/sec, API calls per deleted
+message, p50/p99 handler latency and peak RSS (plus the traced Python heap peak in the memory scenario). Every run is appended to results.jsonl and compared
+with the previous run of the same scenario and parameters so regressions stand out.
+
+    python benchmarks/run_benchmarks.py --scenario sweep --messages 1000000 --latency 0.02
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tracemalloc
+import tempfile
+import subprocess
+import multiprocessing
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_slack_server import add_server_arguments, serve
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results.jsonl")
+
+# Metrics compared against the previous run, and whether a higher value is better
+COMPARED_METRICS = {
+    "deletions_per_sec": True,
+    "api_calls_per_deletion": False,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "peak_heap_mb": False,
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fetch_stats(base_url):
+    with urllib.request.urlopen(base_url.replace("/api/", "/stats")) as response:
+        return json.loads(response.read())
+
+
+def start_server(args):
+    """Run the fake server in a child process so its memory is not counted in the bot's RSS"""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(args, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}/api/"
+
+
+def load_bot(base_url, args, state_dir):
+    """Import app.py configured against the fake server, with tier limits scaled by --tier-scale"""
+    os.environ.update({
+        "SLACK_API_URL": base_url,
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "SLACK_APP_TOKEN": "xapp-benchmark",
+        "SLACK_USER_TOKEN": "" if args.bot_token_only else "xoxp-benchmark",
+        "JOB_STORE_PATH": os.path.join(state_dir, "jobs.sqlite3"),
+        "ORPHAN_INDEX_PATH": os.path.join(state_dir, "orphan_index.sqlite3"),
+        "UNDELETABLE_CACHE_PATH": os.path.join(state_dir, "undeletable.sqlite3"),
+        "COORDINATION_PATH": os.path.join(state_dir, "coordination.sqlite3"),
+    })
+    sys.path.insert(0, REPO_DIR)
+    import app as bot
+
+    # Per-message log lines would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.api_scheduler.tier_limits = {tier: limit * args.tier_scale for tier, limit in bot.api_scheduler.tier_limits.items()}
+    return bot
+
+
+def thread_payload(channel, index, channel_id):
+    parent = channel.message(index)
+    return {
+        "type": "message_action",
+        "callback_id": "delete-message-with-all-threads",
+        "team": {"id": "T00000001"},
+        "user": {"id": "U00000001", "team_id": "T00000001"},
+        "channel": {"id": channel_id},
+        "message": {
+            "type": "message",
+            "ts": parent["ts"],
+            "thread_ts": parent["ts"],
+            "reply_count": channel.replies,
+            "user": "U00000001",
+            "text": "Synthetic thread parent",
+        },
+    }
+
+
+def run_shortcut(bot, args, quiet_logger):
+    """Invoke the message shortcut on args.shortcuts different threads, args.concurrency at a time"""
+    from fake_slack_server import SyntheticChannel
+
+    # Same layout the server generates (both use args.newest), so payload timestamps match its threads
+    layout = SyntheticChannel(args.messages, args.span, args.tombstone_every, args.replies, newest=args.newest)
+    thread_indexes = range(0, args.messages, args.tombstone_every)[:args.shortcuts]
+    client = bot.rate_limited(bot.app.client, bot.api_scheduler)
+    latencies = []
+
+    if args.dispatch:
+        from slack_bolt.request import BoltRequest
+
+        # dispatch() then returns once the listener has finished, so its latency is measured
+        bot.app.listener_runner.process_before_response = True
+
+    def invoke(index):
+        payload = thread_payload(layout, index, "CSHORTCUT")
+        started = time.perf_counter()
+        if args.dispatch:
+            # Through Bolt's middleware, with the client it builds for each request
+            bot.app.dispatch(BoltRequest(body=payload, mode="socket_mode"))
+        else:
+            bot.handle_message_action(ack=lambda *a, **kw: None, body=payload, client=client, logger=quiet_logger)
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(invoke, thread_indexes))
+    # Threads of LARGE_THREAD_REPLIES or more are handed to background jobs; latencies stay the listener's
+    wait_for_jobs(bot)
+    return latencies
+
+
+def run_sweep(bot, args, quiet_logger):
+    """Run args.sweeps concurrent /remove-orphaned-messages jobs, one per channel, and time each to completion"""
+    client = bot.rate_limited(bot.app.client, bot.api_scheduler)
+    window = f"{int(args.span // 3600) + 1}H"
+
+    for sweep in range(args.sweeps):
+        bot.handle_remove_messages_command(
+            ack=lambda *a, **kw: None,
+            body={"user_id": "U00000001", "channel_id": f"CSWEEP{sweep}"},
+            client=client,
+            logger=quiet_logger,
+            command={"text": window}
+        )
+
+    return [job.finished_at - job.created_at for job in wait_for_jobs(bot)]
+
+
+def wait_for_jobs(bot):
+    """Block until every job the engine was given has finished, returning them"""
+    jobs = bot.job_engine.list_jobs()
+    while not all(job.finished for job in jobs):
+        time.sleep(0.05)
+    return jobs
+
+
+def run_workspace(bot, args, quiet_logger):
+    """Run one workspace-wide sweep over the --channels channels conversations.list returns"""
+    from jobs import Job
+
+    job = Job("benchmark", "CBENCH", "U00000001", "workspace benchmark")
+    client = bot.rate_limited(bot.app.client, bot.api_scheduler)
+    latencies = []
+    job.execute(
+        bot.run_workspace_sweep, client, client, "30D", time.time() - args.span - 3600,
+        notify=lambda text: None,
+        on_result=lambda entry: latencies.append(entry["seconds"]),
+        report_path=os.devnull
+    )
+    return latencies
+
+
+def compare(result, results_path):
+    """Print the change of each metric against the last stored run with the same scenario and parameters"""
+    previous = None
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["scenario"] == result["scenario"] and entry["params"] == result["params"]:
+                    previous = entry
+    if previous is None:
+        print("  (no previous run with these parameters)")
+        return
+
+    print(f"  compared with {previous.get('revision') or 'unknown revision'} at {previous['timestamp']}:")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        before, after = previous.get(metric), result.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        regressed = change < 0 if higher_is_better else change > 0
+        marker = " ⚠️" if regressed and abs(change) >= 10 else ""
+        print(f"    {metric}: {before} -> {after} ({change:+.1f}%){marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot handlers against a fake Slack Web API")
+    parser.add_argument("--scenario", choices=("shortcut", "sweep", "workspace", "memory"), default="sweep")
+    parser.add_argument("--shortcuts", type=int, default=200, help="shortcut invocations, one per thread")
+    parser.add_argument("--concurrency", type=int, default=10, help="shortcut invocations in flight (Bolt's default listener pool)")
+    parser.add_argument("--dispatch", action="store_true", help="send shortcuts through app.dispatch (Bolt middleware and per-request client) instead of calling the handler")
+    parser.add_argument("--bot-token-only", action="store_true", help="run without a user token, so deletes go through the bot client")
+    parser.add_argument("--sweeps", type=int, default=1, help="concurrent sweep jobs, each on its own channel")
+    parser.add_argument("--tier-scale", type=float, default=1000, help="multiply Slack tier limits so pacing does not hide handler cost; 1 keeps real limits")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSON lines file the results are appended to")
+    parser.add_argument("--label", default="", help="free-form note stored with the result")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    if args.newest is None:
+        args.newest = time.time()
+
+    server, base_url = start_server(args)
+    quiet_logger = logging.getLogger("benchmark.handlers")
+    quiet_logger.setLevel(logging.WARNING)
+
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            bot = load_bot(base_url, args, state_dir)
+            calls_before = fetch_stats(base_url)["calls"]
+
+            if args.scenario == "memory":
+                # A sweep with allocation tracing; peak heap should stay flat as --messages grows
+                tracemalloc.start()
+
+            started = time.perf_counter()
+            if args.scenario == "shortcut":
+                latencies = run_shortcut(bot, args, quiet_logger)
+            elif args.scenario == "workspace":
+                latencies = run_workspace(bot, args, quiet_logger)
+            else:
+                latencies = run_sweep(bot, args, quiet_logger)
+            elapsed = time.perf_counter() - started
+            peak_heap = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+            tracemalloc.stop()
+
+            stats = fetch_stats(base_url)
+            connections = bot.http_transport.stats()
+            bot.job_engine.shutdown()
+            bot.orphan_index.close()
+            bot.undeletable_cache.close()
+    finally:
+        server.terminate()
+
+    api_calls = sum(count - calls_before.get(method, 0) for method, count in stats["calls"].items() if method != "auth.test")
+    deletions = stats["deleted"]
+    connections_opened = sum(counts["opened"] for counts in connections.values())
+    # Calls made on a client outside the pool never show up in its stats
+    pooled_calls = sum(counts["opened"] + counts["reused"] for counts in connections.values())
+    params = {key: value for key, value in vars(args).items() if key not in ("results", "label", "newest")}
+    result = {
+        "scenario": args.scenario,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "label": args.label,
+        "params": params,
+        "elapsed_sec": round(elapsed, 3),
+        "deletions": deletions,
+        "deletions_per_sec": round(deletions / elapsed, 1) if elapsed else None,
+        "api_calls": api_calls,
+        "api_calls_per_deletion": round(api_calls / deletions, 3) if deletions else None,
+        "rate_limited": sum(stats["rate_limited"].values()),
+        "connections_opened": connections_opened,
+        "pooled_calls": pooled_calls,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_heap_mb": round(peak_heap / (1024 * 1024), 1) if peak_heap is not None else None,
+    }
+
+    print(f"{args.scenario}: {deletions} deletions in {elapsed:.2f}s ({result['deletions_per_sec']}/s), "
+          f"{api_calls} API calls ({result['api_calls_per_deletion']} per deletion), {result['rate_limited']} throttled, "
+          f"{connections_opened} connections opened for {pooled_calls} pooled calls, "
+          f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, peak RSS {result['peak_rss_mb']} MB"
+          + (f", peak heap {result['peak_heap_mb']} MB" if peak_heap is not None else ""))
+    compare(result, args.results)
+
+    with open(args.results, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import itertools
+from logging.handlers import QueueHandler, QueueListener
+
+# Root log level
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Per-message log lines (one per scanned or deleted message) are written once every this many occurrences; 1 logs all of them
+LOG_SAMPLE_EVERY = max(1, int(os.getenv("LOG_SAMPLE_EVERY", "100")))
+
+# Log full Slack payloads and message dicts; verbose and slow, for debugging only
+LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "false").lower() in ("1", "true", "yes")
+
+# Records waiting for the writer thread; once full, new records are dropped rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the writer thread"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The stock prepare() formats the message on the calling thread; the listener does it instead
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_lock = threading.Lock()
+
+
+def configure_logging(level=LOG_LEVEL, queue_size=LOG_QUEUE_SIZE):
+    """Route every log record through a bounded queue to a background writer thread.
+
+    Safe to call more than once; only the first call installs the handlers.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_queue = queue.Queue(maxsize=queue_size)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DroppingQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class EventSampler:
+    """Thread-safe 1-in-N sampling keyed by event name"""
+
+    def __init__(self, every=LOG_SAMPLE_EVERY):
+        self.every = every
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def sample(self, event):
+        """Return the occurrence number of event if this occurrence should be logged, else 0"""
+        counter = self._counters.get(event)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(event, itertools.count(1))
+        occurrence = next(counter)
+        # Always log the first occurrence so a short run still shows each kind of line once
+        return occurrence if occurrence == 1 or occurrence % self.every == 0 else 0
+
+
+_sampler = EventSampler()
+
+
+def log_sampled(logger, event, msg, *args, level=logging.INFO):
+    """Log msg % args for a sample of the occurrences of event; nothing is formatted for skipped ones"""
+    if not logger.isEnabledFor(level):
+        return
+    occurrence = _sampler.sample(event)
+    if occurrence:
+        logger.log(level, msg + " [%s #%d, 1 in %d logged]", *args, event, occurrence, _sampler.every)
+
+
+class LazyJson:
+    """Log argument that is only serialized when the record is actually written"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value, indent=2, default=str)
+
+
+def log_payload(logger, description, payload):
+    """Dump a Slack payload when LOG_PAYLOADS is on"""
+    if LOG_PAYLOADS:
+        logger.info("%s: %s", description, LazyJson(payload))
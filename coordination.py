@@ -0,0 +1,263 @@
+import os
+import time
+import socket
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Where leases shared by every bot process live: "sqlite" (COORDINATION_PATH, for replicas on one host or a
+# shared volume) or "memory" (a single process); register other backends in BACKENDS
+COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "sqlite").lower()
+COORDINATION_PATH = os.getenv("COORDINATION_PATH", "coordination.sqlite3")
+
+# Seconds a lease survives without being renewed; work held by a process that died is picked up after this long
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))
+
+# Name of this process in lease records
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+# Cancellation requests for jobs running in another process are kept this long
+CANCEL_REQUEST_TTL = 24 * 3600
+
+
+class LeaseBackend:
+    """Shared store of named leases, each held by one owner until it expires or is released"""
+
+    def acquire(self, key, owner, ttl):
+        """Take key for owner, or extend it if owner already holds it; False if another owner's lease is live"""
+        raise NotImplementedError
+
+    def release(self, key, owner):
+        raise NotImplementedError
+
+    def holders(self, prefix):
+        """{key: owner} of every live lease whose key starts with prefix"""
+        raise NotImplementedError
+
+    def purge(self):
+        """Drop expired leases"""
+
+    def close(self):
+        pass
+
+
+class MemoryLeaseBackend(LeaseBackend):
+    """Leases kept in this process only; coordinates jobs within one bot process"""
+
+    def __init__(self):
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(key)
+            if current is not None and current[0] != owner and current[1] > now:
+                return False
+            self._leases[key] = (owner, now + ttl)
+            return True
+
+    def release(self, key, owner):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+    def holders(self, prefix):
+        now = time.time()
+        with self._lock:
+            return {key: owner for key, (owner, expires_at) in self._leases.items() if key.startswith(prefix) and expires_at > now}
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._leases.items() if expires_at <= now]:
+                del self._leases[key]
+
+
+class SqliteLeaseBackend(LeaseBackend):
+    """Leases in a SQLite file; every process that opens the same file shares them"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS leases (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path=COORDINATION_PATH):
+        self.path = path
+        # Autocommit: each acquire is a single atomic upsert, so no transaction is ever held open
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (key, owner, now + ttl, now)
+            )
+            return cursor.rowcount > 0
+
+    def release(self, key, owner):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def holders(self, prefix):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, owner FROM leases WHERE substr(key, 1, ?) = ? AND expires_at > ?",
+                (len(prefix), prefix, time.time())
+            ).fetchall()
+        return dict(rows)
+
+    def purge(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (time.time(),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    "sqlite": SqliteLeaseBackend,
+    "memory": MemoryLeaseBackend,
+}
+
+
+def create_backend(name=COORDINATION_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown COORDINATION_BACKEND {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class Coordinator:
+    """Leases that let several bot processes share the work without doing any of it twice.
+
+    - job:<id> - the process running a bulk job; jobs nobody holds are adopted by a live process
+    - channel:<id> - the one job sweeping a channel at a time
+    - thread:<channel>:<ts> - the one worker expanding and deleting a thread
+    - worker:<id> - a heartbeat per live process, used to split the app's rate limits between them
+
+    Leases held here are renewed in the background every LEASE_TTL / 3 seconds, so everything a
+    process held is released LEASE_TTL seconds after it dies.
+    """
+
+    def __init__(self, backend=None, worker_id=WORKER_ID, ttl=LEASE_TTL, on_workers_changed=None, on_cancel=None):
+        self.backend = backend or create_backend()
+        self.worker_id = worker_id
+        self.ttl = ttl
+        # on_workers_changed(count) when the number of live processes changes; on_cancel(job_id) when
+        # another process asks for a job held here to be cancelled
+        self.on_workers_changed = on_workers_changed
+        self.on_cancel = on_cancel
+        self.workers = 1
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def owner_for(self, job_id):
+        """Lease owner name for a job running in this process"""
+        return f"{self.worker_id}/{job_id}"
+
+    def try_acquire(self, key, owner=None):
+        """Take key without waiting; True if this owner now holds it (including if it already did)"""
+        owner = owner or self.worker_id
+        if not self.backend.acquire(key, owner, self.ttl):
+            return False
+        with self._lock:
+            self._held[key] = owner
+        return True
+
+    def acquire(self, key, owner=None, cancelled=None, poll_interval=1.0):
+        """Wait until key can be taken; returns False if cancelled() turns true first"""
+        while not self.try_acquire(key, owner):
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def release(self, key, owner=None, linger=False):
+        """Give up key; with linger=True it is only no longer renewed, so it keeps others off for one more TTL"""
+        owner = owner or self.worker_id
+        with self._lock:
+            if self._held.get(key) == owner:
+                del self._held[key]
+        if not linger:
+            self.backend.release(key, owner)
+
+    def holder(self, key):
+        return self.backend.holders(key).get(key)
+
+    def request_cancel(self, job_id):
+        """Ask whichever process holds job_id to cancel it; False if no live process holds it"""
+        if self.holder(f"job:{job_id}") is None:
+            return False
+        self.backend.acquire(f"cancel:{job_id}", self.worker_id, CANCEL_REQUEST_TTL)
+        return True
+
+    def start(self):
+        """Register this process and start renewing its leases"""
+        if self._thread is not None:
+            return
+        self.try_acquire(f"worker:{self.worker_id}")
+        self._tick()
+        self._thread = threading.Thread(target=self._run, name="lease-renewer", daemon=True)
+        self._thread.start()
+        logger.info(f"Coordinating as worker {self.worker_id} with {self.workers} live worker(s)")
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"Error renewing leases: {e}")
+
+    def _tick(self):
+        with self._lock:
+            held = list(self._held.items())
+        for key, owner in held:
+            if not self.backend.acquire(key, owner, self.ttl):
+                logger.warning(f"Lost lease {key} held by {owner}")
+                with self._lock:
+                    self._held.pop(key, None)
+                # Another process may have adopted the job already, so stop this copy of it
+                if key.startswith("job:") and self.on_cancel is not None:
+                    self.on_cancel(key[len("job:"):])
+
+        workers = max(1, len(self.backend.holders("worker:")))
+        if workers != self.workers:
+            logger.info(f"Live workers changed from {self.workers} to {workers}")
+            self.workers = workers
+            if self.on_workers_changed is not None:
+                self.on_workers_changed(workers)
+
+        if self.on_cancel is not None:
+            held_jobs = {key[len("job:"):] for key, _ in held if key.startswith("job:")}
+            for key in self.backend.holders("cancel:"):
+                job_id = key[len("cancel:"):]
+                if job_id in held_jobs:
+                    self.on_cancel(job_id)
+        self.backend.purge()
+
+    def close(self):
+        """Stop renewing and release every lease this process holds"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            held = list(self._held.items())
+            self._held.clear()
+        for key, owner in held:
+            self.backend.release(key, owner)
+        self.backend.close()
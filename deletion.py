@@ -0,0 +1,390 @@
+import os
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+from slack_sdk.errors import SlackApiError
+
+from bot_logging import log_sampled
+from metrics import DELETION_RETRIES, DELETIONS
+from priority import AsyncPrioritySemaphore, PriorityExecutor
+from tracing import activate, start_span
+from undeletable import token_principal
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of chat.delete calls in flight at once across the whole bot
+DELETE_CONCURRENCY = int(os.getenv("DELETE_CONCURRENCY", "8"))
+
+# Orphaned threads a sweep may have queued but not yet deleted; the history scan pauses at this many,
+# which keeps a sweep's memory flat however large its window is
+SWEEP_PENDING_THREADS = int(os.getenv("SWEEP_PENDING_THREADS", "64"))
+
+# Extra attempts for a delete that failed with a transient error, and the base in seconds of their
+# jittered exponential backoff
+DELETE_RETRIES = int(os.getenv("DELETE_RETRIES", "3"))
+DELETE_RETRY_BACKOFF = float(os.getenv("DELETE_RETRY_BACKOFF", "1"))
+
+# Longest single backoff in seconds
+DELETE_RETRY_MAX_BACKOFF = 30
+
+# chat.delete errors that come back on every attempt for that message with that token; they go into the
+# undeletable cache
+PERMANENT_DELETE_ERRORS = frozenset({"cant_delete_message", "compliance_exports_prevent_deletion"})
+
+# Slack errors worth another attempt after a pause. ratelimited is not one of them: by the time it
+# reaches here the rate limit scheduler has already retried the call after every Retry-After
+TRANSIENT_DELETE_ERRORS = frozenset({"internal_error", "fatal_error", "service_unavailable", "request_timeout"})
+
+# Network failures, as delete_message reports them (by exception class name), that are worth another attempt
+TRANSIENT_DELETE_EXCEPTIONS = frozenset({
+    "TimeoutError", "URLError", "ConnectionError", "ConnectionResetError", "ConnectionRefusedError",
+    "ConnectionAbortedError", "BrokenPipeError", "RemoteDisconnected", "IncompleteRead",
+    # aiohttp, in asyncio mode
+    "ClientConnectionError", "ClientConnectorError", "ClientOSError", "ServerDisconnectedError", "ServerTimeoutError",
+})
+
+PERMANENT = "permanent"
+TRANSIENT = "transient"
+
+
+class DeletionResult:
+    """Thread-safe success/failure counts for a group of chat.delete calls.
+
+    api_calls counts every Slack API call spent on the group, chat.delete included.
+    """
+
+    def __init__(self, api_calls=0):
+        self.successful = 0
+        self.failed = 0
+        self.api_calls = api_calls
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, error, api_calls=1):
+        """Record one deletion outcome; error is None on success.
+
+        api_calls is the number of chat.delete attempts, 0 for a message skipped as known undeletable.
+        """
+        outcome = "deleted" if error is None else "failed" if api_calls else "skipped"
+        DELETIONS.inc(outcome=outcome, error=error or "")
+        with self._lock:
+            self.api_calls += api_calls
+            if error is None:
+                self.successful += 1
+            else:
+                self.failed += 1
+                self.errors[error] += 1
+
+    def merge(self, other):
+        """Add another result's counts into this one"""
+        with self._lock:
+            self.successful += other.successful
+            self.failed += other.failed
+            self.api_calls += other.api_calls
+            self.errors.update(other.errors)
+
+    def __repr__(self):
+        return f"DeletionResult(successful={self.successful}, failed={self.failed}, api_calls={self.api_calls}, errors={dict(self.errors)})"
+
+
+def _delete_outcome(ts, error_msg, logger):
+    if error_msg == "message_not_found":
+        # Already gone (deleted by someone else, or by an attempt whose response was lost), as the caller wanted
+        log_sampled(logger, "message_not_found", "Message %s was already deleted", ts)
+        return None
+    logger.error("Failed to delete message with ts: %s. Error: %s", ts, error_msg)
+    if error_msg == "cant_delete_message":
+        log_sampled(logger, "cant_delete_message", "Cannot delete message %s - insufficient permissions or message too old", ts)
+    return error_msg
+
+
+def delete_message(client, channel_id, ts, logger=logger):
+    """Delete a single message, returning None on success (or if it was already gone) or the Slack error code on failure"""
+    try:
+        delete_response = client.chat_delete(
+            channel=channel_id,
+            ts=ts
+        )
+
+        if delete_response["ok"]:
+            log_sampled(logger, "message_deleted", "Successfully deleted message with ts: %s", ts)
+            return None
+
+        return _delete_outcome(ts, delete_response.get('error', 'Unknown error'), logger)
+
+    except SlackApiError as e:
+        return _delete_outcome(ts, e.response.get('error', 'Unknown error'), logger)
+
+    except Exception as e:
+        logger.error(f"Exception while deleting message {ts}: {e}")
+        return type(e).__name__
+
+
+async def delete_message_async(client, channel_id, ts, logger=logger):
+    """AsyncWebClient version of delete_message"""
+    try:
+        delete_response = await client.chat_delete(
+            channel=channel_id,
+            ts=ts
+        )
+
+        if delete_response["ok"]:
+            log_sampled(logger, "message_deleted", "Successfully deleted message with ts: %s", ts)
+            return None
+
+        return _delete_outcome(ts, delete_response.get('error', 'Unknown error'), logger)
+
+    except SlackApiError as e:
+        return _delete_outcome(ts, e.response.get('error', 'Unknown error'), logger)
+
+    except Exception as e:
+        logger.error(f"Exception while deleting message {ts}: {e}")
+        return type(e).__name__
+
+
+def classify_delete_error(error):
+    """PERMANENT, TRANSIENT, or None for errors neither a retry nor the cache would help with (e.g. invalid_auth)"""
+    if error in PERMANENT_DELETE_ERRORS:
+        return PERMANENT
+    if error in TRANSIENT_DELETE_ERRORS or error in TRANSIENT_DELETE_EXCEPTIONS:
+        return TRANSIENT
+    return None
+
+
+def retry_backoff(attempt, base=DELETE_RETRY_BACKOFF):
+    """Seconds to wait before retry number attempt: full jitter over an exponentially growing cap"""
+    return random.uniform(0, min(DELETE_RETRY_MAX_BACKOFF, base * 2 ** (attempt - 1)))
+
+
+def retry_delay(channel_id, ts, error, attempt, undeletable=None, principal=None, retries=DELETE_RETRIES, logger=logger):
+    """Apply the error-class policy to a failed attempt: the backoff before the next one, or None if error is final.
+
+    Permanent errors are added to the undeletable cache under the deleting token's principal.
+    """
+    error_class = classify_delete_error(error)
+    if error_class == PERMANENT:
+        if undeletable is not None:
+            undeletable.add(channel_id, ts, principal, error)
+        return None
+    if error_class != TRANSIENT or attempt > retries:
+        return None
+    DELETION_RETRIES.inc(error=error)
+    delay = retry_backoff(attempt)
+    log_sampled(logger, "delete_retry", "Retrying delete of %s in %.1fs after %s (retry %d/%d)", ts, delay, error, attempt, retries)
+    return delay
+
+
+class PendingLimit:
+    """Caps how many submitted units of work (e.g. orphaned threads) may be unfinished at once.
+
+    acquire() blocks once the limit is reached, so a scan producing work faster than it is deleted
+    waits instead of queueing everything it finds.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.pending = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.pending >= self.limit:
+                self._condition.wait()
+            self.pending += 1
+
+    def release(self):
+        with self._condition:
+            self.pending -= 1
+            self._condition.notify_all()
+
+    def wait_idle(self):
+        """Block until everything acquired has been released"""
+        with self._condition:
+            while self.pending:
+                self._condition.wait()
+
+
+class DeletionExecutor:
+    """Bounded worker pool that runs chat.delete calls concurrently.
+
+    Queued work is taken by priority class, so a shortcut's deletes go ahead of queued sweep deletes.
+    Messages the deleting token is known not to be able to delete (see UndeletableCache) are skipped
+    without an API call. Transient failures are queued again after their backoff instead of holding a
+    worker while they wait.
+    """
+
+    def __init__(self, max_workers=None, undeletable=None):
+        self.max_workers = max_workers or DELETE_CONCURRENCY
+        self.undeletable = undeletable
+        self._pool = PriorityExecutor(max_workers=self.max_workers, thread_name_prefix="chat-delete", pool_name="chat-delete")
+
+    def submit_thread(self, client, channel_id, parent_ts, reply_ts_list=(), logger=logger, on_outcome=None, api_calls=0):
+        """Delete all replies concurrently, then the parent once every reply has finished.
+
+        Returns a Future that resolves to the DeletionResult for the whole thread. parent_ts may be
+        None to delete only the given replies. on_outcome(ts, error) is called after every delete.
+        api_calls is the number of lookups already spent finding the replies.
+
+        Replies are taken from reply_ts_list by at most max_workers drainer tasks, so however long the
+        thread is, only that many of its deletes are ever queued or running. A drainer deletes one reply
+        per task and is queued again after it, so more urgent work takes the next free worker. reply_ts_list
+        may also be any iterable, such as a generator fetching reply pages as the drainers ask for more.
+        """
+        result = DeletionResult(api_calls)
+        done = Future()
+        replies = iter(reply_ts_list)
+        reply_count = len(reply_ts_list) if hasattr(reply_ts_list, "__len__") else None
+        # Drainers still running plus replies waiting for a retry; the parent goes once none are left
+        active = [self.max_workers if reply_count is None else min(reply_count, self.max_workers)]
+        lock = threading.Lock()
+        principal = token_principal(client) if self.undeletable is not None else None
+        # Ended when the parent finishes, so it covers the whole thread across pool workers
+        span = start_span("delete.thread", channel=channel_id, thread_ts=parent_ts, replies=reply_count)
+
+        def settle(ts, error, attempts, on_final):
+            try:
+                result.record(error, attempts)
+                if on_outcome is not None:
+                    on_outcome(ts, error)
+            finally:
+                on_final()
+
+        def delete(ts, on_final, attempt=1):
+            # on_final() runs exactly once, when ts has its final outcome (possibly after retries on other workers)
+            if attempt == 1 and self.undeletable is not None:
+                try:
+                    reason = self.undeletable.get(channel_id, ts, principal)
+                except Exception as e:
+                    logger.error(f"Error reading the undeletable cache for {ts}: {e}")
+                    reason = None
+                if reason is not None:
+                    settle(ts, reason, 0, on_final)
+                    return
+            error = delete_message(client, channel_id, ts, logger)
+            delay = None
+            if error is not None:
+                try:
+                    delay = retry_delay(channel_id, ts, error, attempt, self.undeletable, principal, logger=logger)
+                    if delay is not None:
+                        self._pool.submit_after(delay, delete, ts, on_final, attempt + 1)
+                        return
+                except Exception as e:
+                    # e.g. the pool is shutting down; the error stands
+                    logger.error(f"Error applying the retry policy to {ts}: {e}")
+            settle(ts, error, attempt, on_final)
+
+        def complete():
+            span.set_attributes({"successful": result.successful, "failed": result.failed})
+            span.end()
+            done.set_result(result)
+
+        def finish():
+            # Parent goes last so a thread is never left with replies but no parent
+            if not parent_ts:
+                complete()
+                return
+            delete(parent_ts, complete)
+
+        def reply_settled():
+            with lock:
+                active[0] -= 1
+                last = active[0] == 0
+            if last:
+                finish()
+
+        def drain():
+            # Deletes one reply, then queues itself again, so the worker goes back to the priority queue
+            # between replies and a shortcut's delete never waits for a whole bulk thread to drain
+            ts = None
+            try:
+                with lock:
+                    ts = next(replies, None)
+                    if ts is not None:
+                        active[0] += 1
+            finally:
+                if ts is None:
+                    reply_settled()
+            if ts is None:
+                return
+            try:
+                delete(ts, reply_settled)
+            finally:
+                try:
+                    self._pool.submit(drain)
+                except Exception as e:
+                    # e.g. the pool is shutting down; this drainer stops and the others finish the thread
+                    logger.error(f"Error queueing the next reply of thread {parent_ts}: {e}")
+                    reply_settled()
+
+        with activate(span):
+            # Pool tasks run in a copy of this context, so every delete stays in the same trace and API budget
+            if not active[0]:
+                self._pool.submit(finish)
+            for _ in range(active[0]):
+                self._pool.submit(drain)
+
+        return done
+
+    def delete_thread(self, client, channel_id, parent_ts, reply_ts_list=(), logger=logger, on_outcome=None, api_calls=0):
+        """Blocking version of submit_thread"""
+        return self.submit_thread(client, channel_id, parent_ts, reply_ts_list, logger, on_outcome=on_outcome, api_calls=api_calls).result()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class AsyncDeletionExecutor:
+    """Event-loop counterpart of DeletionExecutor, bounding in-flight deletes with a semaphore.
+
+    Every delete takes a slot in priority order, so a shortcut's delete goes ahead of waiting sweep deletes.
+    """
+
+    def __init__(self, max_concurrency=None, undeletable=None):
+        self.max_concurrency = max_concurrency or DELETE_CONCURRENCY
+        self.undeletable = undeletable
+        self._semaphore = AsyncPrioritySemaphore(self.max_concurrency, pool_name="chat-delete")
+
+    async def _delete(self, client, channel_id, ts, result, logger):
+        principal = token_principal(client) if self.undeletable is not None else None
+        if self.undeletable is not None:
+            # The cache is SQLite, so its calls run on a worker thread rather than blocking the event loop
+            reason = await asyncio.to_thread(self.undeletable.get, channel_id, ts, principal)
+            if reason is not None:
+                result.record(reason, 0)
+                return
+        attempt = 1
+        while True:
+            async with self._semaphore:
+                error = await delete_message_async(client, channel_id, ts, logger)
+            delay = None
+            if error is not None:
+                # May add the message to the undeletable cache
+                delay = await asyncio.to_thread(retry_delay, channel_id, ts, error, attempt, self.undeletable, principal, logger=logger)
+            if delay is None:
+                result.record(error, attempt)
+                return
+            # Waits outside the semaphore, so other deletes go ahead meanwhile
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def delete_thread(self, client, channel_id, parent_ts, reply_ts_list=(), logger=logger, api_calls=0):
+        """Delete all replies concurrently, then the parent, returning the thread's DeletionResult"""
+        result = DeletionResult(api_calls)
+        replies = iter(reply_ts_list)
+
+        async def drain():
+            # Each reply waits for a slot again, in priority order, so a drainer never keeps one between replies
+            for ts in replies:
+                await self._delete(client, channel_id, ts, result, logger)
+
+        with start_span("delete.thread", channel=channel_id, thread_ts=parent_ts, replies=len(reply_ts_list)) as span:
+            # A few drainers share the reply iterator instead of one task per reply
+            await asyncio.gather(*(drain() for _ in range(min(len(reply_ts_list), self.max_concurrency))))
+            if parent_ts:
+                await self._delete(client, channel_id, parent_ts, result, logger)
+            span.set_attributes({"successful": result.successful, "failed": result.failed})
+        return result
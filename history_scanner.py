@@ -0,0 +1,215 @@
+import os
+import logging
+
+from slack_sdk.errors import SlackApiError
+
+from tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+# Slack recommends pages of no more than 200 items for cursor-paginated methods
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "200"))
+
+
+class MessageRecord:
+    """The fields of a Slack message the sweeps and deletes use, kept instead of the full message dict.
+
+    Supports get() and "in" like the dict it replaces, so helpers such as has_thread_replies take either.
+    """
+
+    __slots__ = ("ts", "thread_ts", "subtype", "reply_count", "user")
+
+    def __init__(self, ts, thread_ts=None, subtype=None, reply_count=None, user=None):
+        self.ts = ts
+        self.thread_ts = thread_ts
+        self.subtype = subtype
+        self.reply_count = reply_count
+        self.user = user
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(message.get("ts", ""), message.get("thread_ts"), message.get("subtype"), message.get("reply_count"), message.get("user"))
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def __repr__(self):
+        return "MessageRecord(" + ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__) + ")"
+
+
+def compact_messages(messages):
+    """MessageRecords for a page of message dicts, so the page's full payload can be freed"""
+    return [MessageRecord.from_message(message) for message in messages]
+
+
+class HistoryPage(list):
+    """One page of MessageRecords, carrying the cursor of the page after it (None on the last page)"""
+
+    def __init__(self, messages, next_cursor=None):
+        super().__init__(messages)
+        self.next_cursor = next_cursor
+
+
+def iter_history_pages(client, channel_id, oldest=None, latest=None, inclusive=True, page_size=HISTORY_PAGE_SIZE, cursor=None):
+    """Yield each page of conversations.history in the oldest/latest window, following next_cursor.
+
+    Pass a cursor saved from HistoryPage.next_cursor to resume a scan where it stopped.
+    """
+    page_number = 0
+
+    while True:
+        with start_span("history.page", channel=channel_id, page=page_number + 1) as span:
+            response = client.conversations_history(
+                channel=channel_id,
+                oldest=oldest,
+                latest=latest,
+                inclusive=inclusive,
+                limit=page_size,
+                cursor=cursor
+            )
+
+            if not response.get("ok"):
+                # WebClient raises on its own, but keep the contract for clients that don't
+                raise SlackApiError(f"conversations.history failed: {response.get('error', 'Unknown error')}", response)
+
+            messages = compact_messages(response.get("messages", []))
+            span.set_attribute("messages", len(messages))
+
+        page_number += 1
+        logger.debug("History page %d for channel %s: %d messages", page_number, channel_id, len(messages))
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more", True):
+            cursor = None
+        # Only the records outlive this page; the response is dropped before the caller works through them
+        del response
+        yield HistoryPage(messages, cursor or None)
+
+        if not cursor:
+            return
+
+
+def has_thread_replies(message):
+    """True when history metadata shows the message is a thread parent that still has replies"""
+    if message.get("reply_count"):
+        return True
+    # Parents sometimes arrive without reply_count; only an explicit 0 or a missing thread rules out replies
+    thread_ts = message.get("thread_ts")
+    return thread_ts is not None and thread_ts == message.get("ts") and "reply_count" not in message
+
+
+def iter_thread_replies(client, channel_id, thread_ts, page_size=HISTORY_PAGE_SIZE):
+    """Yield every page of replies in a thread (parent excluded), following next_cursor"""
+    cursor = None
+
+    while True:
+        response = client.conversations_replies(
+            channel=channel_id,
+            ts=thread_ts,
+            limit=page_size,
+            cursor=cursor
+        )
+
+        if not response.get("ok"):
+            raise SlackApiError(f"conversations.replies failed: {response.get('error', 'Unknown error')}", response)
+
+        # Every page repeats the parent message, so drop it here
+        replies = [MessageRecord.from_message(message) for message in response.get("messages", []) if message.get("ts") != thread_ts]
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more", True):
+            cursor = None
+        yield HistoryPage(replies, cursor or None)
+
+        if not cursor:
+            return
+
+
+def iter_conversations(client, types="public_channel,private_channel", page_size=HISTORY_PAGE_SIZE):
+    """Yield every non-archived conversation the token can see, following next_cursor"""
+    cursor = None
+
+    while True:
+        response = client.conversations_list(
+            types=types,
+            exclude_archived=True,
+            limit=page_size,
+            cursor=cursor
+        )
+
+        if not response.get("ok"):
+            raise SlackApiError(f"conversations.list failed: {response.get('error', 'Unknown error')}", response)
+
+        yield from response.get("channels", [])
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return
+
+
+async def aiter_history_pages(client, channel_id, oldest=None, latest=None, inclusive=True, page_size=HISTORY_PAGE_SIZE):
+    """AsyncWebClient version of iter_history_pages"""
+    cursor = None
+    page_number = 0
+
+    while True:
+        with start_span("history.page", channel=channel_id, page=page_number + 1) as span:
+            response = await client.conversations_history(
+                channel=channel_id,
+                oldest=oldest,
+                latest=latest,
+                inclusive=inclusive,
+                limit=page_size,
+                cursor=cursor
+            )
+
+            if not response.get("ok"):
+                raise SlackApiError(f"conversations.history failed: {response.get('error', 'Unknown error')}", response)
+
+            messages = compact_messages(response.get("messages", []))
+            span.set_attribute("messages", len(messages))
+
+        page_number += 1
+        logger.debug("History page %d for channel %s: %d messages", page_number, channel_id, len(messages))
+        yield messages
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor or not response.get("has_more", True):
+            return
+
+
+async def aiter_history(client, channel_id, oldest=None, latest=None, inclusive=True, page_size=HISTORY_PAGE_SIZE):
+    """Stream every message in the oldest/latest window one at a time from an AsyncWebClient, fetching pages lazily"""
+    async for page in aiter_history_pages(client, channel_id, oldest=oldest, latest=latest, inclusive=inclusive, page_size=page_size):
+        for message in page:
+            yield message
+
+
+async def aiter_thread_replies(client, channel_id, thread_ts, page_size=HISTORY_PAGE_SIZE):
+    """AsyncWebClient version of iter_thread_replies"""
+    cursor = None
+
+    while True:
+        response = await client.conversations_replies(
+            channel=channel_id,
+            ts=thread_ts,
+            limit=page_size,
+            cursor=cursor
+        )
+
+        if not response.get("ok"):
+            raise SlackApiError(f"conversations.replies failed: {response.get('error', 'Unknown error')}", response)
+
+        replies = [MessageRecord.from_message(message) for message in response.get("messages", []) if message.get("ts") != thread_ts]
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more", True):
+            cursor = None
+        yield HistoryPage(replies, cursor or None)
+
+        if not cursor:
+            return
@@ -0,0 +1,157 @@
+import io
+import os
+import ssl
+import logging
+import threading
+import http.client
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+from slack_sdk import WebClient
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Idle keep-alive connections kept per host; size it to the deletion workers plus listeners and sweeps
+# that call Slack at the same time, or the extra calls open (and later drop) connections of their own
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+HTTP_CONNECTIONS = REGISTRY.counter(
+    "slack_http_connections_opened_total", "Connections opened to the Slack Web API", ("host",))
+HTTP_REQUESTS = REGISTRY.counter(
+    "slack_http_requests_total", "Web API requests by whether they reused a pooled connection", ("host", "connection"))
+HTTP_IDLE = REGISTRY.gauge(
+    "slack_http_idle_connections", "Keep-alive connections waiting in the pool", ("host",))
+
+# A reused connection failing with one of these was closed by the server while idle, before it saw the request
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class PooledTransport:
+    """Keep-alive HTTP(S) connections to the Web API, shared by every client that sends requests through it.
+
+    Each call borrows an idle connection to its host (most recently used first, so the pool shrinks back
+    when load drops) or opens a new one, and returns it once the response was read, so a steady stream of
+    calls pays for one TCP and TLS handshake per connection instead of one per call.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._idle = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self, scheme, host, timeout, ssl_context):
+        with self._lock:
+            idle = self._idle.get((scheme, host))
+            if idle:
+                HTTP_IDLE.set(len(idle) - 1, host=host)
+                return idle.pop(), True
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(host, timeout=timeout, context=ssl_context or ssl.create_default_context())
+        else:
+            connection = http.client.HTTPConnection(host, timeout=timeout)
+        HTTP_CONNECTIONS.inc(host=host)
+        with self._lock:
+            self._stats.setdefault(host, {"opened": 0, "reused": 0})["opened"] += 1
+        return connection, False
+
+    def _checkin(self, scheme, host, connection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                HTTP_IDLE.set(len(idle), host=host)
+                return
+        connection.close()
+
+    def request(self, method, url, body=None, headers=None, timeout=None, ssl_context=None):
+        """Send one request and return (status, headers, body bytes)"""
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        while True:
+            connection, reused = self._checkout(parts.scheme, parts.netloc, timeout, ssl_context)
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                connection.close()
+                if reused:
+                    # The server dropped it while idle; nothing was processed, so try again on a fresh one
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            break
+
+        HTTP_REQUESTS.inc(host=parts.netloc, connection="reused" if reused else "new")
+        if reused:
+            with self._lock:
+                self._stats.setdefault(parts.netloc, {"opened": 0, "reused": 0})["reused"] += 1
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(parts.scheme, parts.netloc, connection)
+        return response.status, response.msg, data
+
+    def stats(self):
+        """{host: {"opened": connections opened, "reused": requests sent on an already open connection}}"""
+        with self._lock:
+            return {host: dict(counts) for host, counts in self._stats.items()}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for (_, host), connections in idle.items():
+            HTTP_IDLE.set(0, host=host)
+            for connection in connections:
+                connection.close()
+
+
+class PooledWebClient(WebClient):
+    """WebClient sending its requests through a PooledTransport instead of a new urllib connection per call.
+
+    Only the socket handling changes: request building, error responses and retry handlers are still
+    slack_sdk's own. Clients configured with a proxy keep using urllib.
+    """
+
+    def __init__(self, *args, transport=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transport = transport or PooledTransport()
+
+    def _perform_urllib_http_request_internal(self, url, req):
+        if self.proxy is not None:
+            return super()._perform_urllib_http_request_internal(url, req)
+        status, headers, body = self.transport.request(
+            req.get_method(), url, body=req.data, headers=dict(req.header_items()), timeout=self.timeout, ssl_context=self.ssl
+        )
+        if not 200 <= status < 300:
+            # urlopen raises for these, and slack_sdk turns the HTTPError into a response (429s included)
+            raise HTTPError(url, status, http.client.responses.get(status, ""), headers, io.BytesIO(body))
+        charset = headers.get_content_charset() or "utf-8"
+        return {"status": status, "headers": headers, "body": body.decode(charset)}
+
+
+def pooled_client(client, transport):
+    """Copy of a WebClient sending through transport, e.g. the one Bolt builds for each request"""
+    if isinstance(client, PooledWebClient) and client.transport is transport:
+        return client
+    return PooledWebClient(
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl,
+        proxy=client.proxy,
+        headers=client.headers,
+        team_id=client.default_params.get("team_id"),
+        logger=client.logger,
+        retry_handlers=client.retry_handlers,
+        transport=transport,
+    )
@@ -0,0 +1,235 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding bulk job checkpoints so sweeps survive a restart
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.sqlite3")
+
+# Buffered outcome rows are written once this many are pending or this many seconds have passed
+JOB_STORE_BATCH_SIZE = int(os.getenv("JOB_STORE_BATCH_SIZE", "200"))
+JOB_STORE_FLUSH_INTERVAL = float(os.getenv("JOB_STORE_FLUSH_INTERVAL", "2"))
+
+# Kinds of checkpointed job; a resumed retention sweep still moves its channel's watermark when it completes
+SWEEP_JOB = "sweep"
+RETENTION_JOB = "retention"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    command_text TEXT NOT NULL,
+    oldest REAL NOT NULL,
+    latest REAL,
+    status TEXT NOT NULL,
+    cursor TEXT,
+    scan_complete INTEGER NOT NULL DEFAULT 0,
+    kind TEXT NOT NULL DEFAULT 'sweep',
+    reply_channel_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_threads (
+    job_id TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    PRIMARY KEY (job_id, thread_ts)
+);
+CREATE TABLE IF NOT EXISTS message_outcomes (
+    job_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (job_id, ts)
+);
+CREATE TABLE IF NOT EXISTS retention_watermarks (
+    channel_id TEXT PRIMARY KEY,
+    watermark REAL,
+    last_run REAL NOT NULL
+);
+"""
+
+
+class JobStore:
+    """SQLite checkpoint store for bulk sweeps: scan cursor, pending threads and per-message outcomes"""
+
+    def __init__(self, path=JOB_STORE_PATH, batch_size=JOB_STORE_BATCH_SIZE, flush_interval=JOB_STORE_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        # Stores created before scans could be bounded by latest lack the column
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "latest" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN latest REAL")
+        if "kind" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT 'sweep'")
+            self._conn.execute("UPDATE jobs SET kind = ? WHERE user_id = '' AND description LIKE 'scheduled, %'", (RETENTION_JOB,))
+        if "reply_channel_id" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN reply_channel_id TEXT")
+        # Older versions kept finished jobs and their outcomes forever
+        self._conn.execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running')")
+        for table in ("pending_threads", "message_outcomes"):
+            self._conn.execute(f"DELETE FROM {table} WHERE job_id NOT IN (SELECT id FROM jobs)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._outcomes = []
+        self._completed_threads = []
+        self._last_flush = time.monotonic()
+
+    def create_job(self, job, command_text, oldest, latest=None, kind=SWEEP_JOB, reply_channel_id=None):
+        """Save a new job; reply_channel_id is where its requester is told about it, if not the channel it sweeps"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, channel_id, user_id, description, command_text, oldest, latest, status, cursor, kind, "
+                "reply_channel_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?)",
+                (job.id, job.channel_id, job.user_id, job.description, command_text, oldest, latest, job.status, kind, reply_channel_id,
+                 now, now)
+            )
+            self._conn.commit()
+
+    def add_pending_threads(self, job_id, thread_ts_list):
+        """Persist orphaned threads found on a page before their deletion is queued"""
+        if not thread_ts_list:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pending_threads (job_id, thread_ts) VALUES (?, ?)",
+                [(job_id, ts) for ts in thread_ts_list]
+            )
+            self._conn.commit()
+
+    def record_outcome(self, job_id, ts, error):
+        """Buffer the outcome of one chat.delete (error is None on success)"""
+        with self._lock:
+            self._outcomes.append((job_id, ts, error))
+            self._flush_if_due()
+
+    def complete_thread(self, job_id, thread_ts):
+        """Buffer removal of a thread from the pending list once all its deletes finished"""
+        with self._lock:
+            self._completed_threads.append((job_id, thread_ts))
+            self._flush_if_due()
+
+    def checkpoint(self, job_id, cursor, scan_complete=False):
+        """Save the history cursor of the next page to scan, flushing buffered rows in the same transaction"""
+        with self._lock:
+            self._write_buffers()
+            self._conn.execute(
+                "UPDATE jobs SET cursor = ?, scan_complete = ?, status = 'running', updated_at = ? WHERE id = ?",
+                (cursor, int(scan_complete), time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def finish_job(self, job_id, status):
+        """Drop a finished job with its pending threads and outcomes, so it is never resumed and the file stays small.
+
+        Only the checkpoint is kept here; status is logged for the record.
+        """
+        with self._lock:
+            self._outcomes = [row for row in self._outcomes if row[0] != job_id]
+            self._completed_threads = [row for row in self._completed_threads if row[0] != job_id]
+            for table, column in (("jobs", "id"), ("pending_threads", "job_id"), ("message_outcomes", "job_id")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (job_id,))
+            self._conn.commit()
+        logger.info(f"Dropped checkpoint of {status} job {job_id}")
+
+    def flush(self):
+        with self._lock:
+            self._write_buffers()
+            self._conn.commit()
+
+    def _flush_if_due(self):
+        pending = len(self._outcomes) + len(self._completed_threads)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._write_buffers()
+            self._conn.commit()
+
+    def _write_buffers(self):
+        if self._outcomes:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO message_outcomes (job_id, ts, error) VALUES (?, ?, ?)",
+                self._outcomes
+            )
+            self._outcomes = []
+        if self._completed_threads:
+            self._conn.executemany(
+                "DELETE FROM pending_threads WHERE job_id = ? AND thread_ts = ?",
+                self._completed_threads
+            )
+            self._completed_threads = []
+        self._last_flush = time.monotonic()
+
+    def unfinished_jobs(self):
+        """Jobs that were queued or running when the process stopped"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, channel_id, user_id, description, command_text, oldest, latest, cursor, scan_complete, kind, "
+                "COALESCE(reply_channel_id, channel_id), created_at FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        columns = ("id", "channel_id", "user_id", "description", "command_text", "oldest", "latest", "cursor", "scan_complete", "kind",
+                   "reply_channel_id", "created_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def pending_threads(self, job_id):
+        with self._lock:
+            self._write_buffers()
+            self._conn.commit()
+            return [row[0] for row in self._conn.execute("SELECT thread_ts FROM pending_threads WHERE job_id = ?", (job_id,))]
+
+    def outcome_counts(self, job_id):
+        """Return (successful, failed) deletion counts recorded for a job"""
+        with self._lock:
+            self._write_buffers()
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT SUM(error IS NULL), SUM(error IS NOT NULL) FROM message_outcomes WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return (row[0] or 0, row[1] or 0)
+
+    def deleted_ts(self, job_id):
+        """Timestamps this job already deleted successfully"""
+        with self._lock:
+            self._write_buffers()
+            self._conn.commit()
+            return {row[0] for row in self._conn.execute("SELECT ts FROM message_outcomes WHERE job_id = ? AND error IS NULL", (job_id,))}
+
+    def watermark(self, channel_id):
+        """Start time of the last completed retention sweep of a channel, or None if it was never swept"""
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM retention_watermarks WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def claim_retention_run(self, channel_id, slot_start, now=None):
+        """Record a retention sweep of the channel for the slot starting at slot_start.
+
+        False if a run was already claimed in this slot, by this process or another one sharing the store.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO retention_watermarks (channel_id, watermark, last_run) VALUES (?, NULL, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET last_run = excluded.last_run WHERE retention_watermarks.last_run < ?",
+                (channel_id, now, slot_start)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def set_watermark(self, channel_id, watermark):
+        """Move a channel's watermark forward after a retention sweep completed"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE retention_watermarks SET watermark = MAX(COALESCE(watermark, 0), ?) WHERE channel_id = ?",
+                (watermark, channel_id)
+            )
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,223 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import HANDLER_QUEUE, JOBS_IN_FLIGHT
+from priority import BULK, INTERACTIVE, prioritized
+from rate_limiter import ApiBudget
+
+logger = logging.getLogger(__name__)
+
+# Number of bulk sweeps that can run at the same time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+# Number of interactive jobs (large threads handed off by the shortcut) that can run at the same time,
+# on workers of their own so they never wait behind bulk sweeps
+INTERACTIVE_JOB_WORKERS = int(os.getenv("INTERACTIVE_JOB_WORKERS", "4"))
+
+# Minimum number of seconds between progress updates sent to the requester
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "10"))
+
+# How many finished jobs are kept around for status queries
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+
+# Web API calls a bulk sweep may make before it stops as if cancelled (0 for no limit)
+JOB_API_BUDGET = int(os.getenv("JOB_API_BUDGET", "0"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class Job:
+    """A bulk sweep (or an interactive deletion) running on the job engine, with progress counters and cooperative cancellation"""
+
+    def __init__(self, job_id, channel_id, user_id, description, on_progress=None, progress_interval=JOB_PROGRESS_INTERVAL, parent=None,
+                 api_budget=None, priority=BULK, on_done=None):
+        self.id = job_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.description = description
+        self.priority = priority
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {
+            "scanned": 0,
+            "orphaned": 0,
+            "successful": 0,
+            "failed": 0,
+            "api_calls": 0,
+        }
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.progress_interval = progress_interval
+        self._last_progress_report = time.monotonic()
+        self._cancel_event = threading.Event()
+        # Cancelling a parent job (e.g. a workspace sweep) cancels its per-channel jobs too
+        self.parent = parent
+        # Every call made while the job runs is counted here (and in the parent job's budget)
+        self.budget = ApiBudget(api_budget, on_exhausted=self._budget_exhausted)
+
+    @property
+    def cancelled(self):
+        """True once cancellation was requested; sweeps check this between messages"""
+        return self._cancel_event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    @property
+    def finished(self):
+        return self.status in (COMPLETED, CANCELLED, FAILED)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _budget_exhausted(self, budget):
+        logger.warning(f"Job {self.id} spent its budget of {budget.limit} API calls, stopping")
+        self.error = f"API budget of {budget.limit} calls spent"
+        self.cancel()
+
+    def execute(self, func, *args, **kwargs):
+        """Run func(self, *args, **kwargs) on the calling thread, tracking status and timing.
+
+        func may set a final status itself (e.g. FAILED after an error it already reported). It runs in
+        the job's priority class with the job as its share, so bulk jobs let interactive calls go first
+        and jobs of a class take turns.
+        """
+        self.status = RUNNING
+        self.started_at = time.time()
+        try:
+            with self.budget, prioritized(self.priority, share=self.id):
+                func(self, *args, **kwargs)
+            if self.status == RUNNING:
+                self.status = CANCELLED if self.cancelled else COMPLETED
+        except Exception as e:
+            logger.error(f"Job {self.id} failed: {e}")
+            self.status = FAILED
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            logger.info(f"Job {self.id} {self.status} in {self.finished_at - self.started_at:.1f}s")
+            logger.info(f"Job {self.id} API calls: {self.budget.summary(self.progress['successful'])}")
+
+    def report_done(self):
+        """Call on_done once the job finished, whether it ran or was cancelled while queued"""
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(self)
+        except Exception as e:
+            logger.error(f"Error reporting the end of job {self.id}: {e}")
+
+    def report_progress(self, force=False):
+        """Call on_progress if at least progress_interval seconds passed since the last report"""
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress_report < self.progress_interval:
+            return
+        self._last_progress_report = now
+        try:
+            self.on_progress(self)
+        except Exception as e:
+            logger.error(f"Error reporting progress for job {self.id}: {e}")
+
+    def summary(self):
+        """One-line human readable status used in Slack replies"""
+        progress = self.progress
+        return (f"`{self.id}` {self.status} - {self.description}: scanned {progress['scanned']}, "
+                f"orphaned {progress['orphaned']}, deleted {progress['successful']}, failed {progress['failed']}, "
+                f"{progress['api_calls']} API calls")
+
+
+class JobEngine:
+    """In-process engine that runs bulk sweeps on its own worker threads, outside the Bolt listeners.
+
+    Interactive jobs run on a separate pool, so a shortcut's large thread never queues behind sweeps.
+    """
+
+    def __init__(self, max_workers=None, history_size=JOB_HISTORY_SIZE, interactive_workers=None):
+        self.max_workers = max_workers or JOB_WORKERS
+        self.interactive_workers = interactive_workers or INTERACTIVE_JOB_WORKERS
+        self.history_size = history_size
+        self._pools = {
+            BULK: ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sweep-job"),
+            INTERACTIVE: ThreadPoolExecutor(max_workers=self.interactive_workers, thread_name_prefix="interactive-job"),
+        }
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func, channel_id, user_id, description, *args, on_progress=None, job_id=None, api_budget=JOB_API_BUDGET,
+               priority=BULK, on_done=None, **kwargs):
+        """Queue func(job, *args, **kwargs) on a worker and return the Job right away.
+
+        Pass job_id to re-register a job restored from a checkpoint under its original ID, and
+        priority=INTERACTIVE for work a user is waiting on, which runs on the interactive pool.
+        on_done(job) is called on the worker once the job finished, even if it never started.
+        """
+        job = Job(job_id or uuid.uuid4().hex[:8], channel_id, user_id, description, on_progress=on_progress, api_budget=api_budget,
+                  priority=priority, on_done=on_done)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        JOBS_IN_FLIGHT.inc(kind=job.priority)
+        # Run in the submitter's context so the job's trace hangs off the command that started it
+        self._pools[priority].submit(contextvars.copy_context().run, self._run, job, func, args, kwargs)
+        logger.info(f"Queued job {job.id} for channel {channel_id}: {description}")
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            JOBS_IN_FLIGHT.dec(kind=job.priority)
+            job.report_done()
+            return
+        HANDLER_QUEUE.observe(time.time() - job.created_at, pool="sweep-job" if job.priority == BULK else "interactive-job")
+        try:
+            job.execute(func, *args, **kwargs)
+        finally:
+            JOBS_IN_FLIGHT.dec(kind=job.priority)
+            job.report_done()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once the history is full; running jobs are always kept
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, channel_id=None, active_only=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [
+            job for job in jobs
+            if (channel_id is None or job.channel_id == channel_id) and not (active_only and job.finished)
+        ]
+
+    def cancel(self, job_id):
+        """Request cancellation of a job, returning the Job or None if it is unknown"""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    @property
+    def in_flight(self):
+        return len(self.list_jobs(active_only=True))
+
+    def shutdown(self, wait=True):
+        for job in self.list_jobs(active_only=True):
+            job.cancel()
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Local port serving the Prometheus text endpoint at /metrics (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Interface the metrics endpoint binds to; keep it on localhost unless a scraper needs remote access
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base for a named metric with a fixed set of label names"""
+
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                sample = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[0][index] += 1
+                    break
+            sample[1] += value
+            sample[2] += 1
+
+    def _render_sample(self, key, sample):
+        counts, total, count = sample
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+API_CALLS = REGISTRY.counter(
+    "slack_api_calls_total", "Slack Web API calls by method, client and outcome", ("method", "client", "outcome"))
+API_LATENCY = REGISTRY.histogram(
+    "slack_api_call_duration_seconds", "Slack Web API round trip time, excluding rate limit waits", ("method",))
+API_RATE_LIMITED = REGISTRY.counter(
+    "slack_api_rate_limited_total", "HTTP 429 responses received from Slack", ("method",))
+API_RETRY_AFTER = REGISTRY.counter(
+    "slack_api_retry_after_seconds_total", "Seconds of Retry-After backoff requested by Slack", ("method",))
+API_THROTTLE_WAIT = REGISTRY.counter(
+    "slack_api_throttle_wait_seconds_total", "Seconds calls waited for a rate limit token", ("method",))
+DELETIONS = REGISTRY.counter(
+    "slack_deletions_total", "chat.delete outcomes; error is empty on success", ("outcome", "error"))
+DELETION_RETRIES = REGISTRY.counter(
+    "slack_deletion_retries_total", "chat.delete attempts repeated after a transient error", ("error",))
+HANDLER_LATENCY = REGISTRY.histogram(
+    "handler_duration_seconds", "Time spent inside each Bolt listener", ("handler",))
+HANDLER_QUEUE = REGISTRY.histogram(
+    "handler_queue_seconds", "Time work waited in a worker pool queue before it started", ("pool",))
+PRIORITY_QUEUE = REGISTRY.histogram(
+    "priority_queue_seconds", "Time work waited for a rate limit token or a deletion worker, by priority class",
+    ("priority", "queue"))
+JOBS_IN_FLIGHT = REGISTRY.gauge(
+    "sweep_jobs_in_flight", "Jobs queued or running on the job engine: bulk sweeps and large shortcut threads", ("kind",))
+
+
+def timed_handler(name):
+    """Decorator recording how long a Bolt listener (sync or async) runs"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+        return wrapper
+    return decorator
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that records how long each task waited for a free worker.
+
+    Tasks run in a copy of the submitter's context, so the current tracing span follows them.
+    """
+
+    def __init__(self, max_workers=None, thread_name_prefix="", pool_name="pool"):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.pool_name = pool_name
+
+    def submit(self, fn, *args, **kwargs):
+        queued_at = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def run():
+            HANDLER_QUEUE.observe(time.perf_counter() - queued_at, pool=self.pool_name)
+            return context.run(fn, *args, **kwargs)
+        return super().submit(run)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread, returning the server (or None when disabled or the port is taken)"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving Prometheus metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
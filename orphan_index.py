@@ -0,0 +1,241 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the event-driven index of tombstoned thread parents
+ORPHAN_INDEX_PATH = os.getenv("ORPHAN_INDEX_PATH", "orphan_index.sqlite3")
+
+# Longest downtime in seconds the index survives; after a longer gap missed events make it untrustworthy and it starts over
+ORPHAN_INDEX_MAX_GAP = float(os.getenv("ORPHAN_INDEX_MAX_GAP", "60"))
+
+# Threads whose parent is older than this many seconds are compacted away and their windows fall back to history scans
+ORPHAN_INDEX_RETENTION = float(os.getenv("ORPHAN_INDEX_RETENTION", str(30 * 24 * 3600)))
+
+# The index is compacted this often
+ORPHAN_INDEX_COMPACT_INTERVAL = float(os.getenv("ORPHAN_INDEX_COMPACT_INTERVAL", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    channel_id TEXT NOT NULL,
+    parent_ts TEXT NOT NULL,
+    tombstone INTEGER NOT NULL DEFAULT 0,
+    reply_count INTEGER,
+    PRIMARY KEY (channel_id, parent_ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS replies (
+    channel_id TEXT NOT NULL,
+    parent_ts TEXT NOT NULL,
+    reply_ts TEXT NOT NULL,
+    PRIMARY KEY (channel_id, parent_ts, reply_ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    channel_id TEXT PRIMARY KEY,
+    since REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+) WITHOUT ROWID;
+"""
+
+
+class OrphanIndex:
+    """Local index of tombstoned thread parents and their reply timestamps, fed by message events.
+
+    A channel is covered from the first event seen in it: every thread whose parent is newer than
+    that is fully known, so sweeps can answer that part of their window without conversations.history.
+
+    That only holds while this process gets every event. With several bot processes Socket Mode splits
+    the events between them, so while the index is shared (see set_shared) it claims no coverage, and
+    coverage starts over once this process is the only one again.
+    """
+
+    def __init__(self, path=ORPHAN_INDEX_PATH, max_gap=ORPHAN_INDEX_MAX_GAP, retention=ORPHAN_INDEX_RETENTION,
+                 compact_interval=ORPHAN_INDEX_COMPACT_INTERVAL):
+        self.path = path
+        self.max_gap = max_gap
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Must be set before the tables exist so compaction can hand freed pages back to the file system
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Every event is its own short transaction; in WAL mode a commit only syncs at checkpoints
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last_compact = time.monotonic()
+
+        last_seen = self._get_meta("last_seen")
+        if last_seen is None or time.time() - last_seen > self.max_gap:
+            # Events sent while the bot was down are lost, so nothing indexed before now can be trusted
+            if last_seen is not None:
+                logger.info(f"Orphan index was offline for {time.time() - last_seen:.0f}s, starting over")
+            self._reset()
+        # Still set if the process stopped while others were live; set_shared(False) starts coverage over
+        self.shared = bool(self._get_meta("shared"))
+        self.compact()
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _reset(self):
+        with self._lock:
+            for table in ("threads", "replies", "coverage"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._set_meta("last_seen", time.time())
+            self._conn.commit()
+
+    def observe(self, event):
+        """Update the index from one Slack message event"""
+        channel_id = event.get("channel")
+        if not channel_id:
+            return
+
+        subtype = event.get("subtype")
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO coverage (channel_id, since) VALUES (?, ?)", (channel_id, time.time()))
+
+            if subtype == "message_deleted":
+                self._message_deleted(channel_id, event.get("deleted_ts"), event.get("previous_message") or {})
+            elif subtype == "message_changed":
+                self._message_changed(channel_id, event.get("message") or {})
+            else:
+                thread_ts = event.get("thread_ts")
+                ts = event.get("ts")
+                if thread_ts and ts and thread_ts != ts:
+                    self._add_reply(channel_id, thread_ts, ts)
+
+            self._set_meta("last_seen", time.time())
+            # Committed right away, so the write lock is never held between events and a crash loses
+            # nothing that coverage already claims
+            self._conn.commit()
+
+        if time.monotonic() - self._last_compact >= self.compact_interval:
+            self.compact()
+
+    def _add_reply(self, channel_id, parent_ts, reply_ts):
+        self._conn.execute("INSERT OR IGNORE INTO threads (channel_id, parent_ts) VALUES (?, ?)", (channel_id, parent_ts))
+        self._conn.execute(
+            "INSERT OR IGNORE INTO replies (channel_id, parent_ts, reply_ts) VALUES (?, ?, ?)",
+            (channel_id, parent_ts, reply_ts)
+        )
+
+    def _message_changed(self, channel_id, message):
+        # Deleting a parent that still has replies turns it into a tombstone instead of removing it
+        if message.get("subtype") != "tombstone" or not message.get("ts"):
+            return
+        self._conn.execute("INSERT OR IGNORE INTO threads (channel_id, parent_ts) VALUES (?, ?)", (channel_id, message["ts"]))
+        self._conn.execute(
+            "UPDATE threads SET tombstone = 1, reply_count = ? WHERE channel_id = ? AND parent_ts = ?",
+            (message.get("reply_count"), channel_id, message["ts"])
+        )
+
+    def _message_deleted(self, channel_id, ts, previous_message):
+        if not ts:
+            return
+        parent_ts = previous_message.get("thread_ts")
+
+        if parent_ts and parent_ts != ts:
+            self._conn.execute(
+                "DELETE FROM replies WHERE channel_id = ? AND parent_ts = ? AND reply_ts = ?",
+                (channel_id, parent_ts, ts)
+            )
+            # Slack removes a tombstone together with its last reply
+            if not self._reply_count(channel_id, parent_ts):
+                self._conn.execute(
+                    "DELETE FROM threads WHERE channel_id = ? AND parent_ts = ? AND tombstone = 1",
+                    (channel_id, parent_ts)
+                )
+            return
+
+        if self._reply_count(channel_id, ts):
+            self._conn.execute("UPDATE threads SET tombstone = 1 WHERE channel_id = ? AND parent_ts = ?", (channel_id, ts))
+        else:
+            self._forget(channel_id, ts)
+
+    def _reply_count(self, channel_id, parent_ts):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM replies WHERE channel_id = ? AND parent_ts = ?", (channel_id, parent_ts)
+        ).fetchone()[0]
+
+    def _forget(self, channel_id, parent_ts):
+        self._conn.execute("DELETE FROM threads WHERE channel_id = ? AND parent_ts = ?", (channel_id, parent_ts))
+        self._conn.execute("DELETE FROM replies WHERE channel_id = ? AND parent_ts = ?", (channel_id, parent_ts))
+
+    def forget(self, channel_id, parent_ts):
+        """Drop a thread the bot has finished deleting"""
+        with self._lock:
+            self._forget(channel_id, parent_ts)
+            self._conn.commit()
+
+    def set_shared(self, shared):
+        """Record whether other live processes receive part of the events (with a count of live workers > 1)"""
+        with self._lock:
+            if shared == self.shared:
+                return
+            self.shared = shared
+            # Coverage gathered while events were split is incomplete either way
+            self._conn.execute("DELETE FROM coverage")
+            self._set_meta("shared", int(shared))
+            self._conn.commit()
+        logger.info(f"Orphan index {'ignored while other workers are live' if shared else 'covering channels again from now'}")
+
+    def covered_since(self, channel_id):
+        """Timestamp from which every thread in the channel is indexed, or None if the channel is not covered"""
+        if self.shared:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT since FROM coverage WHERE channel_id = ?", (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def candidates(self, channel_id, oldest, latest=None):
+        """Return (parent_ts, reply_ts_list) for every tombstone with oldest <= parent_ts <= latest.
+
+        reply_ts_list is None when the index saw fewer replies than the tombstone reported, so the
+        caller should look the thread up with conversations.replies instead.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT parent_ts, reply_count FROM threads WHERE channel_id = ? AND tombstone = 1 "
+                "AND CAST(parent_ts AS REAL) >= ? AND CAST(parent_ts AS REAL) <= ? ORDER BY parent_ts DESC",
+                (channel_id, oldest, latest if latest is not None else float("inf"))
+            ).fetchall()
+            result = []
+            for parent_ts, reply_count in rows:
+                reply_ts_list = [row[0] for row in self._conn.execute(
+                    "SELECT reply_ts FROM replies WHERE channel_id = ? AND parent_ts = ?", (channel_id, parent_ts)
+                )]
+                if reply_count is not None and reply_count > len(reply_ts_list):
+                    reply_ts_list = None
+                result.append((parent_ts, reply_ts_list))
+        return result
+
+    def compact(self):
+        """Drop threads past the retention period and release the space they used"""
+        floor = time.time() - self.retention
+        with self._lock:
+            dropped = self._conn.execute("DELETE FROM threads WHERE CAST(parent_ts AS REAL) < ?", (floor,)).rowcount
+            self._conn.execute("DELETE FROM replies WHERE CAST(parent_ts AS REAL) < ?", (floor,))
+            # Dropped threads are no longer known, so coverage can never reach back past the retention floor
+            self._conn.execute("UPDATE coverage SET since = ? WHERE since < ?", (floor, floor))
+            self._conn.commit()
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._last_compact = time.monotonic()
+        if dropped:
+            logger.info(f"Compacted orphan index, dropped {dropped} threads older than {self.retention:.0f}s")
+
+    def close(self):
+        with self._lock:
+            # A clean shutdown records when events stopped so a quick restart keeps the index
+            self._set_meta("last_seen", time.time())
+            self._conn.commit()
+            self._conn.close()
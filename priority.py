@@ -0,0 +1,244 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import contextlib
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from metrics import HANDLER_QUEUE, PRIORITY_QUEUE
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first: shortcut and other listener work, then bulk sweeps
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+# (priority class, share key) of the work running in this context; work with the same share key
+# (e.g. one sweep job) is served in turn with other keys of its class
+_current_priority = contextvars.ContextVar("priority", default=(INTERACTIVE, None))
+
+
+def current_priority():
+    """(priority class, share key) of the current context"""
+    return _current_priority.get()
+
+
+@contextlib.contextmanager
+def prioritized(priority, share=None):
+    """Run the block (and pool work or tasks started from it) in the given priority class and share"""
+    token = _current_priority.set((priority, share))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class FairQueue:
+    """Items ordered by priority class, round-robin across share keys within a class, FIFO within a share.
+
+    Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self):
+        self._classes = {priority: OrderedDict() for priority in PRIORITY_CLASSES}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def push(self, item, priority=INTERACTIVE, share=None):
+        self._classes[priority].setdefault(share, deque()).append(item)
+        self._length += 1
+
+    def peek(self):
+        """The item pop() would return, or None when empty"""
+        for shares in self._classes.values():
+            if shares:
+                return next(iter(shares.values()))[0]
+        return None
+
+    def pop(self):
+        """Remove and return the next item; its share moves behind the other shares of its class"""
+        for shares in self._classes.values():
+            if shares:
+                share, items = next(iter(shares.items()))
+                item = items.popleft()
+                if items:
+                    shares.move_to_end(share)
+                else:
+                    del shares[share]
+                self._length -= 1
+                return item
+        raise IndexError("pop from an empty FairQueue")
+
+    def remove(self, item, priority=INTERACTIVE, share=None):
+        """Drop a queued item (e.g. a waiter that gave up); no-op if it is not queued"""
+        items = self._classes[priority].get(share)
+        if items is None or item not in items:
+            return
+        items.remove(item)
+        self._length -= 1
+        if not items:
+            del self._classes[priority][share]
+
+
+class PriorityExecutor:
+    """Worker pool that takes queued tasks in FairQueue order instead of first come, first served.
+
+    Tasks keep the priority of the context they were submitted from, and run in a copy of it, so the
+    tracing span, API budget and priority follow them onto the worker. Time spent queued is recorded
+    per pool and per priority class. submit_after() holds a task back for a delay (e.g. a retry
+    backoff) without tying up a worker while it waits.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix="priority-pool", pool_name="pool"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.pool_name = pool_name
+        self._queue = FairQueue()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+        # (due, sequence, (future, context, fn, args, kwargs, priority, share)) held back by submit_after
+        self._delayed = []
+        self._sequence = itertools.count()
+
+    def submit(self, fn, *args, **kwargs):
+        priority, share = current_priority()
+        future = Future()
+        task = (future, contextvars.copy_context(), fn, args, kwargs, time.perf_counter(), priority)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._queue.push(task, priority, share)
+            self._grow()
+            self._condition.notify()
+        return future
+
+    def submit_after(self, delay, fn, *args, **kwargs):
+        """submit() once delay seconds have passed; the task is queued then with the caller's priority"""
+        priority, share = current_priority()
+        future = Future()
+        task = (future, contextvars.copy_context(), fn, args, kwargs, priority, share)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), task))
+            if not self._threads:
+                # Parked workers wake up for delayed tasks, so one has to exist
+                self._start_worker()
+            self._condition.notify()
+        return future
+
+    def _start_worker(self):
+        # Caller holds the condition
+        thread = threading.Thread(target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _grow(self):
+        # Caller holds the condition. Each parked worker takes one queued task, so any task beyond them needs a new worker
+        if len(self._queue) > self._idle and len(self._threads) < self.max_workers:
+            self._start_worker()
+
+    def _promote_due(self, everything=False):
+        # Caller holds the condition; queues the delayed tasks that are due (all of them on shutdown)
+        now = time.monotonic()
+        promoted = 0
+        while self._delayed and (everything or self._delayed[0][0] <= now):
+            _, _, (future, context, fn, args, kwargs, priority, share) = heapq.heappop(self._delayed)
+            self._queue.push((future, context, fn, args, kwargs, time.perf_counter(), priority), priority, share)
+            promoted += 1
+        if promoted:
+            self._grow()
+            self._condition.notify(promoted)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._idle += 1
+                while True:
+                    self._promote_due()
+                    if self._queue or self._shutdown:
+                        break
+                    self._condition.wait(self._delayed[0][0] - time.monotonic() if self._delayed else None)
+                self._idle -= 1
+                if not self._queue:
+                    return
+                future, context, fn, args, kwargs, queued_at, priority = self._queue.pop()
+
+            waited = time.perf_counter() - queued_at
+            HANDLER_QUEUE.observe(waited, pool=self.pool_name)
+            PRIORITY_QUEUE.observe(waited, priority=priority, queue=self.pool_name)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = context.run(fn, *args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait=True):
+        """Stop accepting tasks; workers finish what is already queued and exit"""
+        with self._condition:
+            self._shutdown = True
+            # Delayed tasks run right away rather than being dropped with their futures unresolved
+            self._promote_due(everything=True)
+            self._condition.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
+
+
+class AsyncPrioritySemaphore:
+    """asyncio.Semaphore whose waiters are served in FairQueue order instead of first come, first served.
+
+    Each acquire takes the priority of the task's context, so a shortcut's delete gets the next free
+    slot however many sweep deletes are waiting. Use it from a single event loop.
+    """
+
+    def __init__(self, value, pool_name="pool"):
+        self._value = value
+        self.pool_name = pool_name
+        self._waiters = FairQueue()
+
+    async def acquire(self):
+        priority, share = current_priority()
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            PRIORITY_QUEUE.observe(0.0, priority=priority, queue=self.pool_name)
+            return
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(waiter, priority, share)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._waiters.remove(waiter, priority, share)
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the task was cancelled
+                self.release()
+            raise
+        PRIORITY_QUEUE.observe(time.perf_counter() - started, priority=priority, queue=self.pool_name)
+
+    def release(self):
+        # Hand the slot straight to the next waiter, so nobody can take it in between
+        while self._waiters:
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,455 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from collections import Counter
+
+from slack_sdk.errors import SlackApiError
+
+from metrics import API_CALLS, API_LATENCY, API_RATE_LIMITED, API_RETRY_AFTER, API_THROTTLE_WAIT, PRIORITY_QUEUE
+from priority import INTERACTIVE, FairQueue, current_priority
+from tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute allowed for each Slack Web API rate limit tier
+# https://api.slack.com/apis/rate-limits
+TIER_LIMITS = {
+    1: 1,
+    2: 20,
+    3: 50,
+    4: 100,
+}
+
+# Tier of every Web API method the bot calls; anything not listed is treated as Tier 3
+METHOD_TIERS = {
+    "auth.test": 4,
+    "chat.delete": 3,
+    "chat.postEphemeral": 4,
+    "chat.update": 3,
+    "conversations.history": 3,
+    "conversations.info": 3,
+    "conversations.list": 2,
+    "conversations.replies": 3,
+    "users.info": 4,
+    "users.list": 2,
+}
+
+DEFAULT_TIER = 3
+
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+
+# Fallback wait when Slack returns 429 without a Retry-After header
+DEFAULT_RETRY_AFTER = 30
+
+# How often asyncio callers that are not first in line check whether they are
+ASYNC_WAITER_POLL = 0.05
+
+# WebClient attributes that are callable but are not Web API methods
+_PASSTHROUGH_ATTRIBUTES = {"api_call"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed requests-per-minute rate.
+
+    Callers waiting for a token are served in FairQueue order: interactive work before bulk work, and
+    bulk jobs in turn, so a queued shortcut call takes the next token however many sweep calls wait.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        # Allow roughly ten seconds worth of burst before calls start spacing out
+        self.capacity = capacity or max(1, int(per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Condition()
+        self._waiters = FairQueue()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def _take(self):
+        # Caller holds the lock
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        """Take a token if one is available and nobody is waiting, otherwise return how many seconds to wait for one"""
+        with self.lock:
+            if self._waiters:
+                return max(1 / self.rate, self.paused_until - time.monotonic())
+            return self._take()
+
+    def _poll(self, ticket):
+        """Take a token for ticket if it is first in line: 0 when taken, else seconds to wait (None when not first)"""
+        if self._waiters.peek() is not ticket:
+            return None
+        wait = self._take()
+        if wait <= 0:
+            self._waiters.pop()
+            # Whoever is first now may be able to go as well
+            self.lock.notify_all()
+        return wait
+
+    def acquire(self, priority=INTERACTIVE, share=None):
+        """Block until a token is available, returning the number of seconds spent waiting"""
+        started = time.monotonic()
+        ticket = object()
+        with self.lock:
+            self._waiters.push(ticket, priority, share)
+            # A more urgent caller changes who is first in line
+            self.lock.notify_all()
+            try:
+                while True:
+                    wait = self._poll(ticket)
+                    if wait is not None and wait <= 0:
+                        return time.monotonic() - started
+                    self.lock.wait(wait)
+            finally:
+                self._waiters.remove(ticket, priority, share)
+                self.lock.notify_all()
+
+    async def acquire_async(self, priority=INTERACTIVE, share=None):
+        """Wait on the event loop until a token is available, returning the number of seconds spent waiting"""
+        started = time.monotonic()
+        ticket = object()
+        with self.lock:
+            self._waiters.push(ticket, priority, share)
+        try:
+            while True:
+                with self.lock:
+                    wait = self._poll(ticket)
+                if wait is not None and wait <= 0:
+                    return time.monotonic() - started
+                await asyncio.sleep(ASYNC_WAITER_POLL if wait is None else wait)
+        finally:
+            with self.lock:
+                self._waiters.remove(ticket, priority, share)
+
+    def set_rate(self, per_minute):
+        """Change the refill rate (and burst capacity) keeping the tokens already earned"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = per_minute / 60.0
+            self.capacity = max(1, int(per_minute // 6))
+            self.tokens = min(self.tokens, self.capacity)
+            self.lock.notify_all()
+
+    def pause(self, seconds):
+        """Stop handing out tokens for the given number of seconds (used after a 429)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            # Leave a single token so one requeued call goes out as soon as the pause ends
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = self.paused_until
+            self.lock.notify_all()
+
+
+def get_retry_after(response):
+    """Read the Retry-After header (in seconds) from a throttled Slack response"""
+    headers = getattr(response, "headers", None) or {}
+    for key, value in headers.items():
+        if key.lower() == "retry-after":
+            value = value[0] if isinstance(value, (list, tuple)) else value
+            try:
+                return max(0.0, float(value))
+            except (TypeError, ValueError):
+                break
+    return DEFAULT_RETRY_AFTER
+
+
+def is_rate_limited(error):
+    """Return True if a SlackApiError is an HTTP 429 / ratelimited response"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return False
+    if getattr(response, "status_code", None) == 429:
+        return True
+    try:
+        return response.get("error") == "ratelimited"
+    except AttributeError:
+        return False
+
+
+class RateLimitScheduler:
+    """Central per-method scheduler that keeps every Web API call within its Slack tier budget"""
+
+    def __init__(self, tier_limits=None, method_tiers=None, max_retries=RATE_LIMIT_MAX_RETRIES):
+        self.tier_limits = tier_limits or TIER_LIMITS
+        self.method_tiers = method_tiers or METHOD_TIERS
+        self.max_retries = max_retries
+        # Fraction of the app's tier limits this process may use; see set_share
+        self.share = 1.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _limit(self, method):
+        return self.tier_limits[self.method_tiers.get(method, DEFAULT_TIER)] * self.share
+
+    def set_share(self, share):
+        """Scale every tier limit by share, e.g. 1/3 when three bot processes split the app's budget.
+
+        Slack's limits are per app and workspace, so replicas have to divide them between themselves.
+        """
+        with self._lock:
+            self.share = share
+            for method, bucket in self._buckets.items():
+                bucket.set_rate(self._limit(method))
+
+    def bucket_for(self, method):
+        """Return the token bucket for a Web API method, creating it on first use"""
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(method)
+                if bucket is None:
+                    bucket = TokenBucket(self._limit(method))
+                    self._buckets[method] = bucket
+        return bucket
+
+    def call(self, method, func, *args, **kwargs):
+        """Run func once a token for method is available, waiting out Retry-After and requeueing on 429"""
+        bucket = self.bucket_for(method)
+        priority, share = current_priority()
+        attempt = 0
+
+        while True:
+            waited = bucket.acquire(priority, share)
+            API_THROTTLE_WAIT.inc(waited, method=method)
+            PRIORITY_QUEUE.observe(waited, priority=priority, queue="api")
+            try:
+                return func(*args, **kwargs)
+            except SlackApiError as e:
+                if not is_rate_limited(e):
+                    raise
+                retry_after = get_retry_after(e.response)
+                API_RATE_LIMITED.inc(method=method)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                API_RETRY_AFTER.inc(retry_after, method=method)
+                logger.warning(f"Rate limited on {method}, retrying in {retry_after:.1f}s (attempt {attempt}/{self.max_retries})")
+                # Pause the whole method so every caller backs off, not just this one
+                bucket.pause(retry_after)
+
+    async def call_async(self, method, func, *args, **kwargs):
+        """Coroutine version of call for AsyncWebClient methods"""
+        bucket = self.bucket_for(method)
+        priority, share = current_priority()
+        attempt = 0
+
+        while True:
+            waited = await bucket.acquire_async(priority, share)
+            API_THROTTLE_WAIT.inc(waited, method=method)
+            PRIORITY_QUEUE.observe(waited, priority=priority, queue="api")
+            try:
+                return await func(*args, **kwargs)
+            except SlackApiError as e:
+                if not is_rate_limited(e):
+                    raise
+                retry_after = get_retry_after(e.response)
+                API_RATE_LIMITED.inc(method=method)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                API_RETRY_AFTER.inc(retry_after, method=method)
+                logger.warning(f"Rate limited on {method}, retrying in {retry_after:.1f}s (attempt {attempt}/{self.max_retries})")
+                bucket.pause(retry_after)
+
+
+_current_budget = contextvars.ContextVar("api_budget", default=None)
+
+
+class ApiBudget:
+    """Count of the Web API calls made on behalf of one invocation, by method, with an optional limit.
+
+    Use as a context manager: calls made inside it (including on pool workers and tasks started
+    from it) are charged to it and to every budget it was opened inside. on_exhausted(budget) is
+    called once when the limit is reached; calls are not refused, the owner decides how to stop.
+    """
+
+    def __init__(self, limit=None, on_exhausted=None):
+        self.limit = limit or None
+        self.on_exhausted = on_exhausted
+        self.calls = Counter()
+        self.parent = None
+        self.exhausted = False
+        self._lock = threading.Lock()
+        self._token = None
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def __enter__(self):
+        self.parent = _current_budget.get()
+        self._token = _current_budget.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_budget.reset(self._token)
+        return False
+
+    def charge(self, method):
+        budget = self
+        while budget is not None:
+            budget._charge(method)
+            budget = budget.parent
+
+    def _charge(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            just_exhausted = self.limit is not None and not self.exhausted and sum(self.calls.values()) >= self.limit
+            if just_exhausted:
+                self.exhausted = True
+        if just_exhausted and self.on_exhausted is not None:
+            try:
+                self.on_exhausted(self)
+            except Exception as e:
+                logger.error(f"Error handling exhausted API budget: {e}")
+
+    def summary(self, deleted=None):
+        """Per-method call counts, largest first, with the total and the calls per deleted message"""
+        with self._lock:
+            calls = sorted(self.calls.items(), key=lambda item: (-item[1], item[0]))
+        total = sum(count for _, count in calls)
+        per_method = ", ".join(f"{method} {count}" for method, count in calls) or "no API calls"
+        if deleted:
+            return f"{per_method} ({total} calls, {total / deleted:.2f} per deleted message)"
+        if deleted is not None:
+            return f"{per_method} ({total} calls, nothing deleted)"
+        return f"{per_method} ({total} calls)"
+
+
+def current_budget():
+    """The innermost active ApiBudget, or None"""
+    return _current_budget.get()
+
+
+def metered(func):
+    """Decorator running each call of a function (sync or async) inside a fresh ApiBudget"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with ApiBudget():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with ApiBudget():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _charge(method):
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.charge(method)
+
+
+def _api_outcome(error):
+    return "ratelimited" if is_rate_limited(error) else "error"
+
+
+def _timed(method, client_name, func):
+    """Wrap a WebClient method so every attempt is charged to the current budget and records its latency and outcome"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _charge(method)
+        started = time.perf_counter()
+        outcome = "ok"
+        with start_span(f"slack.{method}", client=client_name) as span:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                outcome = _api_outcome(e)
+                raise
+            finally:
+                span.set_attribute("outcome", outcome)
+                API_LATENCY.observe(time.perf_counter() - started, method=method)
+                API_CALLS.inc(method=method, client=client_name, outcome=outcome)
+    return wrapper
+
+
+def _timed_async(method, client_name, func):
+    """AsyncWebClient version of _timed"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        _charge(method)
+        started = time.perf_counter()
+        outcome = "ok"
+        with start_span(f"slack.{method}", client=client_name) as span:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                outcome = _api_outcome(e)
+                raise
+            finally:
+                span.set_attribute("outcome", outcome)
+                API_LATENCY.observe(time.perf_counter() - started, method=method)
+                API_CALLS.inc(method=method, client=client_name, outcome=outcome)
+    return wrapper
+
+
+class RateLimitedClient:
+    """Proxy around a WebClient that routes every Web API method through a RateLimitScheduler.
+
+    name labels the client ("bot" or "user") in the API call metrics.
+    """
+
+    def __init__(self, client, scheduler, name="bot"):
+        self._client = client
+        self._scheduler = scheduler
+        self.name = name
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in _PASSTHROUGH_ATTRIBUTES or not callable(attr):
+            return attr
+        # WebClient method names mirror the API method with dots replaced (chat_delete -> chat.delete)
+        method = name.replace("_", ".")
+        return functools.partial(self._scheduler.call, method, _timed(method, self.name, attr))
+
+    @property
+    def wrapped(self):
+        """The underlying WebClient"""
+        return self._client
+
+
+class AsyncRateLimitedClient(RateLimitedClient):
+    """RateLimitedClient for AsyncWebClient, whose methods return coroutines"""
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in _PASSTHROUGH_ATTRIBUTES or not callable(attr):
+            return attr
+        method = name.replace("_", ".")
+        return functools.partial(self._scheduler.call_async, method, _timed_async(method, self.name, attr))
+
+
+def rate_limited(client, scheduler, name="bot"):
+    """Wrap a client in the scheduler unless it is already wrapped"""
+    if client is None or isinstance(client, RateLimitedClient):
+        return client
+    return RateLimitedClient(client, scheduler, name)
+
+
+def async_rate_limited(client, scheduler, name="bot"):
+    """Wrap an AsyncWebClient in the scheduler unless it is already wrapped"""
+    if client is None or isinstance(client, AsyncRateLimitedClient):
+        return client
+    return AsyncRateLimitedClient(client, scheduler, name)
@@ -0,0 +1,95 @@
+import os
+import time
+import zlib
+import logging
+import threading
+
+from time_periods import parse_time_period
+
+logger = logging.getLogger(__name__)
+
+# Channels swept for orphaned messages on a schedule, comma separated (empty turns scheduled sweeps off)
+RETENTION_CHANNELS = [channel.strip() for channel in os.getenv("RETENTION_CHANNELS", "").split(",") if channel.strip()]
+
+# How often each channel is swept, as a duration like 1h or 30m
+RETENTION_INTERVAL = parse_time_period(os.getenv("RETENTION_INTERVAL", "1h")) or 3600
+
+# How far back the first sweep of a channel reaches; later sweeps start from the channel's watermark
+RETENTION_LOOKBACK = parse_time_period(os.getenv("RETENTION_LOOKBACK", "1d")) or 86400
+
+# Seconds before the watermark each sweep starts, to catch parents deleted shortly after the last sweep saw them
+RETENTION_OVERLAP = float(os.getenv("RETENTION_OVERLAP", "300"))
+
+# Seconds between checks for channels that are due
+RETENTION_TICK = 30
+
+
+class RetentionScheduler:
+    """Runs an incremental orphan sweep on each configured channel once per interval.
+
+    Each channel gets a fixed offset within the interval (derived from its ID, so every process agrees),
+    which spreads the sweeps out instead of firing them all at once. A sweep only scans from the channel's
+    watermark minus the overlap, so its cost follows the traffic since the previous sweep.
+    submit(channel_id, oldest) queues the sweep; it moves the watermark forward once the sweep completes.
+    """
+
+    def __init__(self, store, submit, channels=None, interval=RETENTION_INTERVAL, lookback=RETENTION_LOOKBACK,
+                 overlap=RETENTION_OVERLAP, tick=RETENTION_TICK):
+        self.store = store
+        self.submit = submit
+        self.channels = RETENTION_CHANNELS if channels is None else channels
+        self.interval = interval
+        self.lookback = lookback
+        self.overlap = overlap
+        self.tick = tick
+        # Slots that began before the scheduler started are skipped, so a restart does not sweep every channel at once
+        self.started_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def offset(self, channel_id):
+        """Seconds into each interval at which the channel is swept"""
+        return zlib.crc32(channel_id.encode()) % int(self.interval)
+
+    def slot_start(self, channel_id, now):
+        """Start of the interval slot containing now for this channel"""
+        return now - (now - self.offset(channel_id)) % self.interval
+
+    def run_due(self, now=None):
+        """Queue a sweep for every channel whose current slot has not been swept yet"""
+        now = time.time() if now is None else now
+        for channel_id in self.channels:
+            slot_start = self.slot_start(channel_id, now)
+            if slot_start < self.started_at:
+                continue
+            # The claim is shared through the store, so only one process sweeps a channel per slot
+            if not self.store.claim_retention_run(channel_id, slot_start, now):
+                continue
+            watermark = self.store.watermark(channel_id)
+            oldest = now - self.lookback if watermark is None else watermark - self.overlap
+            logger.info(f"Scheduled retention sweep of channel {channel_id} from {oldest:.0f}")
+            try:
+                self.submit(channel_id, oldest)
+            except Exception as e:
+                logger.error(f"Error queueing retention sweep of channel {channel_id}: {e}")
+
+    def start(self):
+        if self._thread is not None or not self.channels:
+            return
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="retention-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sweeping {len(self.channels)} channel(s) for orphaned messages every {self.interval:.0f}s")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"Error running scheduled retention sweeps: {e}")
+            self._stop.wait(self.tick)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _range_text(oldest, latest):
+    # Command text for a window that is no longer the one a requester typed; the end is left out for "until now"
+    start = datetime.fromtimestamp(oldest).isoformat(timespec="seconds")
+    end = datetime.fromtimestamp(latest).isoformat(timespec="seconds") if latest is not None else ""
+    return f"{start}..{end}"
+
+
+class SweepWindow:
+    """The time window one sweep job scans, and everyone waiting for its results.
+
+    oldest and latest are Unix timestamps (latest None for "up to now"). Until the job starts scanning
+    the window may still be widened to take in overlapping requests; after that it only gains requesters.
+    A window running up to now is pinned to the time its scan started, since messages orphaned after
+    that may be behind the scan already.
+    """
+
+    __slots__ = ("channel_id", "oldest", "latest", "command_text", "requesters", "job", "started")
+
+    def __init__(self, channel_id, oldest, latest, command_text, requester):
+        self.channel_id = channel_id
+        self.oldest = oldest
+        self.latest = latest
+        self.command_text = command_text
+        self.requesters = [requester]
+        self.job = None
+        self.started = False
+
+    def covers(self, oldest, latest):
+        """True if the window contains [oldest, latest]; windows waiting to scan up to now cover any other that does"""
+        if oldest < self.oldest:
+            return False
+        return self.latest is None or (latest is not None and latest <= self.latest)
+
+    def overlaps(self, oldest, latest):
+        """True if [oldest, latest] overlaps or touches the window, so their union is one range"""
+        return (latest is None or latest >= self.oldest) and (self.latest is None or oldest <= self.latest)
+
+    def widen(self, oldest, latest):
+        self.oldest = min(self.oldest, oldest)
+        self.latest = None if latest is None or self.latest is None else max(self.latest, latest)
+        self.command_text = _range_text(self.oldest, self.latest)
+
+
+class SweepPlanner:
+    """Per-channel plan of the /remove-orphaned-messages sweeps queued or running in this process.
+
+    A request whose window is already covered by a sweep of its channel joins that sweep, and one that
+    overlaps a sweep which has not started scanning yet widens it, so the channel's history and thread
+    replies are fetched once for every moderator reacting to the same incident. A request reaching
+    further back than a running sweep only gets a new sweep for the part that sweep does not cover.
+    """
+
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def plan(self, channel_id, oldest, latest, command_text, requester):
+        """Find or create the sweep for a request and add requester to it.
+
+        Returns (window, new, joined): new is True when the caller has to submit a job for window and
+        set window.job; joined lists the running sweeps covering the rest of the request, which report
+        to requester too.
+        """
+        with self._lock:
+            windows = self._windows.setdefault(channel_id, [])
+
+            for window in windows:
+                if window.covers(oldest, latest):
+                    window.requesters.append(requester)
+                    return window, False, []
+
+            for window in windows:
+                if not window.started and window.overlaps(oldest, latest):
+                    window.widen(oldest, latest)
+                    window.requesters.append(requester)
+                    return window, False, []
+
+            # A running sweep covering the newer end of the request leaves only the part before it to scan
+            joined = []
+            for window in windows:
+                if window.started and window.oldest > oldest and window.covers(window.oldest, latest):
+                    latest = window.oldest
+                    command_text = _range_text(oldest, latest)
+                    window.requesters.append(requester)
+                    joined.append(window)
+
+            window = SweepWindow(channel_id, oldest, latest, command_text, requester)
+            windows.append(window)
+            return window, True, joined
+
+    def start(self, window, now=None):
+        """Freeze the window as its job starts scanning, returning (oldest, latest, command_text).
+
+        A window running up to now ends at the scan's start from then on, so later requests up to now
+        get a sweep of their own instead of joining one that may already have passed their tombstones.
+        """
+        with self._lock:
+            window.started = True
+            if window.latest is None:
+                window.latest = time.time() if now is None else now
+            return window.oldest, window.latest, window.command_text
+
+    def finish(self, window):
+        with self._lock:
+            windows = self._windows.get(window.channel_id, [])
+            if window in windows:
+                windows.remove(window)
+            if not windows:
+                self._windows.pop(window.channel_id, None)
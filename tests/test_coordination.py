@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coordination import Coordinator, MemoryLeaseBackend, SqliteLeaseBackend
+
+
+def check_lease_expiry(backend):
+    assert backend.acquire("job:1", "a", 0.05)
+    assert not backend.acquire("job:1", "b", 0.05)
+    # The holder renews its own lease
+    assert backend.acquire("job:1", "a", 0.05)
+    assert backend.holders("job:") == {"job:1": "a"}
+
+    time.sleep(0.06)
+    assert backend.holders("job:") == {}
+    assert backend.acquire("job:1", "b", 0.05)
+    backend.release("job:1", "a")
+    assert backend.holders("job:") == {"job:1": "b"}
+    backend.release("job:1", "b")
+    assert backend.acquire("job:1", "a", 0.05)
+
+
+def test_memory_leases_expire():
+    check_lease_expiry(MemoryLeaseBackend())
+
+
+def test_sqlite_leases_expire(tmp_path):
+    backend = SqliteLeaseBackend(str(tmp_path / "coordination.sqlite3"))
+    check_lease_expiry(backend)
+    backend.close()
+
+
+def test_jobs_of_a_dead_worker_can_be_adopted():
+    backend = MemoryLeaseBackend()
+    dead = Coordinator(backend=backend, worker_id="dead", ttl=0.05)
+    live = Coordinator(backend=backend, worker_id="live", ttl=0.05)
+    assert dead.try_acquire("job:1", dead.owner_for("1"))
+    assert not live.try_acquire("job:1", live.owner_for("1"))
+    assert live.holder("job:1") == "dead/1"
+
+    # dead never renews its lease, so it lapses after one TTL
+    time.sleep(0.06)
+    assert live.holder("job:1") is None
+    assert live.try_acquire("job:1", live.owner_for("1"))
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deletion
+from deletion import AsyncDeletionExecutor, DeletionExecutor, classify_delete_error
+from priority import BULK, prioritized
+from undeletable import UndeletableCache
+
+
+class FakeClient:
+    """chat_delete answers with the queued errors for each ts, then succeeds"""
+
+    def __init__(self, token="xoxb-test", errors=None, latency=0.0):
+        self.token = token
+        self.errors = {ts: list(queued) for ts, queued in (errors or {}).items()}
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def chat_delete(self, channel, ts):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls.append(ts)
+            queued = self.errors.get(ts)
+            error = queued.pop(0) if queued else None
+        if error == "timeout":
+            raise TimeoutError("timed out")
+        return {"ok": error is None, "error": error}
+
+
+def test_error_classes():
+    assert classify_delete_error("cant_delete_message") == deletion.PERMANENT
+    assert classify_delete_error("internal_error") == deletion.TRANSIENT
+    assert classify_delete_error("TimeoutError") == deletion.TRANSIENT
+    assert classify_delete_error("ratelimited") is None
+    assert classify_delete_error("KeyError") is None
+    assert classify_delete_error("invalid_auth") is None
+
+
+def test_message_not_found_counts_as_deleted():
+    client = FakeClient(errors={"1": ["message_not_found"]})
+    result = DeletionExecutor(2).delete_thread(client, "C1", "1")
+    assert (result.successful, result.failed) == (1, 0)
+
+
+def test_transient_retries_do_not_hold_workers(monkeypatch):
+    monkeypatch.setattr(deletion, "retry_backoff", lambda attempt: 0.3)
+    client = FakeClient(errors={"1": ["internal_error"], "2": ["timeout"]}, latency=0.01)
+    executor = DeletionExecutor(1)
+    started = time.perf_counter()
+    slow = executor.submit_thread(client, "C1", "1")
+    # Runs on the only worker while the first delete waits for its retry
+    other = executor.delete_thread(client, "C1", "3")
+    assert time.perf_counter() - started < 0.2
+    assert (other.successful, slow.result().successful, slow.result().api_calls) == (1, 1, 2)
+
+    result = executor.delete_thread(client, "C1", None, ["2"])
+    assert (result.successful, result.api_calls) == (1, 2)
+
+
+def test_permanent_refusals_are_cached_per_token(tmp_path):
+    cache = UndeletableCache(str(tmp_path / "undeletable.sqlite3"))
+    executor = DeletionExecutor(2, undeletable=cache)
+    bot = FakeClient(errors={"1": ["cant_delete_message"] * 2})
+
+    first = executor.delete_thread(bot, "C1", "1")
+    second = executor.delete_thread(bot, "C1", "1")
+    assert bot.calls == ["1"]
+    assert (first.failed, second.failed, second.api_calls) == (1, 1, 0)
+
+    # Another token may be allowed to delete what the bot token could not
+    user = FakeClient(token="xoxp-test")
+    assert executor.delete_thread(user, "C1", "1").successful == 1
+    cache.close()
+
+
+def test_shortcut_deletes_do_not_wait_for_a_bulk_thread():
+    client = FakeClient(latency=0.01)
+    executor = DeletionExecutor(2)
+    with prioritized(BULK, share="sweep"):
+        bulk = executor.submit_thread(client, "C1", "0", [str(ts) for ts in range(1, 301)])
+    time.sleep(0.05)
+
+    started = time.perf_counter()
+    result = executor.delete_thread(client, "C2", "shortcut")
+    waited = time.perf_counter() - started
+    assert result.successful == 1
+    assert waited < 0.1
+    assert not bulk.done()
+    assert bulk.result().successful == 301 and client.calls[-1] == "0"
+
+
+class FakeAsyncClient(FakeClient):
+    async def chat_delete(self, channel, ts):
+        await asyncio.sleep(self.latency)
+        self.calls.append(ts)
+        return {"ok": True}
+
+
+def test_async_shortcut_deletes_go_ahead_of_waiting_bulk_deletes():
+    async def scenario():
+        client = FakeAsyncClient(latency=0.02)
+        executor = AsyncDeletionExecutor(2)
+        with prioritized(BULK, share="sweep"):
+            sweep = [
+                asyncio.create_task(executor.delete_thread(client, "C1", f"{thread}.0", [f"{thread}.{ts}" for ts in range(1, 21)]))
+                for thread in range(10)
+            ]
+        await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        result = await executor.delete_thread(client, "C2", "shortcut")
+        waited = time.perf_counter() - started
+        results = await asyncio.gather(*sweep)
+        return result, waited, results
+
+    result, waited, results = asyncio.run(scenario())
+    assert result.successful == 1
+    assert waited < 0.08
+    assert sum(thread.successful for thread in results) == 210
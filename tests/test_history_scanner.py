@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_scanner import iter_history_pages
+
+
+class FakeHistoryClient:
+    """conversations_history serving messages page by page, with the page index as the cursor"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.cursors = []
+
+    def conversations_history(self, channel, oldest, latest, inclusive, limit, cursor):
+        self.cursors.append(cursor)
+        index = int(cursor or 0)
+        has_more = index + 1 < len(self.pages)
+        return {
+            "ok": True,
+            "messages": [{"ts": ts} for ts in self.pages[index]],
+            "has_more": has_more,
+            "response_metadata": {"next_cursor": str(index + 1) if has_more else ""},
+        }
+
+
+def test_scan_resumes_from_a_saved_cursor():
+    client = FakeHistoryClient([["3", "2"], ["1"], ["0"]])
+    pages = iter_history_pages(client, "C1", page_size=2)
+    first = next(pages)
+    assert [message.ts for message in first] == ["3", "2"]
+    saved = first.next_cursor
+
+    resumed = list(iter_history_pages(client, "C1", page_size=2, cursor=saved))
+    assert [[message.ts for message in page] for page in resumed] == [["1"], ["0"]]
+    assert [page.next_cursor for page in resumed] == ["2", None]
+    assert client.cursors == [None, "1", "2"]
+
+
+def test_no_cursor_after_the_last_page():
+    class StaleCursorClient:
+        # Slack may still send a cursor with has_more false
+        def conversations_history(self, **kwargs):
+            return {"ok": True, "messages": [], "has_more": False, "response_metadata": {"next_cursor": "stale"}}
+
+    assert [page.next_cursor for page in iter_history_pages(StaleCursorClient(), "C1")] == [None]
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_store import RETENTION_JOB, SWEEP_JOB, JobStore
+from jobs import COMPLETED, Job
+
+
+def test_finish_job_drops_its_rows(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = Job("j1", "C1", "U1", "test")
+    store.create_job(job, "1d", 0)
+    store.add_pending_threads(job.id, ["1", "2"])
+    store.record_outcome(job.id, "1", None)
+    store.checkpoint(job.id, "cursor")
+    store.record_outcome(job.id, "2", "cant_delete_message")
+
+    store.finish_job(job.id, COMPLETED)
+    assert store.unfinished_jobs() == []
+    for table in ("jobs", "pending_threads", "message_outcomes"):
+        assert store._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+    store.close()
+
+
+def test_unfinished_jobs_keep_their_kind(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create_job(Job("j1", "C1", "", "scheduled"), "2024-01-01T00:00:00..", 0, kind=RETENTION_JOB)
+    store.create_job(Job("j2", "C1", "U1", "test"), "1d", 0)
+    saved = store.unfinished_jobs()
+    assert [job["kind"] for job in saved] == [RETENTION_JOB, SWEEP_JOB]
+    assert saved[0]["created_at"] > 0
+    store.close()
+
+
+def test_unfinished_jobs_report_to_the_requesting_channel(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    # A workspace sweep's per-channel job sweeps C2 but was requested from C1
+    store.create_job(Job("w1-0", "C2", "U1", "test"), "1d", 0, reply_channel_id="C1")
+    store.create_job(Job("j2", "C3", "U1", "test"), "1d", 0)
+    assert [job["reply_channel_id"] for job in store.unfinished_jobs()] == ["C1", "C3"]
+    store.close()
+
+
+def test_retention_watermarks_only_move_forward(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert store.claim_retention_run("C1", slot_start=1000, now=1000)
+    # One run per slot, whoever claims it
+    assert not store.claim_retention_run("C1", slot_start=1000, now=1500)
+    assert store.claim_retention_run("C2", slot_start=1000, now=1500)
+    assert store.claim_retention_run("C1", slot_start=2000, now=2000)
+
+    assert store.watermark("C1") is None
+    store.set_watermark("C1", 1900)
+    store.set_watermark("C1", 1000)
+    assert store.watermark("C1") == 1900
+    store.close()
@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import CANCELLED, COMPLETED, JobEngine
+from priority import BULK, INTERACTIVE, current_priority
+
+
+def test_interactive_jobs_do_not_wait_behind_sweeps():
+    engine = JobEngine(max_workers=1, interactive_workers=1)
+    release = threading.Event()
+    seen = []
+    sweep = engine.submit(lambda job: release.wait(5), "C1", "U1", "sweep")
+    thread = engine.submit(lambda job: seen.append(current_priority()), "C1", "U1", "thread", priority=INTERACTIVE)
+    queued = engine.submit(lambda job: None, "C1", "U1", "queued sweep")
+
+    engine._pools[INTERACTIVE].shutdown(wait=True)
+    assert thread.status == COMPLETED and seen == [(INTERACTIVE, thread.id)]
+    assert not sweep.finished and not queued.finished and sweep.priority == BULK
+
+    release.set()
+    engine.shutdown()
+
+
+def test_on_done_runs_for_jobs_cancelled_while_queued():
+    engine = JobEngine(max_workers=1)
+    release = threading.Event()
+    done = []
+    engine.submit(lambda job: release.wait(5), "C1", "U1", "running", on_done=done.append)
+    queued = engine.submit(lambda job: None, "C1", "U1", "queued", on_done=done.append)
+    engine.cancel(queued.id)
+
+    release.set()
+    engine._pools[BULK].shutdown(wait=True)
+    assert [job.status for job in done] == [COMPLETED, CANCELLED]
+    assert queued.started_at is None
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orphan_index import OrphanIndex
+
+
+def tombstone_events(channel_id, parent_ts, reply_ts):
+    return [
+        {"channel": channel_id, "ts": reply_ts, "thread_ts": parent_ts},
+        {"channel": channel_id, "subtype": "message_changed",
+         "message": {"ts": parent_ts, "subtype": "tombstone", "reply_count": 1}},
+    ]
+
+
+def test_events_are_committed_as_they_arrive(tmp_path):
+    path = str(tmp_path / "orphan_index.sqlite3")
+    first = OrphanIndex(path)
+    second = OrphanIndex(path)
+    for event in tombstone_events("C1", "100.0", "101.0"):
+        first.observe(event)
+    # Neither index holds the write lock between events, and what one wrote is visible to the other
+    second.observe({"channel": "C2", "ts": "200.0"})
+    assert second.candidates("C1", 0) == [("100.0", ["101.0"])]
+    first.close()
+    second.close()
+
+
+def test_no_coverage_while_other_workers_get_events(tmp_path):
+    path = str(tmp_path / "orphan_index.sqlite3")
+    index = OrphanIndex(path)
+    index.observe({"channel": "C1", "ts": "100.0"})
+    assert index.covered_since("C1") is not None
+
+    index.set_shared(True)
+    index.observe({"channel": "C1", "ts": "101.0"})
+    assert index.covered_since("C1") is None
+    index.close()
+
+    # Still shared after a restart until told otherwise, and coverage starts over from the next event
+    index = OrphanIndex(path)
+    assert index.shared and index.covered_since("C1") is None
+    index.set_shared(False)
+    assert index.covered_since("C1") is None
+    index.observe({"channel": "C1", "ts": "102.0"})
+    assert index.covered_since("C1") is not None
+    index.close()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from priority import BULK, INTERACTIVE, FairQueue, PriorityExecutor
+
+
+def test_burst_after_warm_up_runs_in_parallel():
+    pool = PriorityExecutor(max_workers=8, pool_name="test")
+    try:
+        # Leaves one parked worker behind
+        pool.submit(lambda: None).result()
+        time.sleep(0.05)
+
+        threads = set()
+
+        def task():
+            threads.add(threading.current_thread().name)
+            time.sleep(0.2)
+
+        started = time.perf_counter()
+        for future in [pool.submit(task) for _ in range(8)]:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+        assert len(threads) == 8
+        assert elapsed < 0.6
+    finally:
+        pool.shutdown()
+
+
+def test_fair_queue_orders_by_class_then_share():
+    queue = FairQueue()
+    queue.push("a1", BULK, "a")
+    queue.push("a2", BULK, "a")
+    queue.push("b1", BULK, "b")
+    queue.push("i1", INTERACTIVE)
+    assert [queue.pop() for _ in range(4)] == ["i1", "a1", "b1", "a2"]
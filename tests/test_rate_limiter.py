@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from priority import BULK, INTERACTIVE
+from rate_limiter import TokenBucket
+
+
+def test_tokens_refill_at_the_rate_up_to_capacity():
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    # Empty: the next token is about a second away at one per second
+    assert 0.9 < bucket.try_acquire() <= 1.0
+
+    bucket.updated -= 1.5
+    assert bucket.try_acquire() == 0.0
+    assert 0.4 < bucket.try_acquire() <= 0.5
+
+    # A long idle period never earns more than the burst capacity
+    bucket.updated -= 60
+    assert [bucket.try_acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.try_acquire() > 0
+
+
+def test_interactive_callers_go_before_waiting_bulk_callers():
+    bucket = TokenBucket(600, capacity=1)
+    bucket.try_acquire()
+    order = []
+
+    def take(name, priority):
+        bucket.acquire(priority, share="sweep" if priority == BULK else None)
+        order.append(name)
+
+    threads = [threading.Thread(target=take, args=(f"bulk-{n}", BULK)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    threads.append(threading.Thread(target=take, args=("interactive", INTERACTIVE)))
+    threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    assert order[0] == "interactive" and sorted(order[1:]) == ["bulk-0", "bulk-1", "bulk-2"]
@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_store import JobStore
+from retention import RetentionScheduler
+
+
+def test_sweeps_start_from_the_watermark(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    submitted = []
+    scheduler = RetentionScheduler(store, lambda channel_id, oldest: submitted.append((channel_id, oldest)), channels=["C1"],
+                                   interval=3600, lookback=86400, overlap=300)
+    now = scheduler.slot_start("C1", 100_000) + 10
+
+    # The first sweep reaches back the lookback, and a slot is only swept once
+    scheduler.run_due(now)
+    scheduler.run_due(now + 60)
+    assert submitted == [("C1", now - 86400)]
+
+    store.set_watermark("C1", now)
+    scheduler.run_due(now + 3600)
+    assert submitted[1:] == [("C1", now - 300)]
+    store.close()
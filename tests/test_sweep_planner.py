@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep_planner import SweepPlanner
+
+
+def test_running_window_is_pinned_to_its_scan_start():
+    planner = SweepPlanner()
+    window, new, _ = planner.plan("C1", 100, None, "1d", "U1")
+    assert new
+    # Queued, so a later request up to now still joins it
+    assert planner.plan("C1", 200, None, "2h", "U2") == (window, False, [])
+
+    assert planner.start(window, now=1000) == (100, 1000, "1d")
+    assert planner.plan("C1", 200, 900, "range", "U3") == (window, False, [])
+    later, new, joined = planner.plan("C1", 200, None, "2h", "U4")
+    assert new and later is not window and joined == []
+    assert window.requesters == ["U1", "U2", "U3"]
+
+
+def test_queued_windows_take_in_overlapping_requests():
+    planner = SweepPlanner()
+    window, _, _ = planner.plan("C1", 100, 200, "range", "U1")
+    # Covered, overlapping and touching requests all end up in the one queued window
+    assert planner.plan("C1", 120, 180, "inside", "U2") == (window, False, [])
+    assert planner.plan("C1", 150, 300, "overlap", "U3") == (window, False, [])
+    assert planner.plan("C1", 50, 100, "touch", "U4") == (window, False, [])
+    assert (window.oldest, window.latest) == (50, 300)
+    assert window.requesters == ["U1", "U2", "U3", "U4"]
+
+    assert planner.plan("C1", 400, None, "later", "U5")[1]
+    assert planner.plan("C2", 100, 200, "other channel", "U6")[1]
+    assert planner.plan("C1", 60, None, "up to now", "U7")[0] is window
+    assert window.latest is None
+
+
+def test_older_requests_only_scan_what_a_running_window_does_not():
+    planner = SweepPlanner()
+    running, _, _ = planner.plan("C1", 500, None, "2h", "U1")
+    planner.start(running, now=1000)
+
+    window, new, joined = planner.plan("C1", 100, 900, "range", "U2")
+    assert new and joined == [running]
+    assert (window.oldest, window.latest) == (100, 500)
+    assert running.requesters == ["U1", "U2"]
+
+    planner.finish(running)
+    planner.finish(window)
+    assert planner.plan("C1", 600, 700, "range", "U3")[1]
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thread_flights import ThreadFlights
+
+
+def test_duplicate_requests_share_one_deletion():
+    flights = ThreadFlights()
+    flight, owner = flights.begin("C1", "1.0")
+    assert owner
+    assert flights.begin("C1", "1.0") == (flight, False)
+    # Same ts in another channel is another thread
+    assert flights.begin("C2", "1.0")[1]
+
+    flights.finish("C1", "1.0", "deleted")
+    assert flight.future.result(0) == "deleted"
+    other, owner = flights.begin("C1", "1.0")
+    assert owner and other is not flight
+
+
+def test_deleted_messages_are_remembered_for_a_while():
+    flights = ThreadFlights(ttl=0.05, max_size=2)
+    flights.remember("C1", "1.0")
+    assert flights.begin("C1", "1.0") == (None, False)
+
+    time.sleep(0.06)
+    assert flights.begin("C1", "1.0")[1]
+
+    # The oldest entry is forgotten first once max_size are remembered
+    for ts in ("2.0", "3.0", "4.0"):
+        flights.remember("C1", ts)
+    assert flights.begin("C1", "2.0")[1]
+    assert flights.begin("C1", "4.0") == (None, False)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from time_periods import RELATIVE_WINDOW_BUFFER, parse_duration, parse_time_period, parse_time_window
+
+NOW = 1_800_000_000
+
+
+def test_duration_units_and_plurals():
+    assert parse_duration("30M") == (1800, "30 minutes")
+    assert parse_duration("1 hour") == (3600, "1 hour")
+    assert parse_duration("2 hrs") == (7200, "2 hours")
+    assert parse_duration("3 days") == (259200, "3 days")
+    assert parse_duration("1wk") == (604800, "1 week")
+    assert parse_duration("1d6h") == (108000, "1 day 6 hours")
+    assert parse_duration("1 day, 6 hours and 30 mins") == (109800, "1 day 6 hours 30 minutes")
+    assert parse_time_period("2 weeks") == 1209600
+
+
+def test_invalid_input():
+    for text in ("", "2", "H", "2x", "2 hoursago", "-1h", "1h 2", "yesterday"):
+        assert parse_duration(text) is None, text
+        assert parse_time_window(text, now=NOW) is None, text
+    # A zero-length window, a between with equal ends and a range ending before it starts
+    assert parse_time_window("0m", now=NOW) is None
+    assert parse_time_window("between 2d and 2d ago", now=NOW) is None
+    assert parse_time_window("2026-10-02..2026-10-01", now=NOW) is None
+    assert parse_time_window("2026-13-01..", now=NOW) is None
+
+
+def test_window_bounds():
+    assert parse_time_window("2H", now=NOW) == (NOW - 7200 - RELATIVE_WINDOW_BUFFER, None, "the last 2 hours")
+    # The ends of a between window may come in either order
+    window = parse_time_window("between 2d and 3d ago", now=NOW)
+    assert window[:2] == (NOW - 259200, NOW - 172800)
+    assert window.description == "3 days to 2 days ago"
+
+    start = datetime(2026, 10, 1, 10, 0).timestamp()
+    end = datetime(2026, 10, 1, 12, 0).timestamp()
+    assert parse_time_window("2026-10-01T10:00..2026-10-01T12:00", now=NOW) == (start, end, "2026-10-01 10:00 to 2026-10-01 12:00")
+    assert parse_time_window("2026-10-01T10:00..", now=NOW) == (start, None, "since 2026-10-01 10:00")
+    assert parse_time_window("2026-10-01T10:00:00Z..2026-10-01T12:00:00Z", now=NOW)[:2] == (
+        datetime.fromisoformat("2026-10-01T10:00:00+00:00").timestamp(), datetime.fromisoformat("2026-10-01T12:00:00+00:00").timestamp())
@@ -0,0 +1,93 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Seconds a deleted message is remembered, so a duplicate shortcut on it is answered without API calls
+DELETED_TS_TTL = float(os.getenv("DELETED_TS_TTL", "120"))
+
+# Maximum number of deleted messages remembered; the oldest entry is evicted first
+DELETED_TS_CACHE_SIZE = int(os.getenv("DELETED_TS_CACHE_SIZE", "50000"))
+
+THREAD_FLIGHTS = REGISTRY.counter(
+    "thread_deletion_requests_total",
+    "Shortcut thread deletions by result: started, coalesced onto one in flight, or already_deleted moments ago", ("result",))
+
+
+class ThreadFlight:
+    """One running deletion of a thread that duplicate requests for the same thread attach to.
+
+    future resolves to the status text the owner's requester was last given, or None if the deletion
+    succeeded without one. job is set as soon as the thread is handed off to the job engine.
+    """
+
+    __slots__ = ("future", "job")
+
+    def __init__(self):
+        self.future = Future()
+        self.job = None
+
+
+class ThreadFlights:
+    """Single-flight registry of thread deletions keyed by (channel_id, ts), plus a TTL/LRU memory of deleted messages.
+
+    The first request for a thread owns its deletion; requests arriving while it runs get the same
+    ThreadFlight instead of listing and deleting the thread again.
+    """
+
+    def __init__(self, ttl=DELETED_TS_TTL, max_size=DELETED_TS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._inflight = {}
+        self._deleted = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recently_deleted(self, key):
+        # Caller holds the lock
+        expires_at = self._deleted.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._deleted[key]
+            return False
+        return True
+
+    def begin(self, channel_id, ts):
+        """Claim the deletion of the thread at ts.
+
+        Returns (flight, owner). owner is True when this request has to delete the thread and call
+        finish(); otherwise flight is the deletion already running, or None if ts was deleted moments ago.
+        """
+        key = (channel_id, ts)
+        with self._lock:
+            if self._recently_deleted(key):
+                THREAD_FLIGHTS.inc(result="already_deleted")
+                return None, False
+            flight = self._inflight.get(key)
+            if flight is not None:
+                THREAD_FLIGHTS.inc(result="coalesced")
+                return flight, False
+            flight = self._inflight[key] = ThreadFlight()
+            THREAD_FLIGHTS.inc(result="started")
+            return flight, True
+
+    def finish(self, channel_id, ts, outcome):
+        """Release the thread and hand outcome to every request attached to it"""
+        with self._lock:
+            flight = self._inflight.pop((channel_id, ts), None)
+        if flight is not None:
+            flight.future.set_result(outcome)
+
+    def remember(self, channel_id, ts):
+        """Record that a message is gone"""
+        with self._lock:
+            self._deleted[(channel_id, ts)] = time.monotonic() + self.ttl
+            self._deleted.move_to_end((channel_id, ts))
+            while len(self._deleted) > self.max_size:
+                self._deleted.popitem(last=False)
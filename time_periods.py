@@ -0,0 +1,178 @@
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Seconds per duration unit, keyed by the unit's first letter (M/m is always minutes)
+UNIT_SECONDS = {"w": 604800, "d": 86400, "h": 3600, "m": 60}
+UNIT_NAMES = {"w": "week", "d": "day", "h": "hour", "m": "minute"}
+
+# The window grammar is compiled once here rather than on every command
+_DURATION_PART = re.compile(r"(\d+)\s*(weeks?|wks?|w|days?|d|hours?|hrs?|h|minutes?|mins?|m)(?![a-z])", re.IGNORECASE)
+# One or more parts, optionally separated by spaces, commas or "and": 1d6h, 1 day 6 hours, 2h, 30m
+_DURATION = re.compile(rf"{_DURATION_PART.pattern}(?:\s*(?:,|and)?\s*{_DURATION_PART.pattern})*", re.IGNORECASE)
+# 2026-10-01T10:00..2026-10-01T12:00; the end may be left out to mean "until now"
+_RANGE = re.compile(r"(?P<start>\d{4}-\d{2}-\d{2}(?:[T ][\d:.]+)?(?:Z|[+-]\d{2}:?\d{2})?)\s*\.\.\s*"
+                    r"(?P<end>\d{4}-\d{2}-\d{2}(?:[T ][\d:.]+)?(?:Z|[+-]\d{2}:?\d{2})?)?")
+# between 3d and 2d ago
+_BETWEEN = re.compile(r"between\s+(?P<first>.+?)\s+and\s+(?P<second>.+?)\s+ago", re.IGNORECASE)
+
+# Slack timestamps are per message, so relative windows reach this many seconds further back to catch stragglers
+RELATIVE_WINDOW_BUFFER = 30
+
+TimeWindow = namedtuple("TimeWindow", ["oldest", "latest", "description"])
+TimeWindow.__doc__ = """A cleanup window as Unix timestamps; latest is None when the window runs up to now.
+
+description completes phrases like "orphaned messages from ...", e.g. "the last 2 days".
+"""
+
+
+def parse_duration(text):
+    """Parse a possibly compound duration like '2H', '1d6h' or '1 day, 6 hours' into (seconds, display text)"""
+    text = text.strip()
+    if not _DURATION.fullmatch(text):
+        return None
+
+    seconds = 0
+    parts = []
+    for match in _DURATION_PART.finditer(text):
+        number, unit = int(match.group(1)), match.group(2)[0].lower()
+        seconds += number * UNIT_SECONDS[unit]
+        parts.append(f"{number} {UNIT_NAMES[unit]}{'s' if number != 1 else ''}")
+    return seconds, " ".join(parts)
+
+
+def _parse_datetime(text):
+    # Naive times are local, like the timestamps shown in Slack
+    return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+
+
+def _format_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def parse_time_window(text, now=None):
+    """Parse a cleanup window into a TimeWindow, or None if the text is not a valid window.
+
+    Accepts a duration back from now ('2H', '1d6h'), an explicit range
+    ('2026-10-01T10:00..2026-10-01T12:00', end optional) or 'between 3d and 2d ago'.
+    """
+    text = text.strip()
+    now = time.time() if now is None else now
+
+    duration = parse_duration(text)
+    if duration is not None:
+        seconds, display = duration
+        if seconds <= 0:
+            return None
+        return TimeWindow(now - seconds - RELATIVE_WINDOW_BUFFER, None, f"the last {display}")
+
+    match = _BETWEEN.fullmatch(text)
+    if match:
+        first, second = parse_duration(match.group("first")), parse_duration(match.group("second"))
+        if first is None or second is None or first[0] == second[0]:
+            return None
+        (newer, newer_display), (older, older_display) = sorted((first, second))
+        return TimeWindow(now - older, now - newer, f"{older_display} to {newer_display} ago")
+
+    match = _RANGE.fullmatch(text)
+    if match:
+        try:
+            oldest = _parse_datetime(match.group("start"))
+            latest = _parse_datetime(match.group("end")) if match.group("end") else None
+        except ValueError:
+            return None
+        if latest is None:
+            return TimeWindow(oldest, None, f"since {_format_datetime(oldest)}")
+        if latest <= oldest:
+            return None
+        return TimeWindow(oldest, latest, f"{_format_datetime(oldest)} to {_format_datetime(latest)}")
+
+    return None
+
+
+def describe_time_window(text):
+    """Phrase for a window's command text in replies, e.g. 'the last 2 days'; falls back to the text itself"""
+    window = parse_time_window(text)
+    return window.description if window is not None else text
+
+
+def parse_time_period(text):
+    """Parse time period like '1 hour', '2 days', '30 minutes' or '1d6h' into seconds"""
+    duration = parse_duration(text)
+    return duration[0] if duration is not None else None
+
+
+def get_invalid_time_format_error(command_text):
+    """Generate error message for invalid time format"""
+    return f"""❌ *Invalid time format: `{command_text}`*
+
+*Supported formats:*
+
+**Concise formats:**
+• `30M` - 30 minutes
+• `2H` - 2 hours  
+• `1D` - 1 day
+
+**Full word formats:**
+• `30 minutes` - 30 minutes
+• `2 hours` - 2 hours
+• `1 day` - 1 day
+
+**Compound durations and windows:**
+• `1d6h` - 1 day 6 hours
+• `between 3d and 2d ago` - a window in the past
+• `2026-10-01T10:00..2026-10-01T12:00` - an exact range (local time)
+
+**Examples:*
+• `/remove-orphaned-messages 2H`
+• `/remove-orphaned-messages 1D`
+• `/remove-orphaned-messages 30M`
+• `/remove-orphaned-messages 1 hour`
+• `/remove-orphaned-messages 2 days`
+
+*What you entered:* `{command_text}`
+*Try again with one of the formats above.*"""
+
+# Help text for the remove-orphaned-messages command
+_REMOVE_ORPHANED_MESSAGES_HELP = """*🗑️ Remove Orphaned Messages Command Help*
+
+*Usage:*
+`/remove-orphaned-messages <time_period>`
+
+*Examples:*
+• `/remove-orphaned-messages 2H` - Remove orphaned messages from last 2 hours
+• `/remove-orphaned-messages 1D` - Remove orphaned messages from last 1 day
+• `/remove-orphaned-messages 30M` - Remove orphaned messages from last 30 minutes
+• `/remove-orphaned-messages 1 hour` - Remove orphaned messages from last 1 hour
+• `/remove-orphaned-messages 2 days` - Remove orphaned messages from last 2 days
+
+*Supported Formats:*
+• **Concise**: `30M`, `2H`, `1D`, `1W` (minutes, hours, days, weeks)
+• **Full**: `30 minutes`, `2 hours`, `1 day`
+• **Compound**: `1d6h`, `2 hours 30 minutes`
+• **Past window**: `between 3d and 2d ago`
+• **Exact range**: `2026-10-01T10:00..2026-10-01T12:00` (local time; leave out the end for "until now")
+
+{jobs}*What it does:*
+• Removes all orphaned messages from the specified time period in this channel
+• Admins can remove any orphaned messages
+• Regular users can only remove their own orphaned messages
+
+*Permissions:*
+"""
+
+_BACKGROUND_JOBS_HELP = """*Background jobs:*
+• `/remove-orphaned-messages status` - Show cleanup jobs in this channel
+• `/remove-orphaned-messages status <job_id>` - Show progress of one cleanup job
+• `/remove-orphaned-messages cancel <job_id>` - Stop a running cleanup job
+
+*Whole workspace (admins only):*
+• `/remove-orphaned-messages all 1D` - Remove orphaned messages from the last day in every channel the bot can see
+
+"""
+
+REMOVE_ORPHANED_MESSAGES_HELP = _REMOVE_ORPHANED_MESSAGES_HELP.format(jobs=_BACKGROUND_JOBS_HELP)
+
+# async_app.py runs each cleanup inside the command handler, without the job engine
+ASYNC_REMOVE_ORPHANED_MESSAGES_HELP = _REMOVE_ORPHANED_MESSAGES_HELP.format(jobs="")
@@ -0,0 +1,115 @@
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# SQLite file remembering messages chat.delete permanently refused, so later sweeps skip them
+UNDELETABLE_CACHE_PATH = os.getenv("UNDELETABLE_CACHE_PATH", "undeletable.sqlite3")
+
+# Seconds a message stays skipped after a permanent failure, after which it is tried again
+UNDELETABLE_TTL = float(os.getenv("UNDELETABLE_TTL", str(7 * 24 * 3600)))
+
+# Messages remembered at most; the ones closest to expiring are dropped first
+UNDELETABLE_CACHE_SIZE = int(os.getenv("UNDELETABLE_CACHE_SIZE", "100000"))
+
+# Writes are committed, and expired or excess entries dropped, at most this often
+UNDELETABLE_FLUSH_INTERVAL = 2
+
+UNDELETABLE_HITS = REGISTRY.counter(
+    "undeletable_cache_hits_total", "chat.delete calls skipped because the message is known undeletable")
+UNDELETABLE_ENTRIES = REGISTRY.gauge(
+    "undeletable_cache_entries", "Messages in the undeletable cache, as of its last flush")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS undeletable (
+    channel_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    principal TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, ts, principal)
+);
+CREATE INDEX IF NOT EXISTS undeletable_expiry ON undeletable (expires_at);
+"""
+
+
+def token_principal(client):
+    """Short fingerprint of the token a client deletes with; the token itself is never stored"""
+    token = getattr(client, "token", None) or ""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class UndeletableCache:
+    """Persistent negative cache of messages chat.delete refused with a permanent error.
+
+    The deletion workers check it before calling chat.delete, so tombstones that can never be deleted
+    cost one local lookup per sweep instead of an API call. Refusals are kept per token (principal),
+    since a user token may delete what the bot token cannot. Entries expire after ttl seconds, and the
+    table is trimmed to max_size entries.
+    """
+
+    def __init__(self, path=UNDELETABLE_CACHE_PATH, ttl=UNDELETABLE_TTL, max_size=UNDELETABLE_CACHE_SIZE,
+                 flush_interval=UNDELETABLE_FLUSH_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Files written before refusals were kept per token lack the principal column; it is only a cache
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(undeletable)")}
+        if columns and "principal" not in columns:
+            self._conn.execute("DROP TABLE undeletable")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._trim()
+        self._conn.commit()
+
+    def get(self, channel_id, ts, principal):
+        """The error chat.delete gave principal for this message, or None if it is not (or no longer) known undeletable"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reason FROM undeletable WHERE channel_id = ? AND ts = ? AND principal = ? AND expires_at > ?",
+                (channel_id, ts, principal, time.time())
+            ).fetchone()
+            if row is not None:
+                UNDELETABLE_HITS.inc()
+        return row[0] if row else None
+
+    def add(self, channel_id, ts, principal, reason):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO undeletable (channel_id, ts, principal, reason, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (channel_id, ts, principal, reason, time.time() + self.ttl)
+            )
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _trim(self):
+        # Caller holds the lock (or is the constructor)
+        self._conn.execute("DELETE FROM undeletable WHERE expires_at <= ?", (time.time(),))
+        entries = self._conn.execute("SELECT COUNT(*) FROM undeletable").fetchone()[0]
+        UNDELETABLE_ENTRIES.set(min(entries, self.max_size))
+        excess = entries - self.max_size
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM undeletable WHERE rowid IN (SELECT rowid FROM undeletable ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            )
+
+    def _flush(self):
+        self._trim()
+        self._conn.commit()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import REGISTRY
+from tracing import current_span, start_span
+
+logger = logging.getLogger(__name__)
+
+# Seconds a users.info result is trusted before it is fetched again
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Maximum number of users kept; the least recently used entry is evicted first
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+
+# Fill the cache from users.list at startup
+USER_CACHE_WARM = os.getenv("USER_CACHE_WARM", "false").lower() in ("1", "true", "yes")
+
+USER_CACHE_LOOKUPS = REGISTRY.counter(
+    "user_cache_lookups_total", "users.info lookups by result: hit, miss (one API call) or coalesced onto a pending miss", ("result",))
+USER_CACHE_EVICTIONS = REGISTRY.counter(
+    "user_cache_evictions_total", "Users dropped from the cache to stay within USER_CACHE_SIZE")
+
+
+class UserInfoCache:
+    """Bounded TTL/LRU cache of users.info results keyed by user ID.
+
+    Concurrent misses for the same user share a single users.info call.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, user_id):
+        # Caller holds the lock
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user_data = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user_data
+
+    def put(self, user_id, user_data):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user_data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                USER_CACHE_EVICTIONS.inc()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def get(self, client, user_id):
+        """Return the users.info "user" object, calling the API only on a miss"""
+        with start_span("permission.lookup", user=user_id):
+            return self._get(client, user_id)
+
+    def _get(self, client, user_id):
+        with self._lock:
+            user_data = self._lookup(user_id)
+            if user_data is not None:
+                USER_CACHE_LOOKUPS.inc(result="hit")
+                current_span().set_attribute("cache", "hit")
+                return user_data
+
+            pending = self._inflight.get(user_id)
+            if pending is None:
+                USER_CACHE_LOOKUPS.inc(result="miss")
+                current_span().set_attribute("cache", "miss")
+                pending = Future()
+                self._inflight[user_id] = pending
+                owner = True
+            else:
+                USER_CACHE_LOOKUPS.inc(result="coalesced")
+                current_span().set_attribute("cache", "coalesced")
+                owner = False
+
+        if not owner:
+            return pending.result()
+
+        try:
+            user_data = client.users_info(user=user_id).get("user", {})
+            self.put(user_id, user_data)
+            pending.set_result(user_data)
+            return user_data
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+
+    async def get_async(self, client, user_id):
+        """AsyncWebClient version of get"""
+        with start_span("permission.lookup", user=user_id):
+            return await self._get_async(client, user_id)
+
+    async def _get_async(self, client, user_id):
+        with self._lock:
+            user_data = self._lookup(user_id)
+            if user_data is not None:
+                USER_CACHE_LOOKUPS.inc(result="hit")
+                current_span().set_attribute("cache", "hit")
+                return user_data
+
+            pending = self._inflight.get(user_id)
+            if pending is None:
+                USER_CACHE_LOOKUPS.inc(result="miss")
+                current_span().set_attribute("cache", "miss")
+                pending = asyncio.get_running_loop().create_future()
+                self._inflight[user_id] = pending
+                owner = True
+            else:
+                USER_CACHE_LOOKUPS.inc(result="coalesced")
+                current_span().set_attribute("cache", "coalesced")
+                owner = False
+
+        if not owner:
+            return await pending
+
+        try:
+            user_data = (await client.users_info(user=user_id)).get("user", {})
+            self.put(user_id, user_data)
+            pending.set_result(user_data)
+            return user_data
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark the exception as retrieved when no other caller was waiting on it
+            pending.exception()
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+
+    def warm(self, client):
+        """Load every workspace member from users.list, following pagination cursors"""
+        cursor = None
+        loaded = 0
+        while True:
+            response = client.users_list(cursor=cursor, limit=200)
+            for member in response.get("members", []):
+                self.put(member["id"], member)
+                loaded += 1
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                break
+        logger.info(f"Warmed user cache with {loaded} users")
+        return loaded
@@ -0,0 +1,160 @@
+"""Workspace-wide orphan sweeps: channel ordering, the consolidated report and a command line entry point.
+
+    python workspace_sweep.py 7D
+    python workspace_sweep.py 2H --concurrency 4 --types public_channel
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Channels swept at the same time; the shared rate limit budget, not this, bounds total throughput
+WORKSPACE_SWEEP_CONCURRENCY = int(os.getenv("WORKSPACE_SWEEP_CONCURRENCY", "8"))
+
+# Conversation types listed by a workspace sweep (conversations.list "types")
+WORKSPACE_SWEEP_TYPES = os.getenv("WORKSPACE_SWEEP_TYPES", "public_channel,private_channel")
+
+# Where each sweep streams its per-channel results; {job_id} is replaced with the job ID
+WORKSPACE_SWEEP_REPORT = os.getenv("WORKSPACE_SWEEP_REPORT", "workspace_sweep_{job_id}.jsonl")
+
+# Progress counters summed across channels in the report
+REPORT_COUNTERS = ("scanned", "orphaned", "successful", "failed", "api_calls")
+
+
+def last_activity(conversation):
+    """Best available activity timestamp of a conversations.list entry (seconds)"""
+    # "updated" is in milliseconds and moves with channel activity; "created" is the fallback
+    updated = conversation.get("updated")
+    if updated:
+        return updated / 1000
+    return conversation.get("created") or 0
+
+
+def prioritize_conversations(conversations):
+    """Most recently active conversations first, so the busiest channels are cleaned up soonest"""
+    return sorted(conversations, key=last_activity, reverse=True)
+
+
+class WorkspaceReport:
+    """Per-channel results of a workspace sweep, appended to a JSON lines file as each channel finishes"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = []
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    def add(self, conversation, job, notes=()):
+        entry = {
+            "channel_id": conversation.get("id"),
+            "name": conversation.get("name") or conversation.get("id"),
+            "status": job.status,
+            "error": job.error,
+            **{counter: job.progress.get(counter, 0) for counter in REPORT_COUNTERS},
+            "seconds": round((job.finished_at or time.time()) - (job.started_at or job.created_at), 1),
+            "notes": list(notes),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            if self._file is not None:
+                self._file.write(json.dumps(entry) + "\n")
+                self._file.flush()
+        return entry
+
+    def totals(self):
+        with self._lock:
+            entries = list(self.entries)
+        totals = {counter: sum(entry[counter] for entry in entries) for counter in REPORT_COUNTERS}
+        totals["channels"] = len(entries)
+        totals["channels_failed"] = sum(1 for entry in entries if entry["status"] == "failed")
+        return totals
+
+    def summary(self, top=10):
+        """Slack-formatted summary: totals, the channels with the most deletions and the ones that failed"""
+        totals = self.totals()
+        lines = [
+            f"{totals['channels']} channels: scanned {totals['scanned']}, orphaned {totals['orphaned']}, "
+            f"deleted {totals['successful']}, failed {totals['failed']}, {totals['api_calls']} API calls"
+        ]
+        with self._lock:
+            entries = list(self.entries)
+
+        busiest = sorted((entry for entry in entries if entry["successful"]), key=lambda entry: entry["successful"], reverse=True)
+        if busiest:
+            lines.append("*Most cleaned up:* " + ", ".join(f"#{entry['name']} ({entry['successful']})" for entry in busiest[:top]))
+
+        failed = [entry for entry in entries if entry["status"] == "failed"]
+        if failed:
+            shown = ", ".join(f"#{entry['name']} ({entry['error']})" for entry in failed[:top])
+            more = f" and {len(failed) - top} more" if len(failed) > top else ""
+            lines.append(f"*Could not sweep:* {shown}{more}")
+
+        if self.path:
+            lines.append(f"Full report: `{self.path}`")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove orphaned messages from every channel the bot can see")
+    parser.add_argument("period", nargs="+", help="time window to clean up, e.g. 7D, 1d6h, 'between 3d and 2d ago' or 2026-10-01T10:00..2026-10-01T12:00")
+    parser.add_argument("--concurrency", type=int, default=WORKSPACE_SWEEP_CONCURRENCY, help="channels swept at the same time")
+    parser.add_argument("--types", default=WORKSPACE_SWEEP_TYPES, help="conversation types to sweep")
+    parser.add_argument("--report", default=None, help="JSON lines report path (defaults to WORKSPACE_SWEEP_REPORT)")
+    parser.add_argument("--budget", type=int, default=None, help="stop after this many Web API calls (defaults to JOB_API_BUDGET)")
+    args = parser.parse_args()
+
+    # Imported here so --help works without Slack credentials
+    import app as bot
+    from jobs import JOB_API_BUDGET, Job
+
+    command_text = " ".join(args.period)
+    window = bot.parse_time_window(command_text)
+    if window is None:
+        parser.error(f"invalid time window: {command_text!r}")
+
+    bot_client = bot.rate_limited(bot.app.client, bot.api_scheduler)
+    delete_client = bot.user_client or bot_client
+    job = Job(uuid.uuid4().hex[:8], "", "", f"all channels, {window.description}",
+              api_budget=JOB_API_BUDGET if args.budget is None else args.budget)
+
+    def print_result(entry):
+        print(f"#{entry['name']}: {entry['status']}, scanned {entry['scanned']}, orphaned {entry['orphaned']}, "
+              f"deleted {entry['successful']}, failed {entry['failed']} ({entry['seconds']}s)", flush=True)
+
+    # Runs alongside any bot processes: their channel and thread leases keep the two from overlapping
+    bot.coordinator.start()
+    sweep = threading.Thread(
+        target=job.execute,
+        args=(bot.run_workspace_sweep, bot_client, delete_client, command_text, window.oldest, window.latest),
+        kwargs={"notify": print, "on_result": print_result, "concurrency": args.concurrency, "types": args.types, "report_path": args.report},
+        name="workspace-sweep"
+    )
+    sweep.start()
+    try:
+        while sweep.is_alive():
+            sweep.join(0.5)
+    except KeyboardInterrupt:
+        print("Cancelling; deletions already in progress will finish...", flush=True)
+        job.cancel()
+        sweep.join()
+    finally:
+        bot.deletion_executor.shutdown()
+        bot.job_store.close()
+        bot.orphan_index.close()
+        bot.coordinator.close()
+    sys.exit(1 if job.status == "failed" else 0)
+
+
+if __name__ == "__main__":
+    main()